@@ -6,10 +6,14 @@ from odbAccess import openOdb
 import numpy as np
 import pickle
 import os
+import sys
+import inspect
+import time
 from datetime import datetime
 import threading
 import socket
 import struct
+import zlib
 import json
 from sys import version_info
 try:
@@ -17,15 +21,133 @@ try:
 except ImportError:
     import tkinter as tk
 try:
-    from Queue import Queue
+    from Queue import Queue, Empty
 except ImportError:
-    from queue import Queue
+    from queue import Queue, Empty
+
+# JobMonitor.py and InputFileWriter.py next to this script only use the standard library and NumPy, so they are loaded
+# without the package
+sys.path.insert(0, os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe()))))
+from JobMonitor import JobWatchdog
+from InputFileWriter import write_compression_input_file
 
 executeOnCaeStartup()
 HOST = 'localhost'
 PORT = 12345
 
 
+# Binary socket protocol, mirrored from Network.py as this script cannot import the package. Frames are a header of
+# (codec, payload size) and the payload, and both ends send a json hello frame listing their codecs after connecting.
+PROTOCOL_VERSION = 2
+CODEC_JSON, CODEC_PICKLE, CODEC_MSGPACK, CODEC_NDARRAY = range(4)
+SUPPORTED_CODECS = [CODEC_JSON, CODEC_NDARRAY]  # Pickles of numpy arrays made by Python 3 do not load here
+_binary_header = struct.Struct('>BI')
+_legacy_header = struct.Struct('>I')
+_part_header = struct.Struct('>Q')
+
+
+def recv_exactly(sock, size):
+    # Receive exactly size bytes into a preallocated buffer, however the stream is split
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received_size = 0
+    while received_size < size:
+        chunk_size = sock.recv_into(view[received_size:], size - received_size)
+        if chunk_size == 0:
+            raise socket.error('Connection closed by peer')
+        received_size += chunk_size
+    return buffer
+
+
+def _extract_arrays(obj, arrays):
+    if isinstance(obj, np.ndarray):
+        arrays.append(np.ascontiguousarray(obj))
+        return {'__ndarray__': len(arrays) - 1, 'dtype': obj.dtype.str, 'shape': list(obj.shape)}
+    if isinstance(obj, dict):
+        return dict((key, _extract_arrays(value, arrays)) for key, value in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return [_extract_arrays(value, arrays) for value in obj]
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+
+def _insert_arrays(obj, arrays):
+    if isinstance(obj, dict):
+        if '__ndarray__' in obj:
+            description = obj
+            return arrays[description['__ndarray__']].view(np.dtype(str(description['dtype']))).reshape(
+                [int(length) for length in description['shape']])
+        return dict((key, _insert_arrays(value, arrays)) for key, value in obj.items())
+    if isinstance(obj, list):
+        return [_insert_arrays(value, arrays) for value in obj]
+    return obj
+
+
+def encode_message(data, codec):
+    # Parts of the payload, to be sent in order without concatenating them
+    if codec == CODEC_JSON:
+        return [json.dumps(data).encode()]
+    if codec == CODEC_PICKLE:
+        return [pickle.dumps(data, protocol=2)]
+    arrays = list()
+    skeleton = json.dumps(_extract_arrays(data, arrays)).encode()
+    parts = [_part_header.pack(len(skeleton)), skeleton]
+    for array in arrays:
+        parts += [_part_header.pack(array.nbytes), array.tobytes() if hasattr(array, 'tobytes') else array.tostring()]
+    return parts
+
+
+def decode_message(codec, payload):
+    if codec == CODEC_JSON:
+        return json.loads(payload.decode())
+    if codec == CODEC_PICKLE:
+        return pickle.loads(bytes(payload))
+    if codec != CODEC_NDARRAY:
+        raise ValueError('Unsupported codec: {}'.format(codec))
+    skeleton_size = _part_header.unpack_from(payload, 0)[0]
+    offset = _part_header.size
+    skeleton = json.loads(payload[offset:offset + skeleton_size].decode())
+    offset += skeleton_size
+    arrays = list()
+    while offset < len(payload):
+        array_size = _part_header.unpack_from(payload, offset)[0]
+        offset += _part_header.size
+        arrays.append(np.frombuffer(payload, dtype=np.uint8, count=array_size, offset=offset))
+        offset += array_size
+    return _insert_arrays(skeleton, arrays)
+
+
+def send_frame(sock, data, option, peer_codecs=(CODEC_JSON,)):
+    if option == 'binary':
+        # Numpy scalars of outputs are not json serializable, but the skeleton of CODEC_NDARRAY converts them
+        codec = CODEC_NDARRAY if CODEC_NDARRAY in peer_codecs else CODEC_JSON
+        parts = encode_message(data, codec)
+        payload_size = sum(len(part) for part in parts)
+        sock.sendall(_binary_header.pack(codec, payload_size))
+    else:
+        parts = encode_message(data, CODEC_PICKLE if option == 'pickle' else CODEC_JSON)
+        payload_size = len(parts[0])
+        sock.sendall(_legacy_header.pack(payload_size))
+    for part in parts:
+        sock.sendall(part)
+    return payload_size
+
+
+def recv_frame(sock, option):
+    if option == 'binary':
+        codec, payload_size = _binary_header.unpack(bytes(recv_exactly(sock, _binary_header.size)))
+    else:
+        codec = CODEC_PICKLE if option == 'pickle' else CODEC_JSON
+        payload_size = _legacy_header.unpack(bytes(recv_exactly(sock, _legacy_header.size)))[0]
+    return codec, recv_exactly(sock, payload_size)
+
+
+def abbreviate(data, max_length=200):
+    text = ' '.join(repr(data).split())
+    return text if len(text) <= max_length else '{}... ({} characters)'.format(text[:max_length], len(text))
+
+
 class Client:
     def __init__(self, host, port, option, connect):
         self.host = host
@@ -34,9 +156,8 @@ class Client:
         self.q = Queue()
         self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.is_alive = True
-        self._default_packet_size = 1024
-        self._header_format = '>I'
-        self._header_bytes = 4
+        self.peer_codecs = [CODEC_JSON]
+        self._send_lock = threading.Lock()  # Heartbeats are answered from the receiving thread
         if connect:
             self.connect()
 
@@ -48,18 +169,18 @@ class Client:
             new_th.setDaemon(True)
         self.client_socket.connect((self.host, self.port))
         print('[{}] Connected to {}:{}'.format(datetime.now(), self.host, self.port))
+        if self.option == 'binary':
+            send_frame(self.client_socket, {'__hello__': PROTOCOL_VERSION, 'codecs': SUPPORTED_CODECS},
+                       option=self.option)
         new_th.start()
 
     def send(self, data):
-        if self.option == 'pickle':
-            serialized_data = pickle.dumps(data, protocol=2)
-        else:
-            serialized_data = json.dumps(data).encode()
         while True:
             try:
-                print('Sending packets: ', serialized_data)
-                self.client_socket.sendall(struct.pack(self._header_format, len(serialized_data)))
-                self.client_socket.sendall(serialized_data)
+                with self._send_lock:
+                    payload_size = send_frame(self.client_socket, data, option=self.option,
+                                              peer_codecs=self.peer_codecs)
+                print('Sent packets: {} bytes'.format(payload_size))
                 break
             except Exception as send_error:
                 print('Sending data failed, trying to reconnect to server: ', send_error)
@@ -73,45 +194,52 @@ class Client:
 
     def _thread_recv(self, client_socket, option):
         while True:
-            try:  # Trying to receive a data and decode it
-                data_size = struct.unpack(self._header_format, client_socket.recv(self._header_bytes))[0]
-                remaining_payload_size = data_size
-                packets = b''
-                while remaining_payload_size != 0:
-                    packets += client_socket.recv(remaining_payload_size)
-                    remaining_payload_size = data_size - len(packets)
-                try:  # Trying to decode received data
-                    if option == 'json':
-                        received_data = json.loads(packets.decode())
-                    else:
-                        if version_info.major >= 3:
-                            received_data = pickle.loads(packets, encoding='bytes')
-                        else:
-                            received_data = pickle.loads(packets)
-                    print('[{}] Received data: {}'.format(datetime.now(), received_data))
-                    self.q.put(received_data)
-                except Exception as e2:  # Decoding is failed
-                    print('[{}] Loading received data failure: {}'.format(datetime.now(), e2))
-                    continue
+            try:  # Trying to receive a data
+                codec, payload = recv_frame(client_socket, option=option)
             except Exception as e1:  # Connection is lost
                 print('[{}] Error: {}'.format(datetime.now(), e1))
                 break
+            try:  # Trying to decode received data
+                received_data = decode_message(codec, payload)
+            except Exception as e2:  # Decoding is failed
+                print('[{}] Loading received data failure: {}'.format(datetime.now(), e2))
+                continue
+            if isinstance(received_data, dict) and '__hello__' in received_data:
+                self.peer_codecs = received_data['codecs']
+                continue
+            if isinstance(received_data, dict) and '__heartbeat__' in received_data:
+                try:  # Answered here, so that a busy main thread still shows the host that CAE is alive
+                    with self._send_lock:
+                        send_frame(client_socket, received_data, option=option, peer_codecs=self.peer_codecs)
+                except Exception as e3:
+                    print('[{}] Heartbeat failure: {}'.format(datetime.now(), e3))
+                continue
+            print('[{}] Received data: {}'.format(datetime.now(), abbreviate(received_data)))
+            self.q.put(received_data)
         self.is_alive = False
         print('<!> Connection dead')
 
 
 class MyModel:
-    def __init__(self, model_name, params):
+    def __init__(self, model_name, params, template=None):
+        # A template model is copied with its parts, meshes, materials, steps, interactions and output requests
         session.journalOptions.setValues(replayGeometry=COORDINATE, recoverGeometry=COORDINATE)
-        self.model = mdb.Model(name=model_name, modelType=STANDARD_EXPLICIT)
-        self.root_assembly = self.model.rootAssembly
-        self.root_assembly.DatumCsysByDefault(CARTESIAN)
+        if template is None:
+            self.model = mdb.Model(name=model_name, modelType=STANDARD_EXPLICIT)
+            self.root_assembly = self.model.rootAssembly
+            self.root_assembly.DatumCsysByDefault(CARTESIAN)
+        else:
+            self.model = mdb.Model(name=model_name, objectToCopy=template.model)
+            self.root_assembly = self.model.rootAssembly
         self.params = params
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
         if len(mdb.models.keys()) == 1:
             mdb.Model(name='empty_model', modelType=STANDARD_EXPLICIT)
         del mdb.models[self.model.name]
@@ -156,7 +284,8 @@ class MyModel:
                                                            bound_definition):
         bounded_elements = self.model.parts[part_name].elements.getByBoundingBox(**bound_definition)
         bounded_region = regionToolset.Region(elements=bounded_elements)
-        self.model.HomogeneousSolidSection(material=material_name, name=section_name, thickness=None)
+        if section_name not in self.model.sections.keys():
+            self.create_section(material_name=material_name, section_name=section_name)
         self.model.parts[part_name].SectionAssignment(region=bounded_region, sectionName=section_name,
                                                       offset=0.0, offsetType=MIDDLE_SURFACE, offsetField='',
                                                       thicknessAssignment=FROM_SECTION)
@@ -164,6 +293,9 @@ class MyModel:
                                                         fieldName='', localCsys=None, orientationType=GLOBAL,
                                                         region=bounded_region, stackDirection=STACK_3)
 
+    def create_section(self, material_name, section_name):
+        self.model.HomogeneousSolidSection(material=material_name, name=section_name, thickness=None)
+
     def create_set_of_part_by_bounding_box(self, part_name, set_name, bound_definition):
         self.model.parts[part_name].Set(name=set_name,
                                         nodes=self.model.parts[part_name].nodes.getByBoundingBox(**bound_definition))
@@ -222,14 +354,18 @@ class MyModel:
                             surface=self.root_assembly.sets[surface_set_name],
                             u1=ON, u2=ON, u3=ON, ur1=ON, ur2=ON, ur3=ON)
 
+    def create_self_contact_property(self, interaction_property_name):
+        self.model.ContactProperty(interaction_property_name)
+        self.model.interactionProperties[interaction_property_name].NormalBehavior(
+            allowSeparation=ON, constraintEnforcementMethod=DEFAULT, pressureOverclosure=HARD)
+
     def allow_self_contact(self, instance_name, step_name):
         elements = self.root_assembly.instances[instance_name].elements.getExteriorFaces()
         _surface = self.root_assembly.Surface(name='ExteriorSurface', side1Elements=elements)
         _interaction_property_name = 'SelfContactProp'
         _interaction_name = 'SelfContact'
-        self.model.ContactProperty(_interaction_property_name)
-        self.model.interactionProperties[_interaction_property_name].NormalBehavior(
-            allowSeparation=ON, constraintEnforcementMethod=DEFAULT, pressureOverclosure=HARD)
+        if _interaction_property_name not in self.model.interactionProperties.keys():
+            self.create_self_contact_property(interaction_property_name=_interaction_property_name)
         self.model.SelfContactStd(name=_interaction_name, contactTracking=ONE_CONFIG, createStepName=step_name,
                                   interactionProperty=_interaction_property_name, surface=_surface, thickness=ON)
 
@@ -242,8 +378,29 @@ class MyModel:
                 scratch='', resultsFormat=ODB, numThreadsPerMpiProcess=1,
                 multiprocessingMode=DEFAULT, numCpus=num_cpus, numGPUs=num_gpus)
         if run:
+            remove_progress_files(job_name)
             mdb.jobs[job_name].submit(consistencyChecking=OFF)
-            mdb.jobs[job_name].waitForCompletion()
+            wait_for_job(job_name=job_name, parameters=self.params)
+
+
+class InputFileJob:
+    # Job of an input file written without a CAE model, closed as MyModel once the job has finished
+    def __init__(self, job_name, input_file_name, params):
+        self.job_name = job_name
+        mdb.JobFromInputFile(name=job_name, inputFileName=input_file_name, type=ANALYSIS, atTime=None, waitMinutes=0,
+                             waitHours=0, queue=None, memory=90, memoryUnits=PERCENTAGE,
+                             getMemoryFromAnalysis=True, explicitPrecision=SINGLE, nodalOutputPrecision=SINGLE,
+                             userSubroutine='', scratch='', resultsFormat=ODB, numThreadsPerMpiProcess=1,
+                             multiprocessingMode=DEFAULT, numCpus=params['n_cpus'], numGPUs=params['n_gpus'])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        del mdb.jobs[self.job_name]
 
 
 # Function for Python 2
@@ -252,33 +409,125 @@ def ascii_encode_dict(data):
     return dict(map(ascii_encode, pair) for pair in data.items())
 
 
-def send_log(message, socket_connection, end_generation=False):
+def send_log(message, socket_connection, end_generation=False, **extra_data):
     now = datetime.now().strftime('%Y/%m/%d %H:%M:%S')
     message_to_send = '[{}] {}\n'.format(now, message)
     json_data_to_send = {'log_message': message_to_send, 'end_generation': end_generation}
+    json_data_to_send.update(extra_data)
     print(message_to_send)
     with open('log.txt', mode='a') as f_log:
         f_log.write(message_to_send)
     socket_connection.send(json_data_to_send)
 
 
-def dump_pickled_dict_data(file_name, key, to_dump, mode):
+RECORD_MAGIC = b'AXR1'
+RECORD_HEADER_FORMAT = '>4sII'  # magic, payload size, crc32 of payload
+
+
+def replace_file(src, dst):
+    try:
+        os.replace(src, dst)
+    except AttributeError:  # Python 2
+        if os.path.isfile(dst):
+            os.remove(dst)
+        os.rename(src, dst)
+
+
+def frame_record(dict_data):
+    payload = pickle.dumps(dict_data, protocol=2)
+    return struct.pack(RECORD_HEADER_FORMAT, RECORD_MAGIC, len(payload), zlib.crc32(payload) & 0xffffffff) + payload
+
+
+def iterate_records(serialized):
+    # Yields (end offset, payload) of every complete record
+    header_size = struct.calcsize(RECORD_HEADER_FORMAT)
+    offset = 0
+    while offset + header_size <= len(serialized):
+        magic, payload_size, checksum = struct.unpack(RECORD_HEADER_FORMAT, serialized[offset:offset + header_size])
+        payload = serialized[offset + header_size:offset + header_size + payload_size]
+        if magic != RECORD_MAGIC or len(payload) != payload_size or zlib.crc32(payload) & 0xffffffff != checksum:
+            break
+        offset += header_size + payload_size
+        yield offset, payload
+
+
+def loads_pickle_or_records(serialized):
+    # Counterpart of auxeticmop.FileIO.loads_pickle_or_records
+    if serialized[:len(RECORD_MAGIC)] != RECORD_MAGIC:
+        return pickle.loads(serialized)
+    merged = dict()
+    for _, payload in iterate_records(serialized):
+        merged.update(pickle.loads(payload))
+    return merged
+
+
+_repaired_record_files = set()
+
+
+def repair_record_file(file_name):
+    # Cut off a record torn by a crash, once per file in this process, so that new records are not appended after it
+    if file_name in _repaired_record_files:
+        return
+    with open(file_name, mode='rb') as f:
+        serialized = f.read()
+    valid_size = 0
+    for valid_size, _ in iterate_records(serialized):
+        pass
+    if valid_size < len(serialized):
+        with open(file_name, mode='r+b') as f:
+            f.truncate(valid_size)
+    _repaired_record_files.add(file_name)
+
+
+def dump_pickled_dict_data(file_name, key, to_dump, mode, fsync=True):
+    """
+    Dump {key: to_dump} into file_name. With mode 'a', one framed record is appended, so previous entities are
+    neither read nor rewritten. With mode 'w', the file is written to a temporary file and renamed atomically.
+    If fsync, data is flushed to the disk before returning.
+    """
     if mode == 'a' and os.path.isfile(file_name):
         with open(file_name, mode='rb') as f:
-            dict_data = pickle.load(f)
-        dict_data.update({key: to_dump})
+            is_record_file = f.read(len(RECORD_MAGIC)) == RECORD_MAGIC
+        if not is_record_file:  # Convert a file of older versions to records once
+            with open(file_name, mode='rb') as f:
+                legacy_dict_data = pickle.load(f)
+            with open(file_name + '.tmp', mode='wb') as f:
+                f.write(frame_record(legacy_dict_data))
+                f.flush()
+                if fsync:
+                    os.fsync(f.fileno())
+            replace_file(file_name + '.tmp', file_name)
+        repair_record_file(file_name)
+    if mode == 'a':
+        with open(file_name, mode='ab') as f:
+            f.write(frame_record({key: to_dump}))
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
     else:
-        dict_data = {key: to_dump}
-    with open(file_name, mode='wb') as f:
-        pickle.dump(dict_data, f)
+        with open(file_name + '.tmp', mode='wb') as f:
+            f.write(frame_record({key: to_dump}))
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        replace_file(file_name + '.tmp', file_name)
 
 
 def load_pickled_dict_data(file_name):
     with open(file_name, mode='rb') as f:
-        dict_data = pickle.load(f)
+        dict_data = loads_pickle_or_records(f.read())
     return dict_data
 
 
+def unpack_topologies(obj):
+    # Counterpart of auxeticmop.FileIO.unpack_topologies
+    if not (isinstance(obj, dict) and '__packed_topologies__' in obj):
+        return obj
+    shape = tuple(obj['shape'])
+    size = int(np.prod(shape))
+    return np.unpackbits(np.frombuffer(obj['bits'], dtype=np.uint8))[:size].reshape(shape)
+
+
 def random_array(shape, probability):
     from functools import reduce
     return np.random.choice([1, 0], size=reduce(lambda x, y: x * y, shape),
@@ -310,10 +559,8 @@ def bound_setter(whole_bound, option):
     return bound
 
 
-def export_outputs(model_name, step_name, rp_name):
-    gen, entity = map(int, model_name.split('-'))
-    history_output_file_header = 'HistoryOutput_offspring'
-    field_output_file_header = 'FieldOutput_offspring'
+def read_outputs(model_name, step_name, rp_name):
+    # Returns field and history outputs of a finished job, or (None, None) if they cannot be read
     exported_field_outputs = {
         'displacement': {'xMax': np.ndarray, 'yMax': np.ndarray, 'zMax': np.ndarray},
         'rotation': np.ndarray,
@@ -346,28 +593,71 @@ def export_outputs(model_name, step_name, rp_name):
             exported_field_outputs['mises_stress']['max'] = max(_values)
             exported_field_outputs['mises_stress']['min'] = min(_values)
             exported_field_outputs['mises_stress']['average'] = np.average(_values)
-            dump_pickled_dict_data(file_name='{}_{}'.format(field_output_file_header, str(gen)),
-                                   key=entity, to_dump=exported_field_outputs, mode='a')
 
             # History outputs
             history_outputs = odb.steps[step_name].historyRegions['Node ASSEMBLY.1'].historyOutputs
             exported_history_outputs = {prop: np.array(history_outputs[prop].data)
                                         for prop in exported_history_output_properties}
-            dump_pickled_dict_data(file_name='{}_{}'.format(history_output_file_header, str(gen)),
-                                   key=entity, to_dump=exported_history_outputs, mode='a')
-
+            return exported_field_outputs, exported_history_outputs
         except Exception as e2:
             print('ODB output reading failed: ', e2)
         finally:
             odb.close()
     except Exception as e1:
         print('There is no ODB file: ', e1)
+    return None, None
+
+
+def export_outputs(model_name, step_name, rp_name):
+    gen, entity = map(int, model_name.split('-'))
+    history_output_file_header = 'HistoryOutput_offspring'
+    field_output_file_header = 'FieldOutput_offspring'
+    exported_field_outputs, exported_history_outputs = read_outputs(model_name=model_name, step_name=step_name,
+                                                                    rp_name=rp_name)
+    if exported_field_outputs is None:
+        export_failed_entity(model_name=model_name)
+        return
+    dump_pickled_dict_data(file_name='{}_{}'.format(field_output_file_header, str(gen)),
+                           key=entity, to_dump=exported_field_outputs, mode='a')
+    dump_pickled_dict_data(file_name='{}_{}'.format(history_output_file_header, str(gen)),
+                           key=entity, to_dump=exported_history_outputs, mode='a')
+
+
+def export_failed_entity(model_name):
+    # Outputs of None mark an aborted job, which the GA evaluates with a penalty fitness instead of analysing again
+    gen, entity = map(int, model_name.split('-'))
+    dump_pickled_dict_data(file_name='FieldOutput_offspring_{}'.format(gen), key=entity, to_dump=None, mode='a')
+
+
+def json_compatible(obj):
+    # Arrays and numpy scalars of outputs as nested lists and floats, for a client of the legacy json protocol
+    if isinstance(obj, dict):
+        return dict((key, json_compatible(value)) for key, value in obj.items())
+    if isinstance(obj, (np.ndarray, list, tuple)):
+        return [json_compatible(value) for value in obj]
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
 
 
 def run_analysis(params, model_name, topo_arr, voxel_name, voxel_unit_length, cube_name,
                  analysis_mode, material_properties, full, displacement=None):
-    topo_arr = quaver_to_full(topo_arr) if full else topo_arr.copy()
-    cube_x_voxels, cube_y_voxels, cube_z_voxels = topo_arr.shape
+    mm, job_name, step_name = build_analysis(
+        params=params, model_name=model_name, topo_arr=topo_arr, voxel_name=voxel_name,
+        voxel_unit_length=voxel_unit_length, cube_name=cube_name, analysis_mode=analysis_mode,
+        material_properties=material_properties, full=full, displacement=displacement)
+    with mm:
+        remove_progress_files(job_name)
+        mdb.jobs[job_name].submit(consistencyChecking=OFF)
+        if wait_for_job(job_name=job_name, parameters=params) == 'COMPLETED':
+            export_outputs(model_name=model_name, step_name=step_name, rp_name='RP-y')
+        else:
+            export_failed_entity(model_name=model_name)
+
+
+def cube_bounds_and_reference_points(topology_shape, voxel_unit_length):
+    # Bounding boxes of the cube and its faces, and the reference points next to its maximum faces
+    cube_x_voxels, cube_y_voxels, cube_z_voxels = topology_shape
     cube_x_size = float(voxel_unit_length * cube_x_voxels)
     cube_y_size = float(voxel_unit_length * cube_y_voxels)
     cube_z_size = float(voxel_unit_length * cube_z_voxels)
@@ -376,8 +666,18 @@ def run_analysis(params, model_name, topo_arr, voxel_name, voxel_unit_length, cu
     rp_coordinates = {'RP-x': (1.05 * cube_x_size, cube_y_size / 2, cube_z_size / 2),
                       'RP-y': (cube_x_size / 2, 1.05 * cube_y_size, cube_z_size / 2),
                       'RP-z': (cube_x_size / 2, cube_y_size / 2, 1.05 * cube_z_size)}
+    return whole_bound, bounds, rp_coordinates
 
-    with MyModel(model_name='Model-{}'.format(model_name), params=params) as mm:
+
+def build_analysis(params, model_name, topo_arr, voxel_name, voxel_unit_length, cube_name,
+                   analysis_mode, material_properties, full, displacement=None):
+    # Builds the model and its job without submitting it. The caller closes the model after the job has finished.
+    topo_arr = quaver_to_full(topo_arr) if full else topo_arr.copy()
+    whole_bound, bounds, rp_coordinates = cube_bounds_and_reference_points(topology_shape=topo_arr.shape,
+                                                                           voxel_unit_length=voxel_unit_length)
+
+    mm = MyModel(model_name='Model-{}'.format(model_name), params=params)
+    try:
         material_name = material_properties['material_name']
         mm.create_voxel_part(voxel_name=voxel_name)
         mm.create_mesh_of_part(part_name=voxel_name)
@@ -411,35 +711,374 @@ def run_analysis(params, model_name, topo_arr, voxel_name, voxel_unit_length, cu
             raise ValueError
         mm.root_assembly.regenerate()
         mm.create_job(job_name='Job-{}'.format(model_name),
-                      num_cpus=params['n_cpus'], num_gpus=params['n_gpus'], run=True)
-        export_outputs(model_name=model_name, step_name=analysis_step_name, rp_name='RP-y')
+                      num_cpus=params['n_cpus'], num_gpus=params['n_gpus'], run=False)
+    except Exception:
+        mm.close()
+        raise
+    return mm, 'Job-{}'.format(model_name), analysis_step_name
+
+
+def build_template_model(params, template_name, topology_shape, voxel_name, material_properties, displacement):
+    # Pieces of the compression analysis which do not depend on the topology: the meshed voxel part, the material and
+    # its section, reference points, the step, the contact property, the displacement of RP-y and output requests
+    _, _, rp_coordinates = cube_bounds_and_reference_points(topology_shape=topology_shape,
+                                                            voxel_unit_length=params['unit_l'])
+    analysis_step_name = 'compression-step'
+    mm = MyModel(model_name=template_name, params=params)
+    try:
+        material_name = material_properties['material_name']
+        mm.create_voxel_part(voxel_name=voxel_name)
+        mm.create_mesh_of_part(part_name=voxel_name)
+        mm.create_material(**material_properties)
+        mm.create_section(material_name=material_name, section_name=material_name + '-section')
+        for rp_name, rp_coordinate in rp_coordinates.items():
+            mm.create_reference_point_and_set(rp_name=rp_name, rp_coordinate=rp_coordinate)
+        mm.create_step(step_name=analysis_step_name, previous_step='Initial', step_type='compression')
+        mm.create_self_contact_property(interaction_property_name='SelfContactProp')
+        mm.set_displacement(bc_name='displacement', set_name='RP-y', step_name=analysis_step_name,
+                            displacement=displacement)
+        mm.create_output_requests(step_name=analysis_step_name, history_output_name='H-Output', set_name='RP-y',
+                                  field_outputs=('S', 'U', 'RF', 'IVOL', 'MISESMAX'),
+                                  history_outputs=('U1', 'U2', 'U3', 'RF1', 'RF2', 'RF3', 'ALLIE'))
+    except Exception:
+        mm.close()
+        raise
+    return mm
+
+
+def build_analysis_from_template(params, model_name, topo_arr, template, voxel_name, cube_name, material_name):
+    # The same model as build_analysis() in compression mode, copied from a template so that only the cube part and
+    # the sets, boundary conditions and interactions on it are built for the entity
+    whole_bound, bounds, _ = cube_bounds_and_reference_points(topology_shape=topo_arr.shape,
+                                                              voxel_unit_length=params['unit_l'])
+    analysis_step_name = 'compression-step'
+    mm = MyModel(model_name='Model-{}'.format(model_name), params=params, template=template)
+    try:
+        mm.create_cube_part(voxel_name=voxel_name, cube_name=cube_name, topo_arr=topo_arr)
+        mm.assign_section_to_elements_of_part_by_bounding_box(part_name=cube_name, material_name=material_name,
+                                                              section_name=material_name + '-section',
+                                                              bound_definition=whole_bound)
+        mm.root_assembly.regenerate()
+        for option, bound in bounds.items():
+            mm.create_set_by_bounding_box(instance_name=cube_name + '-1', set_name=option, bound_definition=bound)
+        for symmetry_diction, boundary_set_name in (('x', 'xMin'), ('y', 'yMin'), ('z', 'zMin')):
+            mm.set_boundary_condition(symmetry_direction=symmetry_diction, set_name=boundary_set_name)
+        mm.allow_self_contact(instance_name=cube_name + '-1', step_name=analysis_step_name)
+        mm.create_coupling(rp_set_name='RP-y', surface_set_name='yMax', constraint_name='coupling')
+        mm.root_assembly.regenerate()
+        mm.create_job(job_name='Job-{}'.format(model_name),
+                      num_cpus=params['n_cpus'], num_gpus=params['n_gpus'], run=False)
+    except Exception:
+        mm.close()
+        raise
+    return mm, 'Job-{}'.format(model_name), analysis_step_name
+
+
+class TemplateModelCache:
+    # Template model of the latest parameters, built again only when a parameter it depends on changes, so that it
+    # is built once per run
+    template_name = 'Model-template'
+    template_parameter_names = ('unit_l', 'mesh_size', 'lx', 'ly', 'lz', 'dis_y', 'material_name', 'density',
+                                'engineering_constants')
+
+    def __init__(self):
+        self.key = None
+        self.template = None
+
+    def get(self, parameters):
+        key = tuple(str(parameters[name]) for name in self.template_parameter_names)
+        if key != self.key:
+            self.close()
+            self.template = build_template_model(
+                params=parameters, template_name=self.template_name,
+                topology_shape=(parameters['lx'], parameters['ly'], parameters['lz']), voxel_name='voxel',
+                material_properties=material_property_definitions_of(parameters),
+                displacement={'u1': 0, 'u2': parameters['dis_y'], 'u3': 0, 'ur1': 0, 'ur2': 0, 'ur3': 0})
+            self.key = key
+        return self.template
+
+    def close(self):
+        if self.template is not None:
+            self.template.close()
+        self.key, self.template = None, None
+
+
+template_models = TemplateModelCache()
+preprocessing_times = dict()  # Model name: seconds spent building the model and the job of an entity
+
+
+def preprocessing_summary(times):
+    if len(times) == 0:
+        return 'no entity was pre-processed'
+    return 'pre-processing took {:.2f} s per entity on average ({:.2f} s to {:.2f} s) over {} entities'.format(
+        sum(times) / len(times), min(times), max(times), len(times))
+
+
+def license_tokens(num_cpus):
+    # Analysis tokens drawn by one job using num_cpus cores, following the Abaqus token table
+    return int(5 * num_cpus ** 0.422)
+
+
+def job_finished_status(job_name):
+    # Returns None while the job runs, otherwise 'COMPLETED' or 'ABORTED', read from the status or the job log file
+    status = str(getattr(mdb.jobs[job_name], 'status', None))
+    if status in ('COMPLETED', 'ABORTED', 'TERMINATED'):
+        return 'COMPLETED' if status == 'COMPLETED' else 'ABORTED'
+    log_file_name = '{}.log'.format(job_name)
+    if os.path.isfile(log_file_name):
+        with open(log_file_name, mode='r') as f:
+            log = f.read()
+        if 'exited with error' in log or 'ABORTED' in log:
+            return 'ABORTED'
+        if 'COMPLETED' in log:
+            return 'COMPLETED'
+    return None
+
+
+def job_watchdog_of(parameters, job_name):
+    return JobWatchdog(job_name=job_name, time_limit=parameters.get('job_time_limit', 0),
+                       increment_limit=parameters.get('job_increment_limit', 0),
+                       min_increment=parameters.get('job_min_increment', 0),
+                       cutback_limit=parameters.get('job_cutback_limit', 0))
+
+
+def remove_progress_files(job_name):
+    # Files left by an interrupted run would be read as the progress or the end of a new job
+    for extension in ('log', 'sta', 'msg'):
+        if os.path.isfile('{}.{}'.format(job_name, extension)):
+            os.remove('{}.{}'.format(job_name, extension))
+
+
+def kill_job(job_name, reason):
+    print('Aborting {}: {}'.format(job_name, reason))
+    try:
+        mdb.jobs[job_name].kill()
+    except Exception as e:
+        print('Killing {} failed: '.format(job_name), e)
+
+
+def wait_for_job(job_name, parameters, poll_interval=1.0):
+    # waitForCompletion() without time limit, where the watchdog kills a job going nowhere
+    watchdog = job_watchdog_of(parameters=parameters, job_name=job_name)
+    while job_finished_status(job_name) is None:
+        reason = watchdog.check()
+        if reason is not None:
+            kill_job(job_name=job_name, reason=reason)
+            mdb.jobs[job_name].waitForCompletion()
+            return 'ABORTED'
+        time.sleep(poll_interval)
+    return job_finished_status(job_name)
+
+
+class JobScheduler:
+    # Keeps up to max_concurrent_jobs jobs running without waitForCompletion(), drawing license tokens from
+    # token_budget (0: unlimited). Running jobs are followed by watchdogs made by make_watchdog(job_name), and killed
+    # when their watchdogs tell a reason. Finished jobs are handed to on_finished(model_name, step_name, status,
+    # reason) in the order they finish, where reason is None unless the job is killed, and their models are deleted.
+    def __init__(self, max_concurrent_jobs, num_cpus, token_budget, on_finished, make_watchdog=None,
+                 poll_interval=1.0):
+        self.max_concurrent_jobs = max(1, max_concurrent_jobs)
+        self.tokens_per_job = license_tokens(num_cpus)
+        self.token_budget = token_budget
+        self.on_finished = on_finished
+        self.make_watchdog = make_watchdog
+        self.poll_interval = poll_interval
+        self.running_jobs = dict()  # job_name: (MyModel, model_name, step_name)
+        self.watchdogs = dict()  # job_name: watchdog
+
+    def can_submit(self):
+        if len(self.running_jobs) >= self.max_concurrent_jobs:
+            return False
+        if self.token_budget <= 0 or len(self.running_jobs) == 0:  # A single job always runs
+            return True
+        return (len(self.running_jobs) + 1) * self.tokens_per_job <= self.token_budget
+
+    def submit(self, mm, model_name, job_name, step_name):
+        remove_progress_files(job_name)
+        mdb.jobs[job_name].submit(consistencyChecking=OFF)
+        self.running_jobs[job_name] = (mm, model_name, step_name)
+        if self.make_watchdog is not None:
+            self.watchdogs[job_name] = self.make_watchdog(job_name)
+
+    def poll(self):
+        for job_name in list(self.running_jobs.keys()):
+            status, reason = job_finished_status(job_name), None
+            if status is None and job_name in self.watchdogs:
+                reason = self.watchdogs[job_name].check()
+                if reason is not None:
+                    kill_job(job_name=job_name, reason=reason)
+                    status = 'ABORTED'
+            if status is None:
+                continue
+            mm, model_name, step_name = self.running_jobs.pop(job_name)
+            self.watchdogs.pop(job_name, None)
+            try:
+                self.on_finished(model_name, step_name, status, reason)
+            finally:
+                mm.close()
+
+    def wait_for_slot(self):
+        self.poll()
+        while not self.can_submit():
+            time.sleep(self.poll_interval)
+            self.poll()
+
+    def wait_all(self):
+        self.poll()
+        while self.running_jobs:
+            time.sleep(self.poll_interval)
+            self.poll()
+
+
+def find_exported_entities(gen_num):
+    # Entities whose outputs are already in the field output file, skipped when resuming
+    field_output_file_name = 'FieldOutput_offspring_{}'.format(gen_num)
+    if not os.path.isfile(field_output_file_name):
+        return set()
+    return set(load_pickled_dict_data(field_output_file_name).keys())
+
+
+def material_property_definitions_of(parameters):
+    return {
+        'material_name': parameters['material_name'],
+        'density': parameters['density'],
+        'engineering_constants': parameters['engineering_constants']
+    }
+
+
+def create_job_scheduler(parameters, on_finished):
+    return JobScheduler(max_concurrent_jobs=parameters.get('n_concurrent_jobs', 1), num_cpus=parameters['n_cpus'],
+                        token_budget=parameters.get('abaqus_token_budget', 0), on_finished=on_finished,
+                        make_watchdog=lambda job_name: job_watchdog_of(parameters=parameters, job_name=job_name))
+
+
+def build_input_file_analysis(params, model_name, topo_arr, material_properties, displacement):
+    # The same analysis as build_analysis(), with its mesh and keywords written by NumPy instead of instancing and
+    # merging a part per voxel in CAE
+    job_name = 'Job-{}'.format(model_name)
+    step_name = 'compression-step'
+    write_compression_input_file(file_name='{}.inp'.format(job_name), topology=topo_arr,
+                                 unit_length=params['unit_l'], mesh_size=params['mesh_size'],
+                                 material_name=material_properties['material_name'],
+                                 density=material_properties['density'],
+                                 engineering_constants=material_properties['engineering_constants'],
+                                 displacement=displacement, step_name=step_name, model_name=model_name)
+    return InputFileJob(job_name=job_name, input_file_name='{}.inp'.format(job_name), params=params), job_name, \
+        step_name
+
+
+def build_compression_analysis(parameters, model_name, topology):
+    # Time of building is kept in preprocessing_times, including the template model built for the first entity
+    build_start_time = time.time()
+    model_builder = parameters.get('model_builder', 'cae')
+    if model_builder == 'input_file':
+        analysis = build_input_file_analysis(
+            params=parameters, model_name=model_name, topo_arr=topology,
+            material_properties=material_property_definitions_of(parameters),
+            displacement={'u1': 0, 'u2': parameters['dis_y'], 'u3': 0, 'ur1': 0, 'ur2': 0, 'ur3': 0})
+    elif model_builder == 'template':
+        analysis = build_analysis_from_template(
+            params=parameters, model_name=model_name, topo_arr=topology, template=template_models.get(parameters),
+            voxel_name='voxel', cube_name='cube', material_name=parameters['material_name'])
+    else:
+        analysis = build_analysis(
+            model_name=model_name, analysis_mode='compression', topo_arr=topology,
+            voxel_unit_length=parameters['unit_l'], full=False, params=parameters,
+            material_properties=material_property_definitions_of(parameters), voxel_name='voxel', cube_name='cube',
+            displacement={'u1': 0, 'u2': parameters['dis_y'], 'u3': 0, 'ur1': 0, 'ur2': 0, 'ur3': 0})
+    preprocessing_times[model_name] = time.time() - build_start_time
+    return analysis
+
+
+def run_generation(parameters, client):
+    # Analyses every entity of a topologies file, exporting outputs to files of the working directory
+    start_topology_from = parameters['start_topology_from']
+    topologies_file_name = parameters['topologies_file_name']
+    topologies_key = parameters['topologies_key']
+    topologies = unpack_topologies(load_pickled_dict_data(topologies_file_name)[topologies_key])
+    gen_num = topologies_file_name.split('_')[-1]
+    exported_entities = find_exported_entities(gen_num)
+    generation_preprocessing_times = list()
+
+    def on_finished(model_name, step_name, status, reason):
+        if status == 'COMPLETED':
+            export_outputs(model_name=model_name, step_name=step_name, rp_name='RP-y')
+        else:
+            export_failed_entity(model_name=model_name)
+        preprocessing_time = preprocessing_times.pop(model_name)
+        generation_preprocessing_times.append(preprocessing_time)
+        send_log('{} Job-{}.odb{}, pre-processed in {:.2f} s'.format(
+            'Created' if status == 'COMPLETED' else 'Aborted', model_name,
+            '' if reason is None else ' ({})'.format(reason), preprocessing_time), socket_connection=client)
+
+    scheduler = create_job_scheduler(parameters=parameters, on_finished=on_finished)
+    for entity_num, topology in enumerate(topologies, start=1):
+        if entity_num < start_topology_from or entity_num in exported_entities:
+            continue
+        scheduler.wait_for_slot()
+        entity_model_name = '{}-{}'.format(gen_num, entity_num)
+        entity_model, entity_job_name, entity_step_name = build_compression_analysis(
+            parameters=parameters, model_name=entity_model_name, topology=topology)
+        scheduler.submit(mm=entity_model, model_name=entity_model_name, job_name=entity_job_name,
+                         step_name=entity_step_name)
+    scheduler.wait_all()
+    send_log('Generation {} finished! With the {} model builder, {}'.format(
+        gen_num, parameters.get('model_builder', 'cae'), preprocessing_summary(generation_preprocessing_times)),
+        socket_connection=client, end_generation=True)
+
+
+def submit_work_items(parameters, scheduler):
+    # Work items of a dispatching host carry their topologies, so that clients on other nodes need no shared files
+    topology_shape = (parameters['lx'], parameters['ly'], parameters['lz'])
+    for entity_num, flat_topology in zip(parameters['work_entities'], parameters['work_topologies']):
+        scheduler.wait_for_slot()
+        entity_model_name = '{}-{}'.format(parameters['generation'], entity_num)
+        entity_model, entity_job_name, entity_step_name = build_compression_analysis(
+            parameters=parameters, model_name=entity_model_name,
+            topology=np.asarray(flat_topology, dtype=int).reshape(topology_shape))
+        scheduler.submit(mm=entity_model, model_name=entity_model_name, job_name=entity_job_name,
+                         step_name=entity_step_name)
 
 
 if __name__ == '__main__':
-    client = Client(host=HOST, port=PORT, option='json', connect=True)
+    client = Client(host=HOST, port=PORT, option='binary', connect=True)
     send_log('Connected to {}:{}'.format(HOST, PORT), socket_connection=client)
+    work_request_ids = dict()  # Model name: request id to echo, for an asyncio host awaiting each work item
+
+    def report_work_item(model_name, step_name, status, reason):
+        gen, entity = map(int, model_name.split('-'))
+        field_outputs, history_outputs = None, None
+        if status == 'COMPLETED':
+            field_outputs, history_outputs = read_outputs(model_name=model_name, step_name=step_name, rp_name='RP-y')
+        send_log('{} Job-{}.odb{}, pre-processed in {:.2f} s'.format(
+            'Created' if field_outputs is not None else 'Aborted', model_name,
+            '' if reason is None else ' ({})'.format(reason), preprocessing_times.pop(model_name)),
+            socket_connection=client, generation=gen, finished_entity=entity,
+            request_id=work_request_ids.pop(model_name, None),
+            field_outputs=field_outputs if client.option == 'binary' else json_compatible(field_outputs),
+            history_outputs=history_outputs if client.option == 'binary' else json_compatible(history_outputs))
+
+    work_scheduler = None
     while True:
-        parameters = client.recv()
+        if work_scheduler is not None and work_scheduler.running_jobs:
+            try:  # Keep polling running work items while waiting for more of them
+                parameters = client.q.get(timeout=work_scheduler.poll_interval)
+            except Empty:
+                work_scheduler.poll()
+                continue
+        else:
+            parameters = client.recv()
         parameters = ascii_encode_dict(parameters)
         if parameters['exit_abaqus']:
             break
-        material_property_definitions = {
-            'material_name': parameters['material_name'],
-            'density': parameters['density'],
-            'engineering_constants': parameters['engineering_constants']
-        }
-        start_topology_from = parameters['start_topology_from']
-        topologies_file_name = parameters['topologies_file_name']
-        topologies_key = parameters['topologies_key']
-        topologies = load_pickled_dict_data(topologies_file_name)[topologies_key]
-        gen_num = topologies_file_name.split('_')[-1]
-        for entity_num, topology in enumerate(topologies, start=1):
-            if entity_num < start_topology_from:
-                continue
-            run_analysis(model_name='{}-{}'.format(gen_num, entity_num), analysis_mode='compression',
-                         topo_arr=topology, voxel_unit_length=parameters['unit_l'], full=False, params=parameters,
-                         material_properties=material_property_definitions, voxel_name='voxel', cube_name='cube',
-                         displacement={'u1': 0, 'u2': parameters['dis_y'], 'u3': 0, 'ur1': 0, 'ur2': 0, 'ur3': 0})
-            send_log('Created Job{}-{}.odb'.format(gen_num, entity_num), socket_connection=client)
-        send_log('Generation {} finished!'.format(gen_num),
-                 socket_connection=client, end_generation=True)
+        if 'work_entities' in parameters:
+            if work_scheduler is None:
+                work_scheduler = create_job_scheduler(parameters=parameters, on_finished=report_work_item)
+            for work_entity in parameters['work_entities']:
+                work_request_ids['{}-{}'.format(parameters['generation'], work_entity)] = parameters.get('request_id')
+            submit_work_items(parameters=parameters, scheduler=work_scheduler)
+        else:
+            run_generation(parameters=parameters, client=client)
+    if work_scheduler is not None:
+        work_scheduler.wait_all()
+    template_models.close()
@@ -0,0 +1,292 @@
+import os
+import re
+import json
+import time
+import pickle
+import hashlib
+import sqlite3
+import numpy as np
+from contextlib import contextmanager
+from typing import Tuple, Union
+
+
+class RunDatabase:
+    """
+    A single SQLite file mirroring the finished generations of a GA run: topologies, field outputs, history outputs,
+    fitness values and pareto fronts. Rows are keyed by (gen, kind, entity), where kind is 'parent' or 'offspring'
+    and entity starts from 1, so appending a row and looking up an entity are both indexed operations.
+    Writes done inside transaction() are committed atomically, which makes the file safe to resume from after a crash.
+    The per-generation files ("Topologies_{gen}", "FieldOutput_{gen}", "FieldOutput_offspring_{gen}" ...) stay the
+    authoritative store: ABAQUS and local analyses append their per-entity outputs to them, and a generation is
+    mirrored here as a whole by NSGAModel.record_generation() after its selection. A run resumes at the generation
+    following the last mirrored one, from the first entity missing in "FieldOutput_offspring_{gen}".
+    """
+    _tables = {
+        'topologies': 'gen INTEGER, kind TEXT, entity INTEGER, shape TEXT, bits BLOB',
+        'field_outputs': 'gen INTEGER, kind TEXT, entity INTEGER, data BLOB',
+        'history_outputs': 'gen INTEGER, kind TEXT, entity INTEGER, data BLOB',
+        'fitness_values': 'gen INTEGER, kind TEXT, entity INTEGER, fitness_values BLOB',
+    }
+
+    def __init__(self, file_name: str = '_run_database_.sqlite3'):
+        self.file_name = file_name
+        self.connection = sqlite3.connect(file_name, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=FULL')
+        self._in_transaction = False
+        with self.transaction():
+            for table, columns in self._tables.items():
+                self.connection.execute(f'CREATE TABLE IF NOT EXISTS {table} '
+                                        f'({columns}, PRIMARY KEY (gen, kind, entity))')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS pareto_fronts '
+                                    '(gen INTEGER PRIMARY KEY, entity_indices BLOB, fitness_values BLOB, '
+                                    'number_of_objectives INTEGER)')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Group writes into one atomic transaction. Nested uses join the outermost transaction.
+        """
+        if self._in_transaction:
+            yield self.connection
+            return
+        self.connection.execute('BEGIN IMMEDIATE')
+        self._in_transaction = True
+        try:
+            yield self.connection
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        else:
+            self.connection.execute('COMMIT')
+        finally:
+            self._in_transaction = False
+
+    def put_topologies(self, gen: int, kind: str, topologies: np.ndarray, start_entity: int = 1) -> None:
+        """
+        :param gen: Generation number.
+        :param kind: 'parent' or 'offspring'
+        :param topologies: Topologies, shape: (number_of_entities, lx, ly, lz)
+        :param start_entity: Entity number of the first topology.
+        :return: None
+        """
+        rows = [(gen, kind, entity_num, ','.join(map(str, topology.shape)),
+                 np.packbits(np.asarray(topology) != 0, axis=None).tobytes())
+                for entity_num, topology in enumerate(topologies, start=start_entity)]
+        with self.transaction():
+            self.connection.executemany('INSERT OR REPLACE INTO topologies VALUES (?, ?, ?, ?, ?)', rows)
+
+    def get_topologies(self, gen: int, kind: str) -> Union[np.ndarray, None]:
+        """
+        :return: Topologies of uint8 ordered by entity number, shape: (number_of_entities, lx, ly, lz),
+        or None if nothing is stored.
+        """
+        rows = self.connection.execute('SELECT shape, bits FROM topologies WHERE gen=? AND kind=? ORDER BY entity',
+                                       (gen, kind)).fetchall()
+        if not rows:
+            return None
+        topologies = []
+        for shape, bits in rows:
+            shape = tuple(map(int, shape.split(',')))
+            topologies.append(np.unpackbits(np.frombuffer(bits, dtype=np.uint8))[:np.prod(shape)].reshape(shape))
+        return np.array(topologies)
+
+    def put_field_outputs(self, gen: int, kind: str, results: dict) -> None:
+        self._put_dicts('field_outputs', gen=gen, kind=kind, dicts=results)
+
+    def get_field_outputs(self, gen: int, kind: str) -> dict:
+        return self._get_dicts('field_outputs', gen=gen, kind=kind)
+
+    def put_history_outputs(self, gen: int, kind: str, history_outputs: dict) -> None:
+        self._put_dicts('history_outputs', gen=gen, kind=kind, dicts=history_outputs)
+
+    def get_history_outputs(self, gen: int, kind: str) -> dict:
+        return self._get_dicts('history_outputs', gen=gen, kind=kind)
+
+    def put_fitness_values(self, gen: int, kind: str, fitness_values: np.ndarray, start_entity: int = 1) -> None:
+        rows = [(gen, kind, entity_num, np.asarray(values, dtype=float).tobytes())
+                for entity_num, values in enumerate(fitness_values, start=start_entity)]
+        with self.transaction():
+            self.connection.executemany('INSERT OR REPLACE INTO fitness_values VALUES (?, ?, ?, ?)', rows)
+
+    def get_fitness_values(self, gen: int, kind: str) -> Union[np.ndarray, None]:
+        rows = self.connection.execute('SELECT fitness_values FROM fitness_values WHERE gen=? AND kind=? '
+                                       'ORDER BY entity', (gen, kind)).fetchall()
+        if not rows:
+            return None
+        return np.array([np.frombuffer(values, dtype=float) for values, in rows])
+
+    def put_pareto_front(self, gen: int, entity_indices: np.ndarray, fitness_values: np.ndarray) -> None:
+        """
+        :param gen: Generation number.
+        :param entity_indices: Indices of pareto front points among parent and offspring entities.
+        :param fitness_values: Fitness values of pareto front points, shape: (no_of_pareto_points x no_of_costs)
+        :return: None
+        """
+        fitness_values = np.asarray(fitness_values, dtype=float)
+        with self.transaction():
+            self.connection.execute('INSERT OR REPLACE INTO pareto_fronts VALUES (?, ?, ?, ?)',
+                                    (gen, np.asarray(entity_indices, dtype=np.int64).tobytes(),
+                                     fitness_values.tobytes(), fitness_values.shape[1]))
+
+    def get_pareto_fronts(self) -> dict:
+        """
+        :return: Dictionary of {gen: (entity_indices, fitness_values)}
+        """
+        return {gen: (np.frombuffer(entity_indices, dtype=np.int64),
+                      np.frombuffer(fitness_values, dtype=float).reshape((-1, number_of_objectives)))
+                for gen, entity_indices, fitness_values, number_of_objectives in self.connection.execute(
+                    'SELECT * FROM pareto_fronts ORDER BY gen')}
+
+    def generations(self, table: str = 'topologies', kind: str = 'parent') -> list:
+        return [gen for gen, in self.connection.execute(f'SELECT DISTINCT gen FROM {table} WHERE kind=? ORDER BY gen',
+                                                        (kind,))]
+
+    def entities(self, gen: int, kind: str, table: str = 'field_outputs') -> list:
+        return [entity for entity, in self.connection.execute(
+            f'SELECT entity FROM {table} WHERE gen=? AND kind=? ORDER BY entity', (gen, kind))]
+
+    def last_generation(self) -> Union[int, None]:
+        """
+        :return: The last generation whose parent topologies are stored, or None if the database is empty.
+        """
+        return self.connection.execute("SELECT MAX(gen) FROM topologies WHERE kind='parent'").fetchone()[0]
+
+    def import_run_files(self, path: str = '.') -> None:
+        """
+        Import a run made of per-generation pickle files ("Topologies_{gen}", "FieldOutput_{gen}",
+        "FieldOutput_offspring_{gen}" and "HistoryOutput_offspring_{gen}") in one transaction.
+        :param path: Run directory.
+        :return: None
+        """
+        from .FileIO import unpack_topologies, loads_pickle_or_records
+
+        def _load(file_name):
+            with open(os.path.join(path, file_name), mode='rb') as f:
+                return loads_pickle_or_records(f.read())
+
+        file_names = sorted(os.listdir(path))
+        with self.transaction():
+            for file_name in file_names:
+                match = re.fullmatch(r'(Topologies|FieldOutput|FieldOutput_offspring|HistoryOutput_offspring)_(\d+)',
+                                     file_name)
+                if match is None:
+                    continue
+                file_header, gen = match.group(1), int(match.group(2))
+                if file_header == 'Topologies':
+                    for kind, topologies in _load(file_name).items():
+                        self.put_topologies(gen=gen, kind=kind, topologies=unpack_topologies(topologies))
+                elif file_header == 'FieldOutput':
+                    self.put_field_outputs(gen=gen, kind='parent', results=_load(file_name))
+                elif file_header == 'FieldOutput_offspring':
+                    self.put_field_outputs(gen=gen, kind='offspring', results=_load(file_name))
+                else:
+                    self.put_history_outputs(gen=gen, kind='offspring', history_outputs=_load(file_name))
+
+    def _put_dicts(self, table: str, gen: int, kind: str, dicts: dict) -> None:
+        rows = [(gen, kind, int(entity_num), pickle.dumps(data, protocol=2)) for entity_num, data in dicts.items()]
+        with self.transaction():
+            self.connection.executemany(f'INSERT OR REPLACE INTO {table} VALUES (?, ?, ?, ?)', rows)
+
+    def _get_dicts(self, table: str, gen: int, kind: str) -> dict:
+        return {entity_num: pickle.loads(data) for entity_num, data in self.connection.execute(
+            f'SELECT entity, data FROM {table} WHERE gen=? AND kind=? ORDER BY entity', (gen, kind))}
+
+
+def physics_key(params_dict: dict, material_properties: dict, evaluation_backend: str = 'abaqus') -> str:
+    """
+    Digest of every setting that changes the outputs of an analysis, so that cached outputs are shared only between
+    runs with the same physics.
+    :param params_dict: Parameters as dictionary.
+    :param material_properties: Material property definitions.
+    :param evaluation_backend: 'abaqus' or 'voxel_fem'.
+    :return: Hexadecimal digest.
+    """
+    settings = {key: params_dict[key] for key in ('lx', 'ly', 'lz', 'unit_l', 'mesh_size', 'dis_y')}
+    settings.update({key: value for key, value in material_properties.items() if key != 'material_name'})
+    settings['evaluation_backend'] = evaluation_backend
+    return hashlib.sha256(json.dumps(settings, sort_keys=True, default=list).encode()).hexdigest()
+
+
+class EvaluationCache:
+    """
+    Content-addressed store of analysis outputs in a SQLite file, keyed by the topology fingerprint of
+    FileIO.topology_fingerprint() and the physics key of physics_key(). The file can be shared by runs and by
+    processes. The least recently used entries are evicted beyond max_entries.
+    Mirrored topologies are not merged, because their outputs swap between x and z.
+    """
+    def __init__(self, file_name: str = '_evaluation_cache_.sqlite3', max_entries: int = 100000):
+        self.file_name = file_name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(file_name, isolation_level=None, timeout=60)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS evaluations '
+                                '(fingerprint TEXT, physics TEXT, field_outputs BLOB, history_outputs BLOB, '
+                                'last_used REAL, PRIMARY KEY (fingerprint, physics))')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS evaluations_last_used ON evaluations (last_used)')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.connection.execute('SELECT COUNT(*) FROM evaluations').fetchone()[0]
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def get(self, topology: np.ndarray, physics: str) -> Union[Tuple[dict, Union[dict, None]], None]:
+        """
+        :param topology: Topology, shape: (lx, ly, lz)
+        :param physics: Physics key of the analysis.
+        :return: Field outputs and history outputs, or None if the topology is not cached.
+        """
+        from .FileIO import topology_fingerprint
+        fingerprint = topology_fingerprint(topology)
+        row = self.connection.execute('SELECT field_outputs, history_outputs FROM evaluations '
+                                      'WHERE fingerprint=? AND physics=?', (fingerprint, physics)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.connection.execute('UPDATE evaluations SET last_used=? WHERE fingerprint=? AND physics=?',
+                                (time.time(), fingerprint, physics))
+        return pickle.loads(row[0]), None if row[1] is None else pickle.loads(row[1])
+
+    def put(self, topology: np.ndarray, physics: str, field_outputs: dict,
+            history_outputs: Union[dict, None] = None) -> None:
+        """
+        Store outputs of a topology, evicting the least recently used entries beyond max_entries.
+        :param topology: Topology, shape: (lx, ly, lz)
+        :param physics: Physics key of the analysis.
+        :param field_outputs: Field outputs of the topology.
+        :param history_outputs: History outputs of the topology.
+        :return: None
+        """
+        from .FileIO import topology_fingerprint
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            self.connection.execute('INSERT OR REPLACE INTO evaluations VALUES (?, ?, ?, ?, ?)',
+                                    (topology_fingerprint(topology), physics, pickle.dumps(field_outputs, protocol=2),
+                                     None if history_outputs is None else pickle.dumps(history_outputs, protocol=2),
+                                     time.time()))
+            self.connection.execute('DELETE FROM evaluations WHERE rowid IN (SELECT rowid FROM evaluations '
+                                    'ORDER BY last_used DESC LIMIT -1 OFFSET ?)', (self.max_entries,))
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        else:
+            self.connection.execute('COMMIT')
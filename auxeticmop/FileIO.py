@@ -1,10 +1,14 @@
 import os
 import pickle
+import struct
+import zlib
 import asyncio
+import hashlib
+import json
 import aiofiles
 import numpy as np
 import re
-from typing import Union
+from typing import Union, Iterable
 
 
 def remove_file(file_name: str) -> None:
@@ -33,48 +37,452 @@ def find_job_location_from_offspring(params_dict):
     from .PostProcessing import evaluate_all_fitness_values, find_pareto_front_points
     from .ParameterDefinitions import fitness_definitions
 
-    def _find_job_location_from_offspring(g, prt_idx, tp_offs, tp_prt, tp_pf):
-        arg = np.argwhere(np.all(tp_offs == tp_prt, axis=(2,)))
-        if len(arg) == 0:
-            arg = np.argwhere(np.all(tp_pf == tp_prt, axis=(1,)))
-            print(f'Pareto topo in parent {g} - {prt_idx + 1} is in parent ', 1, '-', arg[0, 0] + 1)
-        else:
-            print(f'Pareto topo in parent {g} - {prt_idx + 1} is in offspring ', arg[0, 0] + 1, '-',
-                  arg[0, 1] + 1)
-
-    file_headers = ('Topologies', 'FieldOutput_offspring', 'FieldOutput')
-    topo_parent, topo_offspring, result_parent, result_offspring = None, None, dict(), dict()
-    for file_header in file_headers:
-        file_numbers = get_sorted_file_numbers_from_pattern(rf'{file_header}_\d+')
-        file_names = [f'{file_header}_{file_number}' for file_number in file_numbers]
-        loaded_dict = asyncio.run(pickles_aio(file_names, mode='r', key_option='int'))
-        for gen_num in loaded_dict.keys():
-            if 'parent' in loaded_dict[gen_num]:
-                if topo_parent is None:
-                    topo_parent = np.expand_dims(loaded_dict[gen_num]['parent'], axis=0)
-                else:
-                    topo_parent = np.vstack((topo_parent, np.expand_dims(loaded_dict[gen_num]['parent'], axis=0)))
-            if 'offspring' in loaded_dict[gen_num]:
-                if topo_offspring is None:
-                    topo_offspring = np.expand_dims(loaded_dict[gen_num]['offspring'], axis=0)
-                else:
-                    topo_offspring = np.vstack(
-                        (topo_offspring, np.expand_dims(loaded_dict[gen_num]['offspring'], axis=0)))
-            else:
-                if file_header == 'FieldOutput':
-                    result_parent.update({gen_num: loaded_dict[gen_num]})
-                elif file_header == 'FieldOutput_offspring':
-                    result_offspring.update({gen_num: loaded_dict[gen_num]})
-    for gen in get_sorted_file_numbers_from_pattern(r'FieldOutput_\d+'):
+    def _find_job_location_from_offspring(g, prt_idx, archive_offs, tp_prt, tp_pf):
+        for offspring_gen in archive_offs.generations:  # One generation in memory at a time
+            arg = np.argwhere(np.all(archive_offs[offspring_gen] == tp_prt, axis=(1, 2, 3)))
+            if len(arg) > 0:
+                print(f'Pareto topo in parent {g} - {prt_idx + 1} is in offspring ', offspring_gen, '-',
+                      arg[0, 0] + 1)
+                return
+        arg = np.argwhere(np.all(tp_pf == tp_prt, axis=(1, 2, 3)))
+        print(f'Pareto topo in parent {g} - {prt_idx + 1} is in parent ', 1, '-', arg[0, 0] + 1)
+
+    topology_generations = get_sorted_file_numbers_from_pattern(r'Topologies_\d+')
+    topo_parent, topo_offspring = TopologyArchive(kind='parent'), TopologyArchive(kind='offspring')
+    topo_parent.update_from_files(topology_generations)
+    topo_offspring.update_from_files(topology_generations)
+    file_numbers = get_sorted_file_numbers_from_pattern(r'FieldOutput_\d+')
+    result_parent = asyncio.run(pickles_aio([f'FieldOutput_{file_number}' for file_number in file_numbers],
+                                            mode='r', key_option='int'))
+    for gen in file_numbers:
         fit_vals = evaluate_all_fitness_values(params_dict=params_dict, results=result_parent[gen],
-                                               topologies=topo_parent[gen - 1], fitness_definitions=fitness_definitions)
+                                               topologies=topo_parent[gen], fitness_definitions=fitness_definitions)
         pareto_indices = find_pareto_front_points(costs=fit_vals, return_index=True)
         print(f'\n>>> Parent {gen} <<<')
         print('Pareto topos: ', pareto_indices + 1)
         for pareto_index in pareto_indices:
-            topo_pareto = topo_parent[gen - 1][pareto_index]
-            _find_job_location_from_offspring(g=gen, prt_idx=pareto_index, tp_offs=topo_offspring,
-                                              tp_prt=topo_pareto, tp_pf=topo_parent[0])
+            topo_pareto = topo_parent[gen][pareto_index]
+            _find_job_location_from_offspring(g=gen, prt_idx=pareto_index, archive_offs=topo_offspring,
+                                              tp_prt=topo_pareto, tp_pf=topo_parent[1])
+
+
+PACKED_TOPOLOGIES_KEY = '__packed_topologies__'
+
+
+def pack_topologies(topologies: np.ndarray) -> dict:
+    """
+    Pack binary voxel topologies into 1 bit per voxel. The container is a plain dict of builtin types, so it can be
+    pickled with protocol 2 and unpacked by ABAQUS-side Python 2 scripts without this package.
+    :param topologies: Array of binary voxels of any shape, e.g. (end_pop, lx, ly, lz)
+    :return: A dictionary containing shape header and packed bits.
+    """
+    topologies = np.asarray(topologies)
+    if not np.isin(topologies, (0, 1)).all():
+        raise ValueError('Only binary topologies can be packed')
+    return {PACKED_TOPOLOGIES_KEY: 1, 'shape': tuple(int(dim) for dim in topologies.shape),
+            'bits': np.packbits(topologies.astype(np.uint8), axis=None).tobytes()}
+
+
+def is_packed_topologies(obj: object) -> bool:
+    return isinstance(obj, dict) and PACKED_TOPOLOGIES_KEY in obj
+
+
+def unpack_topologies(obj: Union[dict, np.ndarray]) -> np.ndarray:
+    """
+    Unpack topologies packed by pack_topologies. Any other object is returned as it is.
+    :param obj: Packed topologies or an array.
+    :return: Array of uint8 voxels.
+    """
+    if not is_packed_topologies(obj):
+        return obj
+    shape = tuple(obj['shape'])
+    size = int(np.prod(shape, dtype=np.int64))
+    return np.unpackbits(np.frombuffer(obj['bits'], dtype=np.uint8))[:size].reshape(shape)
+
+
+def migrate_topology_files(path: str = '.') -> int:
+    """
+    Rewrite every "Topologies_{gen}" file in a run directory written by older versions, packing its topologies.
+    Each file is replaced atomically after checking that unpacking reproduces the original voxels.
+    :param path: Run directory.
+    :return: Number of rewritten files.
+    """
+    migrated_files = 0
+    for file_name in sorted(f for f in os.listdir(path) if re.fullmatch(r'Topologies_\d+', f)):
+        file_path = os.path.join(path, file_name)
+        with open(file_path, mode='rb') as f:
+            loaded = loads_pickle_or_records(f.read())
+        if all(is_packed_topologies(value) for value in loaded.values()):
+            continue
+        packed = {key: value if is_packed_topologies(value) else pack_topologies(value)
+                  for key, value in loaded.items()}
+        for key, value in loaded.items():
+            assert np.array_equal(unpack_topologies(packed[key]), unpack_topologies(value))
+        with open(file_path + '.tmp', mode='wb') as f:
+            pickle.dump(packed, f, protocol=2)
+        os.replace(file_path + '.tmp', file_path)
+        migrated_files += 1
+        print(file_name, 'migrated!')
+    return migrated_files
+
+
+def topology_fingerprint(topology: np.ndarray, canonical: bool = False) -> str:
+    """
+    Fingerprint of a voxel topology: blake2b digest of its shape and packed bits.
+    :param topology: Topology array, shape: (lx, ly, lz)
+    :param canonical: If True, a topology and its x-z transposition have the same fingerprint. The full cell made by
+    quaver_to_full is symmetric under exchanging x and z, so both quavers describe the same structure under
+    y-compression when the material is also symmetric in x and z.
+    :return: Hexadecimal digest.
+    """
+    voxels = np.asarray(topology) != 0
+
+    def _digest(arr: np.ndarray) -> str:
+        header = ','.join(map(str, arr.shape)).encode()
+        return hashlib.blake2b(header + b':' + np.packbits(arr, axis=None).tobytes(), digest_size=16).hexdigest()
+
+    if canonical and voxels.shape[0] == voxels.shape[2]:
+        return min(_digest(voxels), _digest(np.swapaxes(voxels, 0, 2)))
+    return _digest(voxels)
+
+
+def file_signature(file_name: str) -> Union[str, None]:
+    """
+    Cheap signature of a file, to skip loading files which have not changed since they were last read.
+    :param file_name: Name of a file.
+    :return: "<size>:<mtime in ns>" of the file, or None if it does not exist.
+    """
+    if not os.path.isfile(file_name):
+        return None
+    stat = os.stat(file_name)
+    return f'{stat.st_size}:{stat.st_mtime_ns}'
+
+
+class TopologyIndex:
+    """
+    Persistent set of fingerprints of parent topologies of every generation, used to detect clones in O(1).
+    Stored next to the run as lines of "<generation> <fingerprint>", appended whenever a generation is indexed and
+    terminated by "<generation> - <digest>", where the digest is topology_fingerprint() of the whole parent array.
+    Offspring appended to "Topologies_{gen}" leave the digest unchanged, and a generation is indexed again only if its
+    parents differ, e.g. after a restart rewrote them. Then the index file is rewritten atomically.
+    """
+    def __init__(self, file_name: str = '_topology_index_', canonical: bool = False):
+        self.file_name = file_name
+        self.canonical = canonical
+        self.fingerprints = set()
+        self.indexed_generations = dict()  # Generation -> digest of its parents
+        self.generation_fingerprints = dict()
+        self._checked_files = dict()  # Generation -> file_signature() of "Topologies_{gen}" when its digest matched
+        self._header = f'# canonical={int(canonical)}\n'
+        if os.path.isfile(file_name):
+            with open(file_name, mode='r') as f:
+                lines = f.readlines()
+            if lines and lines[0] == self._header:
+                pending_fingerprints = list()
+                n_complete_lines = 1
+                for line_idx, line in enumerate(lines[1:], start=1):
+                    if not line.endswith('\n'):  # Interrupted while appending
+                        break
+                    gen, fingerprint, *digest = line.split()
+                    if fingerprint == '-':  # Generation completely written
+                        self.generation_fingerprints[int(gen)] = pending_fingerprints
+                        self.indexed_generations[int(gen)] = digest[0] if digest else None
+                        pending_fingerprints = list()
+                        n_complete_lines = line_idx + 1
+                    else:
+                        pending_fingerprints.append(fingerprint)
+                for fingerprints in self.generation_fingerprints.values():
+                    self.fingerprints.update(fingerprints)
+                if n_complete_lines < len(lines):  # Discard lines of a generation without its terminator
+                    self._rewrite()
+                return
+        self._rewrite()
+
+    def __contains__(self, topology: np.ndarray) -> bool:
+        return self.fingerprint(topology) in self.fingerprints
+
+    def __len__(self) -> int:
+        return len(self.fingerprints)
+
+    def fingerprint(self, topology: np.ndarray) -> str:
+        return topology_fingerprint(topology, canonical=self.canonical)
+
+    @staticmethod
+    def _lines_of(gen: int, fingerprints: list, digest: Union[str, None]) -> str:
+        terminator = '-' if digest is None else f'- {digest}'
+        return ''.join(f'{gen} {fingerprint}\n' for fingerprint in fingerprints + [terminator])
+
+    def _rewrite(self) -> None:
+        with open(f'{self.file_name}.tmp', mode='w') as f:
+            f.write(self._header + ''.join(self._lines_of(gen, fingerprints, self.indexed_generations[gen])
+                                           for gen, fingerprints in sorted(self.generation_fingerprints.items())))
+        os.replace(f'{self.file_name}.tmp', self.file_name)
+
+    def add_generation(self, gen: int, topologies: np.ndarray, digest: str = None) -> None:
+        """
+        Add parent topologies of a generation to the index and append them to the index file. If the generation is
+        indexed already, its fingerprints are replaced and the index file is rewritten instead.
+        :param gen: Generation number of topologies.
+        :param topologies: Parent topologies, shape: (end_pop, lx, ly, lz)
+        :param digest: topology_fingerprint() of topologies. If None, it is computed.
+        :return: None
+        """
+        fingerprints = [self.fingerprint(topology) for topology in topologies]
+        is_reindexed = gen in self.generation_fingerprints
+        self.generation_fingerprints[gen] = fingerprints
+        self.indexed_generations[gen] = topology_fingerprint(topologies) if digest is None else digest
+        if is_reindexed:
+            self._rewrite()
+            self.fingerprints = set().union(*self.generation_fingerprints.values())
+        else:
+            with open(self.file_name, mode='a') as f:
+                f.write(self._lines_of(gen, fingerprints, self.indexed_generations[gen]))
+            self.fingerprints.update(fingerprints)
+
+    def update_from_files(self, generations: Iterable[int]) -> None:
+        """
+        Index parent topologies of the generations not indexed yet or whose parents changed since they were indexed.
+        A "Topologies_{gen}" file is loaded once per process, and again only when its size or mtime changes.
+        :param generations: Generation numbers to be indexed.
+        :return: None
+        """
+        for gen in generations:
+            file_name = f'Topologies_{gen}'
+            signature = file_signature(file_name)
+            if gen in self.indexed_generations and self._checked_files.get(gen) == signature:
+                continue
+            parents = pickle_io(file_name, mode='r')['parent']
+            digest = topology_fingerprint(parents)
+            if self.indexed_generations.get(gen, digest) != digest:
+                print(f'<info> Parents in {file_name} changed since they were indexed, indexing them again')
+            if self.indexed_generations.get(gen) != digest:
+                self.add_generation(gen, parents, digest=digest)
+            self._checked_files[gen] = signature
+
+
+class TopologyArchive:
+    """
+    Topologies of every generation in one contiguous uint8 array of shape (gen, entity, lx, ly, lz) on disk, opened
+    with np.memmap so that history can be sliced without deserializing "Topologies_{gen}" files.
+    The sidecar "<file_name>.json" holds the shape, the allocated capacity of generations, and the number of entities
+    and topology_fingerprint() digest of each generation. The data file grows by doubling its capacity, and the
+    sidecar is rewritten only after the data of a generation is flushed, so a generation listed in it is always
+    complete. A generation whose topologies in "Topologies_{gen}" differ from the digest is archived again, e.g.
+    offspring of a steady-state or interrupted generation completed later.
+    """
+    def __init__(self, file_name: str = '_topology_archive_', kind: str = 'parent', initial_capacity: int = 16):
+        self.file_name = f'{file_name}{kind}'
+        self.index_file_name = f'{self.file_name}.json'
+        self.kind = kind
+        self.initial_capacity = initial_capacity
+        self.entity_shape = None
+        self.capacity = 0
+        self.counts = dict()
+        self.digests = dict()
+        self._checked_files = dict()  # Generation -> file_signature() of "Topologies_{gen}" when its digest matched
+        self.array = None
+        if os.path.isfile(self.index_file_name) and os.path.isfile(self.file_name):
+            with open(self.index_file_name, mode='r') as f:
+                index = json.load(f)
+            self.entity_shape = tuple(index['shape'])
+            self.capacity = index['capacity']
+            self.counts = {int(gen): count for gen, count in index['counts'].items()}
+            self.digests = {int(gen): digest for gen, digest in index.get('digests', dict()).items()}
+            self.array = np.memmap(self.file_name, dtype=np.uint8, mode='r+', shape=(self.capacity, *self.entity_shape))
+
+    def __contains__(self, gen: int) -> bool:
+        return gen in self.counts
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def __getitem__(self, gen: int) -> np.ndarray:
+        """
+        :param gen: Generation number, starting from 1.
+        :return: Memory-mapped view of the topologies of the generation, shape: (entity, lx, ly, lz)
+        """
+        if gen not in self.counts:
+            raise KeyError(f'Generation {gen} is not archived in {self.file_name}')
+        return self.array[gen - 1, :self.counts[gen]]
+
+    @property
+    def generations(self) -> list:
+        return sorted(self.counts)
+
+    def history(self, last_gen: int = None) -> np.ndarray:
+        """
+        :param last_gen: Last generation of history. If None, the last archived generation is used.
+        :return: Memory-mapped view of the generations from 1 to last_gen, shape: (last_gen, entity, lx, ly, lz).
+        Entities beyond the count of a generation are zero-filled.
+        """
+        if last_gen is None:
+            last_gen = max(self.counts, default=0)
+        return self.array[:last_gen] if self.array is not None else np.empty((0,), dtype=np.uint8)
+
+    def _allocate(self, capacity: int) -> None:
+        with open(self.file_name, mode='ab') as f:
+            f.truncate(capacity * int(np.prod(self.entity_shape)))
+        self.capacity = capacity
+        self.array = np.memmap(self.file_name, dtype=np.uint8, mode='r+', shape=(self.capacity, *self.entity_shape))
+
+    def _resize_entities(self, n_entities: int) -> None:
+        # Copy archived generations into a data file of more entities per generation, one generation at a time
+        entity_shape = (n_entities, *self.entity_shape[1:])
+        resized = np.memmap(f'{self.file_name}.tmp', dtype=np.uint8, mode='w+', shape=(self.capacity, *entity_shape))
+        for gen, count in self.counts.items():
+            resized[gen - 1, :count] = self.array[gen - 1, :count]
+        resized.flush()
+        del resized
+        self.array = None
+        os.replace(f'{self.file_name}.tmp', self.file_name)
+        self.entity_shape = entity_shape
+        self.array = np.memmap(self.file_name, dtype=np.uint8, mode='r+', shape=(self.capacity, *self.entity_shape))
+        self._write_index()
+
+    def _write_index(self) -> None:
+        with open(f'{self.index_file_name}.tmp', mode='w') as f:
+            json.dump({'shape': list(self.entity_shape), 'capacity': self.capacity,
+                       'counts': {str(gen): count for gen, count in sorted(self.counts.items())},
+                       'digests': {str(gen): digest for gen, digest in sorted(self.digests.items())}}, f)
+        os.replace(f'{self.index_file_name}.tmp', self.index_file_name)
+
+    def add_generation(self, gen: int, topologies: np.ndarray, digest: str = None) -> None:
+        """
+        Write topologies of a generation into its slot, growing the data file if needed. An archived generation is
+        overwritten.
+        :param gen: Generation number of topologies, starting from 1.
+        :param topologies: Topologies of the generation, shape: (entity, lx, ly, lz)
+        :param digest: topology_fingerprint() of topologies. If None, it is computed.
+        :return: None
+        """
+        topologies = unpack_topologies(topologies)
+        if self.entity_shape is None:
+            remove_file(self.file_name)
+            self.entity_shape = topologies.shape
+            self._allocate(max(self.initial_capacity, gen))
+        elif topologies.shape[1:] != self.entity_shape[1:]:
+            raise ValueError(f'Topologies of shape {topologies.shape} do not fit in archive of {self.entity_shape}')
+        elif len(topologies) > self.entity_shape[0]:  # The first archived generation was partial
+            self._resize_entities(len(topologies))
+        if gen > self.capacity:
+            self._allocate(max(2 * self.capacity, gen))
+        self.array[gen - 1, :len(topologies)] = topologies
+        self.array[gen - 1, len(topologies):] = 0
+        self.array.flush()
+        self.counts[gen] = len(topologies)
+        self.digests[gen] = topology_fingerprint(topologies) if digest is None else digest
+        self._write_index()
+
+    def update_from_files(self, generations: Iterable[int]) -> None:
+        """
+        Archive topologies of the generations not archived yet or changed since they were archived. A
+        "Topologies_{gen}" file is loaded once per process, and again only when its size or mtime changes.
+        :param generations: Generation numbers to be archived.
+        :return: None
+        """
+        for gen in generations:
+            file_name = f'Topologies_{gen}'
+            signature = file_signature(file_name)
+            if signature is None or (gen in self.counts and self._checked_files.get(gen) == signature):
+                continue
+            loaded = pickle_io(file_name, mode='r')
+            if self.kind in loaded:
+                digest = topology_fingerprint(loaded[self.kind])
+                if self.digests.get(gen) != digest:
+                    self.add_generation(gen, loaded[self.kind], digest=digest)
+                self._checked_files[gen] = signature
+
+
+RECORD_MAGIC = b'AXR1'
+_record_header = struct.Struct('>4sII')  # magic, payload size, crc32 of payload
+
+
+def loads_pickle_or_records(serialized: bytes, encoding: str = 'latin1') -> any:
+    """
+    Deserialize either a single pickle, or a file of pickled records appended by ABAQUS-side
+    dump_pickled_dict_data(). Each record is a pickled dictionary framed by RECORD_MAGIC, payload size and crc32,
+    and records are merged in order so that a later record of the same key wins. A record cut short by a crash
+    while appending is dropped.
+    :param serialized: Content of a file.
+    :param encoding: Encoding of pickle.loads()
+    :return: Deserialized object, or merged dictionary of records.
+    """
+    if serialized[:len(RECORD_MAGIC)] != RECORD_MAGIC:
+        return pickle.loads(serialized, encoding=encoding)
+    merged = dict()
+    offset = 0
+    while offset < len(serialized):
+        if offset + _record_header.size > len(serialized):
+            print('<!> Incomplete record header dropped')
+            break
+        magic, payload_size, checksum = _record_header.unpack_from(serialized, offset)
+        payload = serialized[offset + _record_header.size:offset + _record_header.size + payload_size]
+        if magic != RECORD_MAGIC or len(payload) != payload_size or zlib.crc32(payload) & 0xffffffff != checksum:
+            print('<!> Incomplete or corrupted record dropped')
+            break
+        merged.update(pickle.loads(payload, encoding=encoding))
+        offset += _record_header.size + payload_size
+    return merged
+
+
+def frame_record(dict_data: dict) -> bytes:
+    payload = pickle.dumps(dict_data, protocol=2)
+    return _record_header.pack(RECORD_MAGIC, len(payload), zlib.crc32(payload) & 0xffffffff) + payload
+
+
+def valid_records_size(serialized: bytes) -> int:
+    """
+    :param serialized: Content of a record file.
+    :return: Size of the complete and intact records at the head of serialized.
+    """
+    offset = 0
+    while offset + _record_header.size <= len(serialized):
+        magic, payload_size, checksum = _record_header.unpack_from(serialized, offset)
+        payload = serialized[offset + _record_header.size:offset + _record_header.size + payload_size]
+        if magic != RECORD_MAGIC or len(payload) != payload_size or zlib.crc32(payload) & 0xffffffff != checksum:
+            break
+        offset += _record_header.size + payload_size
+    return offset
+
+
+_repaired_record_files = set()
+
+
+def append_record(file_name: str, to_dump: dict, fsync: bool = True) -> None:
+    """
+    Append to_dump to file_name as one framed record, the host-side counterpart of ABAQUS-side
+    dump_pickled_dict_data() with mode 'a'. Previous records are neither read nor rewritten, and the file is read
+    back by loads_pickle_or_records(). A file of a single pickle is converted to records atomically once, and a
+    record torn by a crash is cut off once per file in this process before appending.
+    :param file_name: Name of the file.
+    :param to_dump: Dictionary to merge into the file, e.g. {entity number: outputs}
+    :param fsync: If True, data is flushed to the disk before returning.
+    :return: None
+    """
+    if os.path.isfile(file_name):
+        with open(file_name, mode='rb') as f:
+            is_record_file = f.read(len(RECORD_MAGIC)) == RECORD_MAGIC
+        if not is_record_file:  # Convert a file of a single pickle to records once
+            with open(file_name, mode='rb') as f:
+                dict_data = pickle.load(f, encoding='latin1')
+            with open(f'{file_name}.tmp', mode='wb') as f:
+                f.write(frame_record(dict_data))
+                f.flush()
+                if fsync:
+                    os.fsync(f.fileno())
+            os.replace(f'{file_name}.tmp', file_name)
+        elif file_name not in _repaired_record_files:
+            with open(file_name, mode='rb') as f:
+                serialized = f.read()
+            if valid_records_size(serialized) < len(serialized):
+                with open(file_name, mode='r+b') as f:
+                    f.truncate(valid_records_size(serialized))
+        _repaired_record_files.add(file_name)
+    with open(file_name, mode='ab') as f:
+        f.write(frame_record(to_dump))
+        f.flush()
+        if fsync:
+            os.fsync(f.fileno())
 
 
 # def dump_pickled_dict_data(file_name: str, key: object, to_dump: object, mode: str) -> None:
@@ -100,11 +508,14 @@ async def pickle_aio(file_name: str, mode: str, to_dump: Union[dict, list, np.nd
         async with aiofiles.open(file_name, mode='rb') as f:
             serialized_pickle = await f.read()
         print(file_name, 'loaded!')
-        return pickle.loads(serialized_pickle, encoding=encoding)
+        loaded = loads_pickle_or_records(serialized_pickle, encoding=encoding)
+        if isinstance(loaded, dict):
+            loaded = {key: unpack_topologies(value) for key, value in loaded.items()}
+        return unpack_topologies(loaded)
     elif mode == 'a' and os.path.isfile(file_name):
         async with aiofiles.open(file_name, mode='rb') as f:
             serialized_pickle = await f.read()
-        loaded = pickle.loads(serialized_pickle, encoding=encoding)
+        loaded = loads_pickle_or_records(serialized_pickle, encoding=encoding)
         if isinstance(loaded, dict):
             loaded.update(to_dump)
         elif isinstance(loaded, list):
@@ -0,0 +1,197 @@
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import cg, LinearOperator
+from typing import Tuple, Union
+try:
+    import pyamg
+except ImportError:
+    pyamg = None
+
+
+# Corners of a hexahedral element in the node order of C3D8, as offsets of voxel grid indices
+HEX_NODE_OFFSETS = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0],
+                             [0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1]])
+_gauss_point = 1 / np.sqrt(3)
+
+
+def orthotropic_elasticity_matrix(engineering_constants: Union[tuple, list]) -> np.ndarray:
+    """
+    Elasticity matrix of an orthotropic material, in Voigt order (11, 22, 33, 12, 13, 23) with engineering shear
+    strains as ABAQUS uses.
+    :param engineering_constants: E1, E2, E3, Nu12, Nu13, Nu23, G12, G13, G23, as the table of ENGINEERING_CONSTANTS.
+    :return: Elasticity matrix, shape: (6, 6)
+    """
+    e1, e2, e3, nu12, nu13, nu23, g12, g13, g23 = map(float, engineering_constants)
+    compliance = np.zeros((6, 6))
+    compliance[:3, :3] = [[1 / e1, -nu12 / e1, -nu13 / e1],
+                          [-nu12 / e1, 1 / e2, -nu23 / e2],
+                          [-nu13 / e1, -nu23 / e2, 1 / e3]]
+    compliance[3:, 3:] = np.diag([1 / g12, 1 / g13, 1 / g23])
+    return np.linalg.inv(compliance)
+
+
+def hexahedron_strain_displacement_matrices(size: float) -> np.ndarray:
+    """
+    Strain-displacement matrices of a cubic 8-node element at its 2x2x2 Gauss points.
+    :param size: Edge length of the element.
+    :return: B matrices, shape: (8, 6, 24)
+    """
+    corners = 2 * HEX_NODE_OFFSETS - 1
+    b_matrices = np.zeros((8, 6, 24))
+    for gauss_idx, gauss_point in enumerate(corners * _gauss_point):
+        # Derivatives of trilinear shape functions, d(xi)/dx = 2 / size for a cube
+        dn = np.empty((8, 3))
+        for axis in range(3):
+            other_axes = [other_axis for other_axis in range(3) if other_axis != axis]
+            dn[:, axis] = corners[:, axis] * np.prod(1 + corners[:, other_axes] * gauss_point[other_axes], axis=1)
+        dn *= 2 / size / 8
+        b = b_matrices[gauss_idx]
+        b[0, 0::3], b[1, 1::3], b[2, 2::3] = dn[:, 0], dn[:, 1], dn[:, 2]
+        b[3, 0::3], b[3, 1::3] = dn[:, 1], dn[:, 0]
+        b[4, 0::3], b[4, 2::3] = dn[:, 2], dn[:, 0]
+        b[5, 1::3], b[5, 2::3] = dn[:, 2], dn[:, 1]
+    return b_matrices
+
+
+def hexahedron_stiffness_matrix(d_matrix: np.ndarray, size: float) -> np.ndarray:
+    """
+    Stiffness matrix of a cubic 8-node element with full integration, shared by every voxel.
+    :param d_matrix: Elasticity matrix, shape: (6, 6)
+    :param size: Edge length of the element.
+    :return: Element stiffness matrix, shape: (24, 24)
+    """
+    b_matrices = hexahedron_strain_displacement_matrices(size)
+    weight = (size / 2) ** 3  # Jacobian determinant, Gauss weights are 1
+    return weight * np.einsum('gki,kl,glj->ij', b_matrices, d_matrix, b_matrices)
+
+
+def voxel_mesh(topology: np.ndarray) -> Tuple[np.ndarray, Tuple[int, int, int]]:
+    """
+    Element connectivity of solid voxels on the grid of nodes (lx + 1, ly + 1, lz + 1).
+    :param topology: Voxel array, shape: (lx, ly, lz)
+    :return: Global node numbers of every element, shape: (elements, 8), and the shape of the node grid.
+    """
+    node_grid_shape = tuple(length + 1 for length in topology.shape)
+    voxel_indices = np.argwhere(topology)
+    element_node_indices = voxel_indices[:, np.newaxis, :] + HEX_NODE_OFFSETS[np.newaxis, :, :]
+    element_nodes = np.ravel_multi_index(tuple(np.moveaxis(element_node_indices, -1, 0)), node_grid_shape)
+    return element_nodes, node_grid_shape
+
+
+def assemble_stiffness_matrix(element_nodes: np.ndarray, ke: np.ndarray, n_nodes: int) -> sparse.csr_matrix:
+    """
+    Vectorized assembly of the global stiffness matrix from a shared element stiffness matrix.
+    :param element_nodes: Global node numbers of every element, shape: (elements, 8)
+    :param ke: Element stiffness matrix, shape: (24, 24)
+    :param n_nodes: Number of nodes of the grid.
+    :return: Global stiffness matrix, shape: (3 * n_nodes, 3 * n_nodes)
+    """
+    element_dofs = (3 * element_nodes[:, :, np.newaxis] + np.arange(3)).reshape(len(element_nodes), 24)
+    rows = np.repeat(element_dofs, 24, axis=1).ravel()
+    cols = np.tile(element_dofs, (1, 24)).ravel()
+    data = np.tile(ke.ravel(), len(element_nodes))
+    return sparse.coo_matrix((data, (rows, cols)), shape=(3 * n_nodes, 3 * n_nodes)).tocsr()
+
+
+def solve_linear_system(k: sparse.csr_matrix, f: np.ndarray, tol: float = 1e-8,
+                        use_amg: Union[bool, None] = None) -> np.ndarray:
+    """
+    Solve K u = f of a symmetric positive definite system by preconditioned conjugate gradients.
+    :param k: Stiffness matrix.
+    :param f: Force vector.
+    :param tol: Relative residual tolerance.
+    :param use_amg: If True, pyamg smoothed aggregation is used as preconditioner, otherwise Jacobi.
+    If None, pyamg is used when installed.
+    :return: Solution vector.
+    """
+    if use_amg is None:
+        use_amg = pyamg is not None
+    if use_amg:
+        if pyamg is None:
+            raise ImportError('pyamg is required for use_amg=True')
+        preconditioner = pyamg.smoothed_aggregation_solver(k, symmetry='symmetric').aspreconditioner(cycle='V')
+    else:
+        inverse_diagonal = 1 / k.diagonal()
+        preconditioner = LinearOperator(k.shape, matvec=lambda x: inverse_diagonal * x.ravel())
+    try:
+        u, info = cg(k, f, rtol=tol, atol=0., M=preconditioner, maxiter=10 * k.shape[0])
+    except TypeError:  # scipy < 1.12
+        u, info = cg(k, f, tol=tol, atol=0., M=preconditioner, maxiter=10 * k.shape[0])
+    if info != 0:
+        print(f'<!> Conjugate gradient did not converge, info: {info}')
+    return u
+
+
+def von_mises(stresses: np.ndarray) -> np.ndarray:
+    s11, s22, s33, s12, s13, s23 = np.moveaxis(stresses, -1, 0)
+    return np.sqrt(0.5 * ((s11 - s22) ** 2 + (s22 - s33) ** 2 + (s33 - s11) ** 2)
+                   + 3 * (s12 ** 2 + s13 ** 2 + s23 ** 2))
+
+
+def run_voxel_analysis(topology: np.ndarray, unit_l: float, dis_y: float, engineering_constants: Union[tuple, list],
+                       mesh_size: float = None, tol: float = 1e-8,
+                       use_amg: Union[bool, None] = None) -> Tuple[dict, dict]:
+    """
+    Linear elastic compression of a voxel topology with C3D8 elements, the local counterpart of run_analysis() of
+    AbaqusScripts.py. Minimum faces have symmetry conditions, and the nodes of yMax face move by (0, dis_y, 0) as the
+    kinematic coupling to RP-y does. Self contact is not modelled, and elements are fully integrated while ABAQUS
+    defaults to C3D8R, so values differ slightly from ABAQUS.
+    :param topology: Voxel array, shape: (lx, ly, lz)
+    :param unit_l: Voxel length.
+    :param dis_y: Displacement of yMax face in y-direction, as Parameters.dis_y after post_initialize().
+    :param engineering_constants: E1, E2, E3, Nu12, Nu13, Nu23, G12, G13, G23.
+    :param mesh_size: Element size, as Parameters.mesh_size after post_initialize(). Voxels are divided into
+    round(unit_l / mesh_size) elements per edge. If None, one element per voxel.
+    :param tol: Relative residual tolerance of conjugate gradients.
+    :param use_amg: Preconditioner option of solve_linear_system().
+    :return: Field outputs in the layout of exported_field_outputs and history outputs of the step.
+    """
+    division = 1 if mesh_size is None else max(1, int(round(unit_l / mesh_size)))
+    topology = np.asarray(topology, dtype=bool)
+    for axis in range(3):
+        topology = np.repeat(topology, division, axis=axis)
+    size = unit_l / division
+    d_matrix = orthotropic_elasticity_matrix(engineering_constants)
+    element_nodes, node_grid_shape = voxel_mesh(topology)
+    n_nodes = int(np.prod(node_grid_shape))
+    k = assemble_stiffness_matrix(element_nodes=element_nodes, ke=hexahedron_stiffness_matrix(d_matrix, size),
+                                  n_nodes=n_nodes)
+
+    # Boundary conditions on nodes of solid voxels only, as node sets of ABAQUS are made from the merged mesh
+    is_used_node = np.zeros(n_nodes, dtype=bool)
+    is_used_node[element_nodes.ravel()] = True
+    node_indices = np.stack(np.unravel_index(np.arange(n_nodes), node_grid_shape), axis=1)
+    face_nodes = {
+        f'{axis_name}{side}': np.flatnonzero(is_used_node & (node_indices[:, axis] == (0 if side == 'Min' else
+                                                                                       node_grid_shape[axis] - 1)))
+        for axis, axis_name in enumerate('xyz') for side in ('Min', 'Max')
+    }
+    u = np.zeros(3 * n_nodes)
+    is_prescribed = ~np.repeat(is_used_node, 3)
+    for axis, axis_name in enumerate('xyz'):
+        is_prescribed[3 * face_nodes[f'{axis_name}Min'] + axis] = True
+    y_max_dofs = (3 * face_nodes['yMax'][:, np.newaxis] + np.arange(3)).ravel()
+    is_prescribed[y_max_dofs] = True
+    u[3 * face_nodes['yMax'] + 1] = dis_y
+
+    free_dofs, prescribed_dofs = np.flatnonzero(~is_prescribed), np.flatnonzero(is_prescribed)
+    k_free = k[free_dofs]
+    u[free_dofs] = solve_linear_system(k=k_free[:, free_dofs], f=-k_free[:, prescribed_dofs] @ u[prescribed_dofs],
+                                       tol=tol, use_amg=use_amg)
+
+    displacements = u.reshape(n_nodes, 3)
+    reaction_force = (k[y_max_dofs] @ u).reshape(-1, 3).sum(axis=0)
+    element_displacements = displacements[element_nodes].reshape(len(element_nodes), 24)
+    strains = np.einsum('gij,ej->egi', hexahedron_strain_displacement_matrices(size), element_displacements)
+    mises = von_mises(strains @ d_matrix.T)
+    field_outputs = {
+        'displacement': {face: np.average(displacements[face_nodes[face]], axis=0)
+                         for face in ('xMax', 'yMax', 'zMax')},
+        'rotation': np.zeros(3),
+        'reaction_force': reaction_force,
+        'mises_stress': {'max': float(mises.max()), 'min': float(mises.min()), 'average': float(mises.mean())}
+    }
+    rp_displacement = (0., dis_y, 0.)
+    history_outputs = {f'U{axis + 1}': np.array([[0., 0.], [1., rp_displacement[axis]]]) for axis in range(3)}
+    history_outputs.update({f'RF{axis + 1}': np.array([[0., 0.], [1., reaction_force[axis]]]) for axis in range(3)})
+    return field_outputs, history_outputs
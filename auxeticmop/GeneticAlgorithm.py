@@ -1,27 +1,196 @@
+import os
+import asyncio
 import random
 import numpy as np
 import itertools
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
 from functools import reduce
-from dataclasses import asdict
-from typing import Tuple
+from dataclasses import asdict, replace
+from typing import Tuple, Union
 from .ParameterDefinitions import Parameters, JsonFormat
 from .GraphicUserInterface import Visualizer
-from .Network import Server, request_abaqus
-from .FileIO import pickle_io, pickles_io, remove_file, get_sorted_file_numbers_from_pattern
-from .PostProcessing import evaluate_all_fitness_values, selection
-from .MutateAndValidate import mutate_and_validate_topology
+from .Network import Server, AsyncServer, request_abaqus, dispatch_abaqus, evaluate_abaqus, evaluate_entity
+from .FileIO import pickle_io, remove_file, get_sorted_file_numbers_from_pattern, TopologyIndex, pack_topologies, \
+    append_record
+from .PostProcessing import evaluate_all_fitness_values, selection, find_pareto_front_points, TRUNCATION_STRATEGIES
+from .Results import ResultsTable
+from .Database import RunDatabase, EvaluationCache, physics_key
+from .FiniteElement import run_voxel_analysis
+from .Surrogate import KNNSurrogate
+from .MutateAndValidate import mutate_and_validate_topology, mutate_and_validate_topologies, seed_numba_random, \
+    VALIDATION_STATUS_VALID, VALIDATION_STATUS_NOT_CONNECTED
 
 
 class NSGAModel:
     def __init__(self, params: Parameters, material_properties: dict, fitness_definitions: dict,
-                 visualizer: Visualizer = None, random_topology_density: float = 0.5):
+                 visualizer: Visualizer = None, random_topology_density: float = 0.5,
+                 n_offspring_workers: int = 1, random_seed: Union[int, None] = None,
+                 canonical_clone_check: bool = False, run_database: RunDatabase = None,
+                 dispatch_entities: bool = False, evaluation_backend: str = 'abaqus',
+                 surrogate: KNNSurrogate = None, evaluation_cache: EvaluationCache = None,
+                 truncation_strategy: str = 'tournament'):
         self.params = params
         self.fitness_definitions = fitness_definitions
         self.visualizer = visualizer
         self.material_properties = material_properties
         self.random_topology_density = random_topology_density
+        self.n_offspring_workers = n_offspring_workers
+        self.random_seed = random_seed
+        self.topology_index = TopologyIndex(canonical=canonical_clone_check)
+        self.run_database = run_database
+        self.dispatch_entities = dispatch_entities
+        if evaluation_backend not in ('abaqus', 'voxel_fem'):
+            raise ValueError(f'Unknown evaluation backend: {evaluation_backend}')
+        self.evaluation_backend = evaluation_backend
+        self.surrogate = surrogate
+        self.evaluation_cache = evaluation_cache
+        if truncation_strategy not in TRUNCATION_STRATEGIES:
+            raise ValueError(f'Unknown truncation strategy: {truncation_strategy}')
+        self.truncation_strategy = truncation_strategy
+
+    def request_analyses(self, gen: int, topologies_key: str, start_topology_from: int, server: Server) -> None:
+        """
+        Analyse topologies of a generation on ABAQUS, whose field outputs are then found in
+        "FieldOutput_offspring_{gen}". If dispatch_entities is True, entities are handed out to every connected
+        ABAQUS client by dispatch_abaqus(), and outputs sent back by clients are written on this side.
+        Otherwise, the whole generation is requested to the last connected client. With an AsyncServer, every entity
+        is put in flight at once by evaluate_abaqus() and awaited by its request id.
+        If evaluation_backend is 'voxel_fem', topologies are analysed locally by run_voxel_analysis() instead.
+        With an evaluation cache, outputs of cached topologies are written without analysis, and outputs of the
+        analysed ones are cached afterwards.
+        :param gen: Generation number of topologies.
+        :param topologies_key: 'parent' or 'offspring'.
+        :param start_topology_from: First entity number to analyse.
+        :param server: A server or an asyncio server to ABAQUS clients.
+        :return: None
+        """
+        if self.evaluation_cache is None:
+            self.submit_analyses(gen=gen, topologies_key=topologies_key, start_topology_from=start_topology_from,
+                                 server=server)
+            return
+        topologies = pickle_io(f'Topologies_{gen}', mode='r')[topologies_key]
+        physics = physics_key(params_dict=asdict(self.params), material_properties=self.material_properties,
+                              evaluation_backend=self.evaluation_backend)
+        missed_entities = self.write_cached_outputs(gen=gen, topologies=topologies, physics=physics,
+                                                    start_topology_from=start_topology_from)
+        if not missed_entities:
+            return
+        self.submit_analyses(gen=gen, topologies_key=topologies_key, start_topology_from=start_topology_from,
+                             server=server)
+        field_outputs = pickle_io(f'FieldOutput_offspring_{gen}', mode='r')
+        history_output_file_name = f'HistoryOutput_offspring_{gen}'
+        history_outputs = pickle_io(history_output_file_name, mode='r') \
+            if os.path.isfile(history_output_file_name) else dict()
+        for entity_num in missed_entities:
+            if field_outputs.get(entity_num) is not None:
+                self.evaluation_cache.put(topology=topologies[entity_num - 1], physics=physics,
+                                          field_outputs=field_outputs[entity_num],
+                                          history_outputs=history_outputs.get(entity_num))
+
+    def write_cached_outputs(self, gen: int, topologies: np.ndarray, physics: str, start_topology_from: int) -> list:
+        """
+        Write outputs of cached topologies into "FieldOutput_offspring_{gen}" and "HistoryOutput_offspring_{gen}",
+        so that analyses skip them as already exported entities.
+        :param gen: Generation number of topologies.
+        :param topologies: Topologies of the generation, shape: (entities, lx, ly, lz)
+        :param physics: Physics key of the analyses.
+        :param start_topology_from: First entity number to analyse.
+        :return: Entity numbers which are neither exported nor cached.
+        """
+        field_output_file_name = f'FieldOutput_offspring_{gen}'
+        exported_entities = dict()
+        if os.path.isfile(field_output_file_name):
+            exported_entities = pickle_io(field_output_file_name, mode='r')
+        cached_field_outputs, cached_history_outputs, missed_entities = dict(), dict(), list()
+        for entity_num in range(start_topology_from, len(topologies) + 1):
+            if entity_num in exported_entities:
+                continue
+            cached = self.evaluation_cache.get(topology=topologies[entity_num - 1], physics=physics)
+            if cached is None:
+                missed_entities.append(entity_num)
+                continue
+            cached_field_outputs[entity_num] = cached[0]
+            if cached[1] is not None:
+                cached_history_outputs[entity_num] = cached[1]
+        if cached_field_outputs:
+            print(f'<info> Outputs of entities {sorted(cached_field_outputs)} in generation {gen} found in cache')
+            append_record(field_output_file_name, to_dump=cached_field_outputs)
+        if cached_history_outputs:
+            append_record(f'HistoryOutput_offspring_{gen}', to_dump=cached_history_outputs)
+        return missed_entities
+
+    def submit_analyses(self, gen: int, topologies_key: str, start_topology_from: int,
+                        server: Union[Server, AsyncServer]) -> None:
+        if self.evaluation_backend == 'voxel_fem':
+            self.run_local_analyses(gen=gen, topologies_key=topologies_key, start_topology_from=start_topology_from)
+            return
+        json_data = self.abaqus_request_data(gen=gen, topologies_key=topologies_key,
+                                             start_topology_from=start_topology_from)
+        is_async_server = isinstance(server, AsyncServer)  # Sessions of an asyncio server take entities only
+        if not self.dispatch_entities and not is_async_server:
+            request_abaqus(dict_data=json_data, server=server, conn_to_gui=self.visualizer.conn_to_gui)
+            return
+        field_output_file_name = f'FieldOutput_offspring_{gen}'
+        history_output_file_name = f'HistoryOutput_offspring_{gen}'
+        exported_entities = dict()
+        if os.path.isfile(field_output_file_name):
+            exported_entities = pickle_io(field_output_file_name, mode='r')
+        topologies = pickle_io(f'Topologies_{gen}', mode='r')[topologies_key]
+        work_items = {entity_num: topologies[entity_num - 1].reshape(-1) if server.option == 'binary'
+                      else topologies[entity_num - 1].flatten().tolist()  # Legacy json protocol
+                      for entity_num in range(start_topology_from, len(topologies) + 1)
+                      if entity_num not in exported_entities}
+        json_data['generation'] = gen
+
+        def on_result(entity_num: int, field_outputs: dict, history_outputs: dict) -> None:
+            if field_outputs is None:  # Evaluated with a penalty fitness, and not analysed again on resume
+                print(f'<!> Analysis of entity {entity_num} in generation {gen} failed')
+                append_record(field_output_file_name, to_dump={entity_num: None})
+                return
+            append_record(field_output_file_name, to_dump={entity_num: field_outputs})
+            append_record(history_output_file_name, to_dump={entity_num: history_outputs})
+
+        if is_async_server:
+            server.capacity_per_client = self.params.n_concurrent_jobs
+            evaluate_abaqus(dict_data=json_data, work_items=work_items, server=server, on_result=on_result,
+                            conn_to_gui=self.visualizer.conn_to_gui)
+            return
+        dispatch_abaqus(dict_data=json_data, work_items=work_items, server=server,
+                        conn_to_gui=self.visualizer.conn_to_gui, on_result=on_result,
+                        capacity_per_client=self.params.n_concurrent_jobs)
+
+    def abaqus_request_data(self, gen: int, topologies_key: str, start_topology_from: int) -> dict:
+        json_data = asdict(JsonFormat(start_topology_from=start_topology_from, topologies_key=topologies_key,
+                                      topologies_file_name=f'Topologies_{gen}', exit_abaqus=False))
+        json_data.update(asdict(self.params))
+        json_data.update(self.material_properties)
+        return json_data
+
+    def run_local_analyses(self, gen: int, topologies_key: str, start_topology_from: int) -> None:
+        field_output_file_name = f'FieldOutput_offspring_{gen}'
+        exported_entities = dict()
+        if os.path.isfile(field_output_file_name):
+            exported_entities = pickle_io(field_output_file_name, mode='r')
+        topologies = pickle_io(f'Topologies_{gen}', mode='r')[topologies_key]
+        for entity_num in range(start_topology_from, len(topologies) + 1):
+            if entity_num in exported_entities:
+                continue
+            field_outputs, history_outputs = run_voxel_analysis(
+                topology=topologies[entity_num - 1], unit_l=self.params.unit_l, dis_y=self.params.dis_y,
+                engineering_constants=self.material_properties['engineering_constants'],
+                mesh_size=self.params.mesh_size)
+            append_record(field_output_file_name, to_dump={entity_num: field_outputs})
+            append_record(f'HistoryOutput_offspring_{gen}', to_dump={entity_num: history_outputs})
+            print(f'<info> Local analysis of entity {entity_num} in generation {gen} complete')
 
     def load_parent_data(self, gen: int, server: Server) -> Tuple[np.ndarray, dict]:
+        if self.run_database is not None:
+            parent_topologies = self.run_database.get_topologies(gen=gen, kind='parent')
+            parent_results = self.run_database.get_field_outputs(gen=gen, kind='parent')
+            if parent_topologies is not None and len(parent_topologies) == len(parent_results):
+                return parent_topologies, parent_results
         try:
             parent_topologies = pickle_io(f'Topologies_{gen}', mode='r')['parent']
         except FileNotFoundError or KeyError:
@@ -30,19 +199,27 @@ class NSGAModel:
         try:
             parent_results = pickle_io(f'FieldOutput_{gen}', mode='r')
         except FileNotFoundError:
-            json_data = asdict(JsonFormat(start_topology_from=1, topologies_key='parent',
-                                          topologies_file_name=f'Topologies_{gen}', exit_abaqus=False))
-            json_data.update(asdict(self.params))
-            json_data.update(self.material_properties)
-            request_abaqus(dict_data=json_data, server=server, conn_to_gui=self.visualizer.conn_to_gui)
+            self.request_analyses(gen=gen, topologies_key='parent', start_topology_from=1, server=server)
             parent_results = pickle_io(f'FieldOutput_offspring_{gen}', mode='r')
             remove_file(f'FieldOutput_offspring_{gen}')
             pickle_io(f'FieldOutput_{gen}', mode='w', to_dump=parent_results)
-            self.visualizer.visualize(params=self.params, gen=gen - 1, use_manual_rp=False)
+            if self.visualizer is not None:
+                self.visualizer.visualize(params=self.params, gen=gen - 1, use_manual_rp=False)
         assert len(parent_topologies) == len(parent_results)
+        if self.run_database is not None:
+            with self.run_database.transaction():
+                self.run_database.put_topologies(gen=gen, kind='parent', topologies=parent_topologies)
+                self.run_database.put_field_outputs(gen=gen, kind='parent', results=parent_results)
         return parent_topologies, parent_results
 
     def determine_where_abaqus_start(self) -> Tuple[int, int]:
+        if self.run_database is not None and self.run_database.last_generation() is not None:
+            # Generations are committed to the database after selection, so the last one is not finished yet
+            last_gen = self.run_database.last_generation()
+            offspring_results_file_name = f'FieldOutput_offspring_{last_gen}'
+            if not os.path.isfile(offspring_results_file_name):
+                return last_gen, 1
+            return last_gen, first_missing_entity(pickle_io(offspring_results_file_name, mode='r'))
         offspring_results_file_numbers = get_sorted_file_numbers_from_pattern(r'FieldOutput_offspring_\d+')
         if len(offspring_results_file_numbers) == 0:
             return 1, 1
@@ -50,59 +227,363 @@ class NSGAModel:
             last_offspring_results_file_number = offspring_results_file_numbers[-1]
             last_offspring_results = pickle_io(f'FieldOutput_offspring_{last_offspring_results_file_number}', mode='r')
             if len(last_offspring_results) < self.params.end_pop:
-                needed_to_start_at_offspring = len(last_offspring_results) + 1
+                needed_to_start_at_offspring = first_missing_entity(last_offspring_results)
                 return last_offspring_results_file_number, needed_to_start_at_offspring
             else:
                 return last_offspring_results_file_number + 1, 1
 
     def generate_offspring_topologies(self, gen: int, server: Server) -> np.ndarray:
         parent_topologies, parent_results = self.load_parent_data(gen=gen, server=server)
+        if self.run_database is not None:
+            offspring_topologies = self.run_database.get_topologies(gen=gen, kind='offspring')
+            if offspring_topologies is not None:
+                return offspring_topologies
         topologies = pickle_io(f'Topologies_{gen}', mode='r')
         if 'offspring' in topologies.keys():
             offspring_topologies = pickle_io(f'Topologies_{gen}', mode='r')['offspring']
+        elif self.surrogate is not None and self.train_surrogate_on_history(gen=gen).is_ready:
+            candidates = generate_offspring(gen=gen, topo_parents=parent_topologies,
+                                            params=replace(self.params,
+                                                           end_pop=self.surrogate.oversampling * self.params.end_pop),
+                                            topology_index=self.topology_index, n_workers=self.n_offspring_workers,
+                                            seed=None if self.random_seed is None else self.random_seed + gen)
+            offspring_topologies = candidates[self.surrogate.screen(gen=gen, candidates=candidates,
+                                                                    selected_size=self.params.end_pop)]
+            pickle_io(f'Topologies_{gen}', mode='a', to_dump={'offspring': pack_topologies(offspring_topologies)})
         else:
             offspring_topologies = generate_offspring(gen=gen, topo_parents=parent_topologies, params=self.params,
-                                                      save_file_as=f'Topologies_{gen}')
+                                                      save_file_as=f'Topologies_{gen}',
+                                                      topology_index=self.topology_index,
+                                                      n_workers=self.n_offspring_workers,
+                                                      seed=None if self.random_seed is None
+                                                      else self.random_seed + gen)
         assert len(parent_topologies) == len(parent_results) == len(offspring_topologies)
+        if self.run_database is not None:
+            self.run_database.put_topologies(gen=gen, kind='offspring', topologies=offspring_topologies)
         return offspring_topologies
 
+    def train_surrogate_on_history(self, gen: int) -> KNNSurrogate:
+        """
+        Train the surrogate on the first parents and on offspring of every generation before gen, which are not
+        trained yet, e.g. after resuming a run. Generation 0 stands for the first parents.
+        :param gen: Current generation.
+        :return: The surrogate.
+        """
+        params_dict = asdict(self.params)
+        for history_gen in range(gen):
+            if history_gen in self.surrogate.trained_generations:
+                continue
+            if history_gen == 0:
+                topologies = pickle_io('Topologies_1', mode='r')['parent']
+                results = pickle_io('FieldOutput_1', mode='r')
+            else:
+                topologies = pickle_io(f'Topologies_{history_gen}', mode='r')['offspring']
+                results = pickle_io(f'FieldOutput_offspring_{history_gen}', mode='r')
+            self.surrogate.add(topologies, evaluate_all_fitness_values(
+                fitness_definitions=self.fitness_definitions, params_dict=params_dict, results=results,
+                topologies=topologies))
+            self.surrogate.trained_generations.add(history_gen)
+        return self.surrogate
+
     def evolve_a_generation(self, running_gen: int, start_offspring_from: int, server: Server):  # changed method name: from .run_a_generation() to .evolve_a_generation()
         parent_topologies, parent_results = self.load_parent_data(gen=running_gen, server=server)
         offspring_topologies = self.generate_offspring_topologies(gen=running_gen, server=server)
-        json_data = asdict(JsonFormat(start_topology_from=start_offspring_from, topologies_key='offspring',
-                                      topologies_file_name=f'Topologies_{running_gen}', exit_abaqus=False))
-        json_data.update(asdict(self.params))
-        json_data.update(self.material_properties)
-        request_abaqus(dict_data=json_data, server=server, conn_to_gui=self.visualizer.conn_to_gui)
+        self.request_analyses(gen=running_gen, topologies_key='offspring', start_topology_from=start_offspring_from,
+                              server=server)
         offspring_results = pickle_io(f'FieldOutput_offspring_{running_gen}', mode='r')
         all_topologies = np.vstack((parent_topologies, offspring_topologies))
-        all_results = parent_results.copy()
-        all_results.update({entity_num + len(parent_results): offspring_results[entity_num]
-                            for entity_num in sorted(offspring_results.keys())})
+        parent_results_table = ResultsTable.from_dict(parent_results)
+        all_results = ResultsTable.concatenate((parent_results_table, ResultsTable.from_dict(
+            offspring_results, dtype=parent_results_table.data.dtype)))
         all_fitness_values = evaluate_all_fitness_values(fitness_definitions=self.fitness_definitions,
                                                          params_dict=asdict(self.params),
                                                          results=all_results, topologies=all_topologies)
-        pareto_indices = selection(all_fitness_values=all_fitness_values, selected_size=self.params.end_pop)
+        pareto_indices = selection(all_fitness_values=all_fitness_values, selected_size=self.params.end_pop,
+                                   truncation=self.truncation_strategy)
         selected_topologies = all_topologies[pareto_indices]
-        selected_results = {entity_num: all_results[pareto_idx + 1]
-                            for entity_num, pareto_idx in enumerate(pareto_indices, start=1)}
+        selected_results = all_results[pareto_indices].to_dict()
         assert len(selected_topologies) == len(selected_results)
-        pickle_io(f'Topologies_{running_gen + 1}', mode='w', to_dump={'parent': selected_topologies})
+        if self.surrogate is not None:
+            self.train_surrogate_on_history(gen=running_gen)
+            self.surrogate.record_generation(gen=running_gen, topologies=offspring_topologies,
+                                             fitness_values=all_fitness_values[len(parent_topologies):],
+                                             survived=np.isin(np.arange(len(parent_topologies), len(all_topologies)),
+                                                              pareto_indices))
+        pickle_io(f'Topologies_{running_gen + 1}', mode='w', to_dump={'parent': pack_topologies(selected_topologies)})
         pickle_io(f'FieldOutput_{running_gen + 1}', mode='w', to_dump=selected_results)
+        if self.run_database is not None:
+            self.record_generation(gen=running_gen, offspring_results=offspring_results,
+                                   all_fitness_values=all_fitness_values, selected_topologies=selected_topologies,
+                                   selected_results=selected_results)
         if self.visualizer is not None:
             self.visualizer.visualize(params=self.params, gen=running_gen, use_manual_rp=False)
 
+    def record_generation(self, gen: int, offspring_results: dict, all_fitness_values: np.ndarray,
+                          selected_topologies: np.ndarray, selected_results: dict) -> None:
+        """
+        Commit the outcome of a generation to the run database in one transaction, after it is written to the
+        per-generation files. Once committed, the run resumes from the next generation. A crash between both writes
+        resumes from this generation again, whose analyses are then all found in "FieldOutput_offspring_{gen}".
+        """
+        history_output_file_name = f'HistoryOutput_offspring_{gen}'
+        with self.run_database.transaction():
+            self.run_database.put_field_outputs(gen=gen, kind='offspring', results=offspring_results)
+            if os.path.isfile(history_output_file_name):
+                self.run_database.put_history_outputs(gen=gen, kind='offspring',
+                                                      history_outputs=pickle_io(history_output_file_name, mode='r'))
+            self.run_database.put_fitness_values(gen=gen, kind='parent',
+                                                 fitness_values=all_fitness_values[:self.params.end_pop])
+            self.run_database.put_fitness_values(gen=gen, kind='offspring',
+                                                 fitness_values=all_fitness_values[self.params.end_pop:])
+            pareto_front_indices = find_pareto_front_points(costs=all_fitness_values, return_index=True)
+            self.run_database.put_pareto_front(gen=gen, entity_indices=pareto_front_indices,
+                                               fitness_values=all_fitness_values[pareto_front_indices])
+            self.run_database.put_topologies(gen=gen + 1, kind='parent', topologies=selected_topologies)
+            self.run_database.put_field_outputs(gen=gen + 1, kind='parent', results=selected_results)
+
     def evolve(self, server):  # changed method name: from .run() to .evolve()
         start_gen, start_offspring = self.determine_where_abaqus_start()
         for gen in range(start_gen, self.params.end_gen):
             self.evolve_a_generation(running_gen=gen, start_offspring_from=start_offspring, server=server)
             start_offspring = 1
-        request_abaqus(dict_data={'exit_abaqus': True}, server=server, conn_to_gui=self.visualizer.conn_to_gui)
+        self.exit_abaqus(server=server)
+
+    def exit_abaqus(self, server: Union[Server, AsyncServer, None]) -> None:
+        if self.evaluation_backend == 'voxel_fem':
+            return
+        if isinstance(server, AsyncServer):
+            server.run_threadsafe(server.broadcast({'exit_abaqus': True}))
+        elif self.dispatch_entities:
+            for client_socket in list(server.connected_clients):
+                server.send(client_socket=client_socket, data={'exit_abaqus': True})
+        else:
+            request_abaqus(dict_data={'exit_abaqus': True}, server=server, conn_to_gui=self.visualizer.conn_to_gui)
+
+    def evolve_async(self, server: Union[AsyncServer, None] = None) -> None:
+        """
+        Steady-state evolution. Offspring are generated one at a time from the current population and analysed as
+        soon as a slot is free, and every finished analysis is merged into the population at once by selecting end_pop
+        survivors of the population and the new offspring. Slots never wait for the slowest job of a generation.
+        Every end_pop offspring still make a generation on disk, so that a run resumes as evolve() does: offspring are
+        appended as records to "SteadyStateOffspring_{gen}" when generated and to "FieldOutput_offspring_{gen}" when
+        analysed, survivors are kept in "SteadyState_{gen}" after every merge, and at the end of the generation the
+        offspring are added to "Topologies_{gen}" and the last survivors are exported as the parents of the next one.
+        Offspring generated but not analysed before an interruption are analysed on resume.
+        :param server: An asyncio server to ABAQUS clients. Not used if evaluation_backend is 'voxel_fem', where
+        offspring are analysed by n_concurrent_jobs local processes instead.
+        :return: None
+        """
+        if self.evaluation_backend == 'abaqus' and not isinstance(server, AsyncServer):
+            raise TypeError('evolve_async() needs an AsyncServer to submit offspring one at a time')
+        if self.surrogate is not None:
+            print('<!> Surrogate screening is not applied to offspring of evolve_async()')
+        start_gen, _ = self.determine_where_abaqus_start()
+        executor = ProcessPoolExecutor(max_workers=self.params.n_concurrent_jobs) \
+            if self.evaluation_backend == 'voxel_fem' else None
+        in_flight = dict()  # future: entity number, of the running generation
+        try:
+            for gen in range(start_gen, self.params.end_gen):
+                self.evolve_a_steady_state_generation(gen=gen, server=server, executor=executor, in_flight=in_flight)
+        finally:
+            if executor is not None:
+                for future in in_flight:  # shutdown(cancel_futures=True) needs Python 3.9
+                    future.cancel()
+                executor.shutdown(wait=True)
+        self.exit_abaqus(server=server)
+
+    def evolve_a_steady_state_generation(self, gen: int, server: Union[AsyncServer, None],
+                                         executor: Union[ProcessPoolExecutor, None], in_flight: dict = None) -> None:
+        """
+        Generate, analyse and merge end_pop offspring one by one. Entities of the population are numbered in a pool,
+        parents from 0 and the offspring entity_num as end_pop + entity_num - 1.
+        :param in_flight: Futures of the analyses in flight mapped to their entity numbers, shared with the caller so
+        that they can be cancelled after an interruption.
+        """
+        end_pop = self.params.end_pop
+        params_dict = asdict(self.params)
+        parent_topologies, parent_results = self.load_parent_data(gen=gen, server=server)
+        pool_topologies = list(parent_topologies)
+        pool_results = {entity_num - 1: parent_results[entity_num] for entity_num in range(1, end_pop + 1)}
+        pool_fitness_values = dict(enumerate(evaluate_all_fitness_values(
+            fitness_definitions=self.fitness_definitions, params_dict=params_dict, results=parent_results,
+            topologies=parent_topologies)))
+
+        topologies = pickle_io(f'Topologies_{gen}', mode='r')
+        offspring_file_name = f'SteadyStateOffspring_{gen}'
+        if 'offspring' in topologies:
+            offspring_topologies = list(topologies['offspring'])
+        elif os.path.isfile(offspring_file_name):
+            generated_offspring = pickle_io(offspring_file_name, mode='r')
+            offspring_topologies = [generated_offspring[entity_num] for entity_num in sorted(generated_offspring)]
+        else:
+            offspring_topologies = list()
+        pool_topologies += offspring_topologies
+        field_output_file_name = f'FieldOutput_offspring_{gen}'
+        history_output_file_name = f'HistoryOutput_offspring_{gen}'
+        offspring_results = pickle_io(field_output_file_name, mode='r') \
+            if os.path.isfile(field_output_file_name) else dict()
+        state_file_name = f'SteadyState_{gen}'
+        if os.path.isfile(state_file_name):
+            state = pickle_io(state_file_name, mode='r')
+            survivors, merged_entities = list(state['survivors']), set(state['merged_entities'])
+        else:
+            survivors, merged_entities = list(range(end_pop)), set()
+        physics = None if self.evaluation_cache is None else physics_key(
+            params_dict=params_dict, material_properties=self.material_properties,
+            evaluation_backend=self.evaluation_backend)
+
+        def merge(entity_num: int, field_outputs: dict) -> None:
+            pool_idx = end_pop + entity_num - 1
+            offspring_results[entity_num] = pool_results[pool_idx] = field_outputs
+            pool_fitness_values[pool_idx] = evaluate_all_fitness_values(
+                fitness_definitions=self.fitness_definitions, params_dict=params_dict, results={1: field_outputs},
+                topologies=pool_topologies[pool_idx][np.newaxis])[0]
+            candidates = survivors + [pool_idx]
+            selected_indices = selection(all_fitness_values=np.array([pool_fitness_values[candidate]
+                                                                      for candidate in candidates]),
+                                         selected_size=end_pop, truncation=self.truncation_strategy)
+            survivors[:] = sorted(candidates[selected_idx] for selected_idx in selected_indices)
+            merged_entities.add(entity_num)
+            pickle_io(state_file_name, mode='w', to_dump={'survivors': np.array(survivors),
+                                                         'merged_entities': sorted(merged_entities)})
+            print(f'<info> Offspring {entity_num} of generation {gen} '
+                  f'{"survived" if pool_idx in survivors else "was dropped"}')
 
+        def export_outputs(entity_num: int, field_outputs: Union[dict, None],
+                           history_outputs: Union[dict, None]) -> None:
+            append_record(field_output_file_name, to_dump={entity_num: field_outputs})
+            if history_outputs is not None:
+                append_record(history_output_file_name, to_dump={entity_num: history_outputs})
 
-def find_where_same_array_locates(arr_to_find: np.ndarray, big_arr: np.ndarray) -> np.ndarray:
-    axis_range = tuple(dim for dim in range(len(big_arr.shape) - len(arr_to_find.shape), len(big_arr.shape)))
-    return np.argwhere(np.all(big_arr == arr_to_find, axis=axis_range))
+        # Outputs exported before an interruption but not merged yet. Failed offspring have outputs of None, and
+        # are never merged as they would be dropped with a penalty fitness.
+        for entity_num in list(offspring_results):
+            if entity_num not in merged_entities and offspring_results[entity_num] is not None:
+                merge(entity_num=entity_num, field_outputs=offspring_results[entity_num])
+        pending_entities = deque(entity_num for entity_num in range(1, len(offspring_topologies) + 1)
+                                 if entity_num not in offspring_results)
+        self.topology_index.update_from_files(range(1, gen + 1))
+        offspring_fingerprints = {self.topology_index.fingerprint(topology) for topology in offspring_topologies}
+        if isinstance(server, AsyncServer):
+            server.capacity_per_client = self.params.n_concurrent_jobs
+        in_flight = dict() if in_flight is None else in_flight  # future: entity number
+        while True:
+            while len(in_flight) < self.count_slots(server) and (pending_entities
+                                                                 or len(offspring_topologies) < end_pop):
+                if pending_entities:
+                    entity_num = pending_entities.popleft()
+                else:
+                    entity_num = len(offspring_topologies) + 1
+                    topology = generate_one_offspring(
+                        params=self.params, topo_parents=np.array([pool_topologies[idx] for idx in survivors]),
+                        topology_index=self.topology_index, offspring_fingerprints=offspring_fingerprints,
+                        seed=None if self.random_seed is None
+                        else derive_attempt_seed(seed=self.random_seed + gen, attempt_idx=entity_num))
+                    offspring_topologies.append(topology)
+                    pool_topologies.append(topology)
+                    append_record(offspring_file_name, to_dump={entity_num: pack_topologies(topology)})
+                cached = None if self.evaluation_cache is None else self.evaluation_cache.get(
+                    topology=offspring_topologies[entity_num - 1], physics=physics)
+                if cached is not None:
+                    print(f'<info> Outputs of entity {entity_num} in generation {gen} found in cache')
+                    export_outputs(entity_num, *cached)
+                    merge(entity_num=entity_num, field_outputs=cached[0])
+                    continue
+                in_flight[self.submit_offspring(gen=gen, entity_num=entity_num,
+                                                topology=offspring_topologies[entity_num - 1], server=server,
+                                                executor=executor)] = entity_num
+            if not in_flight:
+                break
+            # Slots are counted again after a while, for clients connected in the meantime
+            done, _ = wait(in_flight, timeout=None if executor is not None else server.heartbeat_interval,
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                entity_num = in_flight.pop(future)
+                field_outputs, history_outputs = self.collect_offspring(future)
+                if field_outputs is None:
+                    print(f'<!> Analysis of entity {entity_num} in generation {gen} failed')
+                    offspring_results[entity_num] = None
+                    export_outputs(entity_num, None, None)
+                    continue
+                export_outputs(entity_num, field_outputs, history_outputs)
+                if self.evaluation_cache is not None:
+                    self.evaluation_cache.put(topology=offspring_topologies[entity_num - 1], physics=physics,
+                                              field_outputs=field_outputs, history_outputs=history_outputs)
+                merge(entity_num=entity_num, field_outputs=field_outputs)
+
+        if 'offspring' not in topologies:
+            pickle_io(f'Topologies_{gen}', mode='a',
+                      to_dump={'offspring': pack_topologies(np.array(offspring_topologies))})
+        selected_topologies = np.array([pool_topologies[idx] for idx in survivors])
+        selected_results = {entity_num: pool_results[idx] for entity_num, idx in enumerate(survivors, start=1)}
+        pickle_io(f'Topologies_{gen + 1}', mode='w', to_dump={'parent': pack_topologies(selected_topologies)})
+        pickle_io(f'FieldOutput_{gen + 1}', mode='w', to_dump=selected_results)
+        if self.run_database is not None:
+            offspring_results = {entity_num: offspring_results[entity_num] for entity_num in sorted(offspring_results)
+                                 if offspring_results[entity_num] is not None}
+            all_fitness_values = np.array([pool_fitness_values[idx] for idx in range(end_pop)]
+                                          + [pool_fitness_values[end_pop + entity_num - 1]
+                                             for entity_num in offspring_results])
+            self.run_database.put_topologies(gen=gen, kind='offspring', topologies=np.array(offspring_topologies))
+            self.record_generation(gen=gen, offspring_results=offspring_results,
+                                   all_fitness_values=all_fitness_values, selected_topologies=selected_topologies,
+                                   selected_results=selected_results)
+        if self.visualizer is not None:
+            self.visualizer.visualize(params=self.params, gen=gen, use_manual_rp=False)
+
+    def count_slots(self, server: Union[AsyncServer, None]) -> int:
+        """
+        :return: Analyses to keep in flight, n_concurrent_jobs of each connected client or of the local processes.
+        """
+        if self.evaluation_backend == 'voxel_fem':
+            return self.params.n_concurrent_jobs
+        return self.params.n_concurrent_jobs * max(1, len(server.connected_clients))
+
+    def submit_offspring(self, gen: int, entity_num: int, topology: np.ndarray, server: Union[AsyncServer, None],
+                         executor: Union[ProcessPoolExecutor, None]) -> Future:
+        """
+        Start the analysis of an offspring without waiting for it.
+        :return: Future of the analysis, read by collect_offspring().
+        """
+        if self.evaluation_backend == 'voxel_fem':
+            return executor.submit(run_voxel_analysis, topology=topology, unit_l=self.params.unit_l,
+                                   dis_y=self.params.dis_y,
+                                   engineering_constants=self.material_properties['engineering_constants'],
+                                   mesh_size=self.params.mesh_size)
+        dict_data = self.abaqus_request_data(gen=gen, topologies_key='offspring', start_topology_from=entity_num)
+        dict_data['generation'] = gen
+        return asyncio.run_coroutine_threadsafe(
+            evaluate_entity(dict_data=dict_data, entity_num=entity_num, flat_topology=topology.reshape(-1),
+                            server=server), server.loop)
+
+    def collect_offspring(self, future: Future) -> Tuple[Union[dict, None], Union[dict, None]]:
+        """
+        :param future: A finished future of submit_offspring().
+        :return: Field outputs and history outputs, None if the analysis failed.
+        """
+        try:
+            outputs = future.result()
+        except Exception as e:
+            print(f'<!> Analysis raised {e!r}')
+            return None, None
+        if self.evaluation_backend == 'voxel_fem':
+            return outputs
+        _, field_outputs, history_outputs, log_message = outputs
+        if log_message and self.visualizer is not None and self.visualizer.conn_to_gui is not None:
+            self.visualizer.conn_to_gui.send({'log_message': log_message})
+        return field_outputs, history_outputs
+
+
+def first_missing_entity(results: dict) -> int:
+    """
+    Concurrent ABAQUS jobs finish out of order, so exported entities may have gaps when a run is interrupted.
+    :param results: Field outputs of a generation keyed by entity number, starting from 1.
+    :return: Smallest entity number without results.
+    """
+    entity_num = 1
+    while entity_num in results:
+        entity_num += 1
+    return entity_num
 
 
 def get_cutting_section_and_candidates(topologies: np.ndarray) -> Tuple[int, np.ndarray]:
@@ -136,7 +617,9 @@ def crossover(chromosome_1, chromosome_2, cutting_section):  # Crossover process
     return cross_overed_chromosome_1.reshape(chromosome_1.shape), cross_overed_chromosome_2.reshape(chromosome_2.shape)
 
 
-def generate_offspring(gen: int, params: Parameters, topo_parents: np.ndarray, save_file_as: str = None) -> np.ndarray:
+def generate_offspring(gen: int, params: Parameters, topo_parents: np.ndarray, save_file_as: str = None,
+                       topology_index: TopologyIndex = None, n_workers: int = 1,
+                       seed: Union[int, None] = None) -> np.ndarray:
     """
     Generating topo_offspring from parents. Crossover & Mutation & Validating processes will be held.
     Validating processes contain, checking 3d-print-ability without support, one voxel tree contacting six faces
@@ -145,49 +628,224 @@ def generate_offspring(gen: int, params: Parameters, topo_parents: np.ndarray, s
     :param topo_parents: Topology array of parent, shape: (end_pop, lx, ly, lz)
     :param gen: Current generation
     :param params: Parameters for GA
-    The more timeout, the longer time will be allowed for the function "mutate_and_validate_topology".
+    :param topology_index: Fingerprint index of parent topologies of all generations, used for clone detection.
+    If None, the index file in the current directory is used.
+    :param n_workers: Number of worker processes. If larger than 1 or seed is given, offspring are generated by
+    generate_offspring_in_parallel().
+    :param seed: Seed for reproducible offspring generation.
+    The more timeout, the longer time will be allowed for the function "mutate_and_validate_topologies".
     :return:
     """
-    topo_offspring = np.empty((0, params.lx, params.ly, params.lz), int)
-    validation_count = 0
-    all_topos = pickles_io(file_names=[f'Topologies_{g}' for g in range(1, gen + 1)], mode='r', key_option='int')
-    all_topos_parent = np.array([topos['parent'] for topos in all_topos.values()], dtype=int)
+    if n_workers > 1 or seed is not None:
+        return generate_offspring_in_parallel(gen=gen, params=params, topo_parents=topo_parents,
+                                              save_file_as=save_file_as, topology_index=topology_index,
+                                              n_workers=n_workers, seed=seed)
+    topo_offspring = np.empty((params.end_pop, params.lx, params.ly, params.lz), dtype=np.uint8)
+    offspring_count = 0
+    if topology_index is None:
+        topology_index = TopologyIndex()
+    topology_index.update_from_files(range(1, gen + 1))
+    offspring_fingerprints = set()
     while True:
         cutting_section, candidates = get_cutting_section_and_candidates(topologies=topo_parents)
         candidate_pairs = get_candidate_pairs(candidates=candidates)
         print('<info> Candidate lists:', len(candidates))
         print('<info> Candidate pairs:', len(candidate_pairs))
-        for pair_idx in range(len(candidate_pairs)):
-            chromosome_1_idx = candidate_pairs[pair_idx][0]
-            chromosome_2_idx = candidate_pairs[pair_idx][1]
-            cross_overed_chromosome_1, cross_overed_chromosome_2 = crossover(
-                chromosome_1=topo_parents[chromosome_1_idx],
-                chromosome_2=topo_parents[chromosome_2_idx],
-                cutting_section=cutting_section)
-            validated_chromosome_1 = mutate_and_validate_topology(cross_overed_chromosome_1, params.mutation_rate)
-            validated_chromosome_2 = mutate_and_validate_topology(cross_overed_chromosome_2, params.mutation_rate)
-            for validated_chromosome in (validated_chromosome_1, validated_chromosome_2):
-                if validated_chromosome is None:
-                    print('<!> Non-connected tree detected')
-                    continue
+        # Attempt rounds cross over just enough pairs for the missing offspring, and validate their children at once
+        pair_idx = 0
+        while pair_idx < len(candidate_pairs):
+            round_pairs = candidate_pairs[pair_idx:pair_idx + (params.end_pop - offspring_count + 1) // 2]
+            pair_idx += len(round_pairs)
+            children = np.array([cross_overed_chromosome for chromosome_1_idx, chromosome_2_idx in round_pairs
+                                 for cross_overed_chromosome in crossover(chromosome_1=topo_parents[chromosome_1_idx],
+                                                                          chromosome_2=topo_parents[chromosome_2_idx],
+                                                                          cutting_section=cutting_section)])
+            validated, status = mutate_and_validate_topologies(children, mutation_probability=params.mutation_rate)
+            for validated_chromosome in validated_children(validated, status):
+                fingerprint = topology_index.fingerprint(validated_chromosome)
+                if fingerprint in topology_index.fingerprints:
+                    print('<!> Clone structure found in parents!')
+                elif fingerprint in offspring_fingerprints:
+                    print('<!> Clone structure found in current offsprings!')
                 else:
-                    if len(find_where_same_array_locates(arr_to_find=validated_chromosome,
-                                                         big_arr=all_topos_parent)):
-                        print('<!> Clone structure found in parents!')
-                        continue
-                    elif len(find_where_same_array_locates(arr_to_find=validated_chromosome,
-                                                           big_arr=topo_offspring)):
-                        print('<!> Clone structure found in current offsprings!')
-                        continue
-                    else:
-                        topo_offspring = np.vstack((topo_offspring, np.expand_dims(validated_chromosome, axis=0)))
-                        validation_count += 1
-                        print(f'<info> Validation of chromosome {validation_count} complete!')
-                        if len(topo_offspring) == params.end_pop:
-                            print('<info> Generating topo_offspring complete')
-                            if save_file_as is not None:
-                                pickle_io(save_file_as, mode='a', to_dump={'offspring': topo_offspring})
-                            return topo_offspring
+                    offspring_fingerprints.add(fingerprint)
+                    topo_offspring[offspring_count] = validated_chromosome
+                    offspring_count += 1
+                    print(f'<info> Validation of chromosome {offspring_count} complete!')
+                    if offspring_count == params.end_pop:
+                        print('<info> Generating topo_offspring complete')
+                        if save_file_as is not None:
+                            pickle_io(save_file_as, mode='a',
+                                      to_dump={'offspring': pack_topologies(topo_offspring)})
+                        return topo_offspring
+
+
+def generate_one_offspring(params: Parameters, topo_parents: np.ndarray, topology_index: TopologyIndex,
+                           offspring_fingerprints: set, seed: Union[int, None] = None) -> np.ndarray:
+    """
+    Generating an offspring for steady-state evolution. Crossover of a random parent pair & Mutation & Validating
+    processes are repeated until a child is valid and not a clone.
+    :param params: Parameters for GA
+    :param topo_parents: Topology array of the current population, shape: (end_pop, lx, ly, lz)
+    :param topology_index: Fingerprint index of parent topologies of all generations, used for clone detection.
+    :param offspring_fingerprints: Fingerprints of offspring generated so far, to which the new offspring is added.
+    :param seed: Seed for reproducible attempts. States of the global generators are restored afterwards.
+    :return: Topology array of the offspring, shape: (lx, ly, lz)
+    """
+    with seeded_random_generators(seed):
+        while True:
+            cutting_section, candidates = get_cutting_section_and_candidates(topologies=topo_parents)
+            chromosome_1_idx, chromosome_2_idx = random.sample(list(candidates), 2)
+            children = np.array(crossover(chromosome_1=topo_parents[chromosome_1_idx],
+                                          chromosome_2=topo_parents[chromosome_2_idx],
+                                          cutting_section=cutting_section))
+            validated, status = mutate_and_validate_topologies(children, mutation_probability=params.mutation_rate)
+            for validated_chromosome in validated_children(validated, status):
+                fingerprint = topology_index.fingerprint(validated_chromosome)
+                if fingerprint in topology_index.fingerprints:
+                    print('<!> Clone structure found in parents!')
+                elif fingerprint in offspring_fingerprints:
+                    print('<!> Clone structure found in current offsprings!')
+                else:
+                    offspring_fingerprints.add(fingerprint)
+                    return validated_chromosome
+
+
+def validated_children(validated: np.ndarray, status: np.ndarray) -> list:
+    """
+    :param validated: Children of an attempt round validated at once by mutate_and_validate_topologies().
+    :param status: Validation status codes of the children.
+    :return: Valid children in order. The others are reported and dropped.
+    """
+    children = list()
+    for validated_chromosome, validation_status in zip(validated, status):
+        if validation_status == VALIDATION_STATUS_VALID:
+            children.append(validated_chromosome)
+        elif validation_status == VALIDATION_STATUS_NOT_CONNECTED:
+            print('<!> Non-connected tree detected')
+        else:
+            print('<!> Validation did not converge')
+    return children
+
+
+_worker_topo_parents = None
+_worker_mutation_rate = None
+
+
+def _initialize_offspring_worker(topo_parents: np.ndarray, mutation_rate: float) -> None:
+    global _worker_topo_parents, _worker_mutation_rate
+    _worker_topo_parents = topo_parents
+    _worker_mutation_rate = mutation_rate
+
+
+def seed_all_random_generators(seed: int) -> None:
+    random.seed(seed)
+    np.random.seed(seed)
+    seed_numba_random(seed)
+
+
+@contextmanager
+def seeded_random_generators(seed: Union[int, None]):
+    """
+    Seed the generators of random, np.random and numba for the enclosed block, then restore the states of random and
+    np.random, so that the host process keeps its own sequence. The numba generator cannot be read back; it is only
+    drawn by mutation and validation, which are reseeded for every seeded call.
+    :param seed: Seed for the block. If None, the generators are left untouched.
+    """
+    if seed is None:
+        yield
+        return
+    random_state, np_random_state = random.getstate(), np.random.get_state()
+    seed_all_random_generators(seed)
+    try:
+        yield
+    finally:
+        random.setstate(random_state)
+        np.random.set_state(np_random_state)
+
+
+def derive_attempt_seed(seed: int, attempt_idx: int) -> int:
+    """
+    Derive an independent 32-bit seed for one offspring attempt from the base seed and the attempt index.
+    :param seed: Base seed of the offspring generation.
+    :param attempt_idx: Index of the attempt, starting from 0.
+    :return: Seed for the attempt.
+    """
+    return int(np.random.SeedSequence([seed, attempt_idx]).generate_state(1)[0])
+
+
+def offspring_attempt(attempt_idx: int, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    A unit of work for the process pool: crossover of one random parent pair on a random cutting section, followed by
+    mutation and validation of both children. All randomness comes from the seed derived for this attempt only, so
+    the result does not depend on which worker runs it or when.
+    :param attempt_idx: Index of the attempt.
+    :param seed: Base seed of the offspring generation.
+    :return: Both children validated in one call, and their validation status codes.
+    """
+    seed_all_random_generators(derive_attempt_seed(seed=seed, attempt_idx=attempt_idx))
+    cutting_section, candidates = get_cutting_section_and_candidates(topologies=_worker_topo_parents)
+    chromosome_1_idx, chromosome_2_idx = random.sample(list(candidates), 2)
+    children = np.array(crossover(chromosome_1=_worker_topo_parents[chromosome_1_idx],
+                                  chromosome_2=_worker_topo_parents[chromosome_2_idx],
+                                  cutting_section=cutting_section))
+    return mutate_and_validate_topologies(children, mutation_probability=_worker_mutation_rate, parallel=False)
+
+
+def generate_offspring_in_parallel(gen: int, params: Parameters, topo_parents: np.ndarray, save_file_as: str = None,
+                                   topology_index: TopologyIndex = None, n_workers: int = 1,
+                                   seed: Union[int, None] = None) -> np.ndarray:
+    """
+    Generating topo_offspring from parents using a process pool. Each worker runs crossover & mutation & validation
+    attempts seeded by (seed, attempt index). Results are consumed in the order of attempt indices, so the same seed
+    always gives the same offspring regardless of the number of workers and of scheduling.
+    :param gen: Current generation
+    :param params: Parameters for GA
+    :param topo_parents: Topology array of parent, shape: (end_pop, lx, ly, lz)
+    :param save_file_as: Save pickle file of offspring topologies as this.
+    :param topology_index: Fingerprint index of parent topologies of all generations, used for clone detection.
+    If None, the index file in the current directory is used.
+    :param n_workers: Number of worker processes.
+    :param seed: Base seed. If None, a random seed is drawn and printed so that the run can be reproduced.
+    :return: Topology array of offspring, shape: (end_pop, lx, ly, lz)
+    """
+    if seed is None:
+        seed = int(np.random.SeedSequence().generate_state(1)[0])
+    print(f'<info> Generating offspring with {n_workers} workers, seed: {seed}')
+    topo_offspring = np.empty((params.end_pop, params.lx, params.ly, params.lz), dtype=np.uint8)
+    offspring_count = 0
+    if topology_index is None:
+        topology_index = TopologyIndex()
+    topology_index.update_from_files(range(1, gen + 1))
+    offspring_fingerprints = set()
+    max_pending_attempts = 2 * n_workers
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_initialize_offspring_worker,
+                             initargs=(topo_parents, params.mutation_rate)) as executor:
+        pending_attempts = deque()
+        next_attempt_idx = 0
+        while offspring_count < params.end_pop:
+            while len(pending_attempts) < max_pending_attempts:
+                pending_attempts.append(executor.submit(offspring_attempt, next_attempt_idx, seed))
+                next_attempt_idx += 1
+            for validated_chromosome in validated_children(*pending_attempts.popleft().result()):
+                fingerprint = topology_index.fingerprint(validated_chromosome)
+                if fingerprint in topology_index.fingerprints:
+                    print('<!> Clone structure found in parents!')
+                elif fingerprint in offspring_fingerprints:
+                    print('<!> Clone structure found in current offsprings!')
+                else:
+                    offspring_fingerprints.add(fingerprint)
+                    topo_offspring[offspring_count] = validated_chromosome
+                    offspring_count += 1
+                    print(f'<info> Validation of chromosome {offspring_count} complete!')
+                    if offspring_count == params.end_pop:
+                        break
+        for pending_attempt in pending_attempts:
+            pending_attempt.cancel()
+    print('<info> Generating topo_offspring complete')
+    if save_file_as is not None:
+        pickle_io(save_file_as, mode='a', to_dump={'offspring': pack_topologies(topo_offspring)})
+    return topo_offspring
 
 
 def random_array(shape, probability):
@@ -196,7 +854,7 @@ def random_array(shape, probability):
 
 
 def random_parent_generation(density: float, params: Parameters, save_file_as: str = None) -> np.ndarray:
-    parents = np.empty((params.end_pop, params.lx, params.ly, params.lz))
+    parents = np.empty((params.end_pop, params.lx, params.ly, params.lz), dtype=np.uint8)
     total_parent_generation_count = 0
     total_volume_frac = 0
     while total_parent_generation_count < params.end_pop:
@@ -213,5 +871,5 @@ def random_parent_generation(density: float, params: Parameters, save_file_as: s
         total_parent_generation_count += 1
     print(f'Average volume fraction: {total_volume_frac / params.end_pop:.1f} %')
     if save_file_as is not None:
-        pickle_io(save_file_as, mode='w', to_dump={'parent': parents})
+        pickle_io(save_file_as, mode='w', to_dump={'parent': pack_topologies(parents)})
     return parents
@@ -9,7 +9,8 @@ import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.ticker import MaxNLocator
-from .PostProcessing import get_datum_hv, get_hv_from_datum_hv, find_pareto_front_points, evaluate_all_fitness_values
+from .PostProcessing import find_pareto_front_points, evaluate_all_fitness_values
+from .Hypervolume import HypervolumeHistory
 from .FileIO import pickle_io, get_sorted_file_numbers_from_pattern
 from .ParameterDefinitions import Parameters, GuiParameters, translate_dictionary, radiobutton_name_dict, \
     fitness_definitions
@@ -252,8 +253,7 @@ class Visualizer:
         self.conn_to_gui = conn_to_gui
         self.ref_x = None
         self.ref_y = None
-        self.all_lower_bounds = dict()
-        self.all_datum_hv = dict()
+        self.hypervolumes = HypervolumeHistory()
         if conn_to_gui is None:
             self.figure, self.axes = plt.subplots(nrows=1, ncols=2,
                                                   figsize=((1400 - 5) / 100, (700 - 5) / 100), dpi=100)
@@ -276,12 +276,9 @@ class Visualizer:
                 self.ref_y = pareto_2_sorted[0]
 
         # Calculating hyper volume
-        _datum_hv = get_datum_hv(pareto_1_sorted, pareto_2_sorted)
-        _lower_bounds = [pareto_1_sorted[0], pareto_2_sorted[-1]]
-        self.all_datum_hv.update({gen_num: _datum_hv})
-        self.all_lower_bounds.update({gen_num: _lower_bounds})
-        _all_hv = {key: get_hv_from_datum_hv(self.all_datum_hv[key], self.all_lower_bounds[key],
-                                             ref_x=self.ref_x, ref_y=self.ref_y) for key in self.all_datum_hv.keys()}
+        self.hypervolumes.set_reference_point((self.ref_x, self.ref_y))
+        self.hypervolumes.add(gen_num, np.column_stack((pareto_1_sorted, pareto_2_sorted)))
+        _all_hv = self.hypervolumes.values()
         _generations, _hvs = zip(*_all_hv.items())
 
         # Saving plotting data
@@ -0,0 +1,162 @@
+import numpy as np
+from typing import Union
+from .NonDominatedSorting import non_dominated_ranks
+
+
+def _dominating_points(points: np.ndarray, reference_point: np.ndarray) -> np.ndarray:
+    # Points strictly better than the reference point in every objective, the only ones adding volume
+    points = np.asarray(points, dtype=float).reshape(-1, len(reference_point))
+    return points[np.all(points < reference_point, axis=1)]
+
+
+def hypervolume_2d(points: np.ndarray, reference_point: Union[tuple, list, np.ndarray]) -> float:
+    """
+    Exact hypervolume of two objectives by a sweep over points sorted by the first objective, O(N log N).
+    :param points: Costs to minimize, shape: (points, 2)
+    :param reference_point: Reference point, shape: (2,)
+    :return: Area dominated by points and bounded by the reference point.
+    """
+    reference_point = np.asarray(reference_point, dtype=float)
+    points = _dominating_points(points, reference_point)
+    points = points[np.lexsort((points[:, 1], points[:, 0]))]
+    # Each point adds the strip between it and the lowest second objective so far, so dominated points add nothing
+    lowest_so_far = np.minimum.accumulate(np.concatenate(([reference_point[1]], points[:, 1])))
+    return float(np.sum((reference_point[0] - points[:, 0]) * (lowest_so_far[:-1] - lowest_so_far[1:])))
+
+
+def _limit_set(points: np.ndarray, point: np.ndarray) -> np.ndarray:
+    # Points worsened to the part dominated by point as well, keeping the non-dominated ones
+    limited_points = np.maximum(points, point)
+    if len(limited_points) <= 1:
+        return limited_points
+    return np.unique(limited_points[non_dominated_ranks(limited_points) == 0], axis=0)
+
+
+def _wfg(points: np.ndarray, reference_point: np.ndarray) -> float:
+    if len(points) == 0:
+        return 0.
+    if len(points) == 1:
+        return float(np.prod(reference_point - points[0]))
+    if points.shape[1] == 2:
+        return hypervolume_2d(points, reference_point)
+    # Sum of exclusive volumes of each point against the points after it, visited from the worst last objective
+    points = points[np.argsort(-points[:, -1], kind='stable')]
+    volume = 0.
+    for point_idx, point in enumerate(points):
+        volume += float(np.prod(reference_point - point)) - _wfg(_limit_set(points[point_idx + 1:], point),
+                                                                 reference_point)
+    return volume
+
+
+def hypervolume(points: np.ndarray, reference_point: Union[tuple, list, np.ndarray]) -> float:
+    """
+    Exact hypervolume of any number of objectives. Two objectives are swept in O(N log N), and three or more are
+    computed by the WFG algorithm on the non-dominated points, with the sweep at the base of its recursion.
+    :param points: Costs to minimize, shape: (points, objectives)
+    :param reference_point: Reference point, shape: (objectives,)
+    :return: Volume dominated by points and bounded by the reference point.
+    """
+    reference_point = np.asarray(reference_point, dtype=float)
+    points = _dominating_points(points, reference_point)
+    if len(points) == 0:
+        return 0.
+    if len(reference_point) == 1:
+        return float(reference_point[0] - points.min())
+    if len(reference_point) == 2:
+        return hypervolume_2d(points, reference_point)
+    return _wfg(np.unique(points[non_dominated_ranks(points) == 0], axis=0), reference_point)
+
+
+def exclusive_contributions(points: np.ndarray, reference_point: Union[tuple, list, np.ndarray]) -> np.ndarray:
+    """
+    Hypervolume lost by removing each point alone. Dominated points, duplicated points and points not dominating the
+    reference point contribute nothing.
+    :param points: Costs to minimize, shape: (points, objectives)
+    :param reference_point: Reference point, shape: (objectives,)
+    :return: Exclusive contribution of every point, shape: (points,)
+    """
+    reference_point = np.asarray(reference_point, dtype=float)
+    points = np.asarray(points, dtype=float)
+    contributions = np.zeros(len(points))
+    counted_indices = np.flatnonzero(np.all(points < reference_point, axis=1))
+    if len(counted_indices) == 0:
+        return contributions
+    counted_points = points[counted_indices]
+    front_indices = np.flatnonzero(non_dominated_ranks(counted_points) == 0)
+    if len(reference_point) == 2:
+        # Along the front sorted by the first objective, a point owns the box up to its neighbours, except the part
+        # which is still dominated by points behind it. Duplicated points own boxes of zero width.
+        front_indices = front_indices[np.lexsort((counted_points[front_indices, 1], counted_points[front_indices, 0]))]
+        front = counted_points[front_indices]
+        box_corners = np.column_stack((np.append(front[1:, 0], reference_point[0]),
+                                       np.insert(front[:-1, 1], 0, reference_point[1])))
+        for front_idx, (point, box_corner) in enumerate(zip(front, box_corners)):
+            is_behind = np.all(counted_points < box_corner, axis=1)
+            is_behind[front_indices[front_idx]] = False
+            contribution = float(np.prod(box_corner - point)) - hypervolume_2d(
+                np.maximum(counted_points[is_behind], point), box_corner)
+            contributions[counted_indices[front_indices[front_idx]]] = max(contribution, 0.)
+        return contributions
+    _, inverse, counts = np.unique(counted_points, axis=0, return_inverse=True, return_counts=True)
+    for front_idx in front_indices[counts[inverse.ravel()[front_indices]] == 1]:
+        other_points = np.delete(counted_points, front_idx, axis=0)
+        contributions[counted_indices[front_idx]] = float(np.prod(reference_point - counted_points[front_idx])) - _wfg(
+            _limit_set(other_points, counted_points[front_idx]), reference_point)
+    return contributions
+
+
+class HypervolumeHistory:
+    """
+    Hypervolume of the front of every generation, kept for the current reference point. For two objectives, each
+    front keeps the area between its staircase and its ideal point, so that a reference point no better than any
+    point of the front only costs a box area per generation. Other generations are recomputed exactly.
+    """
+    def __init__(self, reference_point: Union[tuple, list, np.ndarray, None] = None):
+        self.reference_point = None if reference_point is None else np.asarray(reference_point, dtype=float)
+        self.fronts = dict()
+        self._hypervolumes = dict()
+        self._staircase_gaps = dict()
+
+    def add(self, gen: int, front: np.ndarray) -> Union[float, None]:
+        """
+        :param gen: Generation number.
+        :param front: Pareto front points of the generation, shape: (points, objectives)
+        :return: Hypervolume of the generation, None until a reference point is set.
+        """
+        front = np.asarray(front, dtype=float)
+        front = front[non_dominated_ranks(front) == 0]
+        self.fronts[gen] = front[np.lexsort(front.T[::-1])]
+        if front.shape[1] == 2:
+            # Area below the staircase of the sorted front inside the box from its ideal point to its nadir point
+            sorted_front = self.fronts[gen]
+            self._staircase_gaps[gen] = float(np.sum(np.diff(sorted_front[:, 0])
+                                                     * (sorted_front[:-1, 1] - sorted_front[-1, 1])))
+        self._hypervolumes[gen] = self._compute(gen)
+        return self._hypervolumes[gen]
+
+    def set_reference_point(self, reference_point: Union[tuple, list, np.ndarray]) -> None:
+        reference_point = np.asarray(reference_point, dtype=float)
+        if self.reference_point is not None and np.array_equal(reference_point, self.reference_point):
+            return
+        self.reference_point = reference_point
+        for gen in self.fronts:
+            self._hypervolumes[gen] = self._compute(gen)
+
+    def _compute(self, gen: int) -> Union[float, None]:
+        if self.reference_point is None:
+            return None
+        front = self.fronts[gen]
+        if gen in self._staircase_gaps and len(front) > 0 and np.all(front <= self.reference_point):
+            ideal_point = (front[0, 0], front[-1, 1])
+            box_area = (self.reference_point[0] - ideal_point[0]) * (self.reference_point[1] - ideal_point[1])
+            return float(box_area - self._staircase_gaps[gen])
+        return hypervolume(front, self.reference_point)
+
+    def __getitem__(self, gen: int) -> Union[float, None]:
+        return self._hypervolumes[gen]
+
+    def values(self) -> dict:
+        """
+        :return: Hypervolume of every generation in order, for the current reference point.
+        """
+        return {gen: self._hypervolumes[gen] for gen in sorted(self._hypervolumes)}
@@ -0,0 +1,184 @@
+# ABAQUS input files of voxel topologies, written from NumPy tables instead of building models in ABAQUS/CAE.
+# AbaqusScripts.py loads this file on the Python 2.7 of ABAQUS, so it only uses NumPy and the syntax shared by
+# Python 2 and 3.
+from __future__ import print_function
+import numpy as np
+
+
+# Corners of an 8-node element in the order of C3D8, mirrored from FiniteElement.py
+HEX_NODE_OFFSETS = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0],
+                             [0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1]])
+# Element face of C3D8 and the offset of the element sharing it
+HEX_FACE_NEIGHBOUR_OFFSETS = (('S1', (0, 0, -1)), ('S2', (0, 0, 1)), ('S3', (0, -1, 0)),
+                              ('S4', (1, 0, 0)), ('S5', (0, 1, 0)), ('S6', (-1, 0, 0)))
+BOUNDARY_SET_NAMES = ('xMin', 'yMin', 'zMin', 'xMax', 'yMax', 'zMax')
+LABELS_PER_LINE = 16
+
+
+def mesh_division_of(unit_length, mesh_size):
+    # Elements per voxel edge, as the seed of the voxel part in ABAQUS/CAE and run_voxel_analysis() give
+    return 1 if mesh_size is None else max(1, int(round(unit_length / mesh_size)))
+
+
+def refine_voxels(topology, division):
+    # Every voxel split into division ** 3 elements
+    solid = np.asarray(topology).astype(bool)
+    for axis in range(3):
+        solid = np.repeat(solid, division, axis=axis)
+    return solid
+
+
+def hex_mesh(solid):
+    """
+    Nodes and C3D8 elements of solid voxels. Nodes are numbered on the grid of (lx + 1, ly + 1, lz + 1) corners, so
+    corners shared by voxels are merged by index arithmetic, and only corners of solid voxels are kept.
+    :param solid: Boolean voxel array, shape: (lx, ly, lz)
+    :return: Grid indices of nodes, shape: (nodes, 3), node labels of elements starting from 1, shape: (elements, 8),
+    and the shape of the node grid.
+    """
+    node_grid_shape = tuple(length + 1 for length in solid.shape)
+    voxel_indices = np.argwhere(solid)
+    element_node_indices = voxel_indices[:, np.newaxis, :] + HEX_NODE_OFFSETS[np.newaxis, :, :]
+    element_grid_nodes = np.ravel_multi_index((element_node_indices[..., 0], element_node_indices[..., 1],
+                                               element_node_indices[..., 2]), node_grid_shape)
+    grid_nodes = np.unique(element_grid_nodes)
+    elements = np.searchsorted(grid_nodes, element_grid_nodes) + 1
+    node_indices = np.column_stack(np.unravel_index(grid_nodes, node_grid_shape))
+    return node_indices, elements, node_grid_shape
+
+
+def boundary_node_labels(node_indices, node_grid_shape):
+    # Nodes on the faces of the bounding box, as the sets made by getByBoundingBox() in build_analysis()
+    labels = np.arange(1, len(node_indices) + 1)
+    boundary_nodes = dict()
+    for axis, axis_name in enumerate('xyz'):
+        boundary_nodes[axis_name + 'Min'] = labels[node_indices[:, axis] == 0]
+        boundary_nodes[axis_name + 'Max'] = labels[node_indices[:, axis] == node_grid_shape[axis] - 1]
+    return boundary_nodes
+
+
+def exterior_faces(solid):
+    # (face, element labels) of faces not shared with another solid voxel, as getExteriorFaces() of ABAQUS/CAE
+    element_labels = np.zeros(solid.shape, dtype=int)
+    element_labels[solid] = np.arange(1, np.count_nonzero(solid) + 1)
+    padded_solid = np.pad(solid, 1, mode='constant', constant_values=False)
+    faces = list()
+    for face_name, offset in HEX_FACE_NEIGHBOUR_OFFSETS:
+        neighbour = padded_solid[tuple(slice(1 + shift, 1 + shift + length) for shift, length in
+                                       zip(offset, solid.shape))]
+        faces.append((face_name, element_labels[solid & ~neighbour]))
+    return faces
+
+
+def _write_labels(f, labels):
+    labels = np.asarray(labels, dtype=int)
+    n_full_lines = len(labels) // LABELS_PER_LINE
+    if n_full_lines > 0:
+        np.savetxt(f, labels[:n_full_lines * LABELS_PER_LINE].reshape(-1, LABELS_PER_LINE), fmt='%d',
+                   delimiter=', ')
+    if len(labels) % LABELS_PER_LINE:
+        f.write(', '.join(str(label) for label in labels[n_full_lines * LABELS_PER_LINE:]) + '\n')
+
+
+def _write_numbers(f, numbers, per_line=8):
+    # Data lines hold up to 8 numbers
+    numbers = ['{!r}'.format(float(number)) for number in numbers]
+    for start in range(0, len(numbers), per_line):
+        f.write(', '.join(numbers[start:start + per_line]) + '\n')
+
+
+def write_compression_input_file(file_name, topology, unit_length, mesh_size, material_name, density,
+                                 engineering_constants, displacement, step_name='compression-step', model_name=''):
+    """
+    Write the compression analysis of build_analysis() as an input file, to be run by 'abaqus job=<job> input=<file>'
+    or mdb.JobFromInputFile(). It has the same C3D8R mesh, node sets xMin to zMax and RP-y, self contact of the
+    exterior surface, kinematic coupling of yMax to RP-y, symmetry conditions, step and output requests, so that
+    read_outputs() reads its ODB as the one of a model built in ABAQUS/CAE.
+    :param file_name: Name of the input file.
+    :param topology: Voxel array, shape: (lx, ly, lz)
+    :param unit_length: Edge length of a voxel.
+    :param mesh_size: Element size, as Parameters.mesh_size after post_initialize(). Voxels are divided into
+    round(unit_length / mesh_size) elements per edge. If None, one element per voxel.
+    :param material_name: Name of the material.
+    :param density: Material density.
+    :param engineering_constants: E1, E2, E3, Nu12, Nu13, Nu23, G12, G13, G23
+    :param displacement: Displacement of RP-y, a dictionary with keys u1, u2, u3, ur1, ur2, ur3.
+    :param step_name: Name of the static step.
+    :param model_name: Model name written in the heading.
+    :return: Number of nodes and elements of the mesh.
+    """
+    division = mesh_division_of(unit_length, mesh_size)
+    solid = refine_voxels(topology, division)
+    element_size = float(unit_length) / division
+    node_indices, elements, node_grid_shape = hex_mesh(solid)
+    boundary_nodes = boundary_node_labels(node_indices, node_grid_shape)
+    faces = exterior_faces(solid)
+    cube_size = element_size * np.array(solid.shape, dtype=float)
+    rp_coordinate = (cube_size[0] / 2, 1.05 * cube_size[1], cube_size[2] / 2)
+
+    with open(file_name, mode='w') as f:
+        f.write('*Heading\n** Model name: {}\n'.format(model_name))
+        f.write('*Preprint, echo=NO, model=NO, history=NO, contact=NO\n')
+        # Part of the merged voxels
+        f.write('*Part, name=cube\n*Node\n')
+        np.savetxt(f, np.column_stack((np.arange(1, len(node_indices) + 1), node_indices * element_size)),
+                   fmt=('%d', '%.9g', '%.9g', '%.9g'), delimiter=', ')
+        f.write('*Element, type=C3D8R\n')
+        np.savetxt(f, np.column_stack((np.arange(1, len(elements) + 1), elements)), fmt='%d', delimiter=', ')
+        f.write('*Elset, elset=cube, generate\n1, {}, 1\n'.format(len(elements)))
+        f.write('*Solid Section, elset=cube, material={}\n,\n*End Part\n'.format(material_name))
+        # Assembly of the part, the reference point and sets
+        f.write('*Assembly, name=Assembly\n*Instance, name=cube-1, part=cube\n*End Instance\n')
+        f.write('*Node\n1, {!r}, {!r}, {!r}\n*Nset, nset=RP-y\n1,\n'.format(*map(float, rp_coordinate)))
+        for set_name in BOUNDARY_SET_NAMES:
+            f.write('*Nset, nset={}, instance=cube-1\n'.format(set_name))
+            _write_labels(f, boundary_nodes[set_name])
+        for face_name, face_elements in faces:
+            if len(face_elements) > 0:
+                f.write('*Elset, elset=_ExteriorSurface_{}, internal, instance=cube-1\n'.format(face_name))
+                _write_labels(f, face_elements)
+        f.write('*Surface, type=ELEMENT, name=ExteriorSurface\n')
+        for face_name, face_elements in faces:
+            if len(face_elements) > 0:
+                f.write('_ExteriorSurface_{0}, {0}\n'.format(face_name))
+        f.write('*Surface, type=NODE, name=yMax_CNS_, internal\nyMax, 1.\n')
+        f.write('*Coupling, constraint name=coupling, ref node=RP-y, surface=yMax_CNS_\n*Kinematic\n')
+        f.write('*End Assembly\n')
+        # Material and contact property
+        f.write('*Material, name={}\n*Density\n'.format(material_name))
+        _write_numbers(f, (density,))
+        f.write('*Elastic, type=ENGINEERING CONSTANTS\n')
+        _write_numbers(f, engineering_constants)
+        f.write('*Surface Interaction, name=SelfContactProp\n1.,\n*Surface Behavior, pressure-overclosure=HARD\n')
+        # Symmetry conditions of the initial step
+        f.write('*Boundary\nxMin, XSYMM\nyMin, YSYMM\nzMin, ZSYMM\n')
+        # Compression step
+        f.write('*Step, name={}, nlgeom=NO, inc=10000\n*Static\n0.001, 1., 1e-12, 0.1\n'.format(step_name))
+        f.write('*Boundary\n')
+        for dof, component in enumerate(('u1', 'u2', 'u3', 'ur1', 'ur2', 'ur3'), start=1):
+            value = float(displacement.get(component, 0))
+            f.write('RP-y, {0}, {0}{1}\n'.format(dof, ', {!r}'.format(value) if value != 0 else ''))
+        f.write('*Contact Pair, interaction=SelfContactProp, type=SURFACE TO SURFACE, tracking=STATE\n'
+                'ExteriorSurface,\n')
+        f.write('*Output, field\n*Node Output\nRF, U\n*Element Output, directions=YES\nIVOL, MISESMAX, S\n')
+        f.write('*Output, history\n*Node Output, nset=RP-y\nRF1, RF2, RF3, U1, U2, U3\n*Energy Output\nALLIE\n')
+        f.write('*End Step\n')
+    return len(node_indices), len(elements)
+
+
+if __name__ == '__main__':
+    import os
+    import tempfile
+    import time
+
+    # A random 20 x 20 x 20 topology meshed with 2 elements per voxel edge, written without ABAQUS/CAE
+    working_directory = tempfile.mkdtemp()
+    random_topology = np.random.RandomState(0).rand(20, 20, 20) < 0.6
+    input_file_name = os.path.join(working_directory, 'Job-random.inp')
+    start_time = time.time()
+    n_nodes, n_elements = write_compression_input_file(
+        file_name=input_file_name, topology=random_topology, unit_length=1., mesh_size=0.5, material_name='resin',
+        density=1.2e-09, engineering_constants=(1500, 1200, 1500, 0.35, 0.35, 0.35, 450, 550, 450),
+        displacement={'u1': 0, 'u2': -0.1, 'u3': 0, 'ur1': 0, 'ur2': 0, 'ur3': 0}, model_name='random')
+    print('{} nodes and {} elements written in {:.3f} s'.format(n_nodes, n_elements, time.time() - start_time))
+    print('Run it by: abaqus job=Job-random input={} interactive'.format(input_file_name))
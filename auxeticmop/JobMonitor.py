@@ -0,0 +1,197 @@
+# Progress monitoring of ABAQUS jobs. AbaqusScripts.py loads this file on the Python 2.7 of ABAQUS, so it only uses
+# the standard library and the syntax shared by Python 2 and 3.
+from __future__ import print_function
+import os
+import re
+import time
+from collections import namedtuple
+
+
+StaIncrement = namedtuple('StaIncrement', ('step', 'increment', 'attempt', 'is_cutback', 'severe_iterations',
+                                           'equilibrium_iterations', 'total_iterations', 'total_time', 'step_time',
+                                           'increment_size'))
+# STEP INC ATT SEVERE-DISCON-ITERS EQUIL-ITERS TOTAL-ITERS TOTAL-TIME STEP-TIME INC-OF-TIME, where an attempt ending
+# with U did not converge and is cut back
+_sta_increment_pattern = re.compile(r'^\s*(\d+)\s+(\d+)\s+(\d+)(U?)\s+(\d+)\s+(\d+)\s+(\d+)\s+(\S+)\s+(\S+)\s+(\S+)')
+STA_HEADER = (' SUMMARY OF JOB INFORMATION:\n'
+              ' STEP  INC ATT SEVERE EQUIL TOTAL  TOTAL      STEP       INC OF       DOF    IF\n'
+              '               DISCON ITERS ITERS  TIME/      TIME/LPF   TIME/LPF     MONITOR RIKS\n'
+              '               ITERS               FREQ\n')
+STA_COMPLETED = 'THE ANALYSIS HAS COMPLETED SUCCESSFULLY'
+STA_NOT_COMPLETED = 'THE ANALYSIS HAS NOT BEEN COMPLETED'
+
+
+def parse_sta_line(line):
+    """
+    :param line: A line of a .sta file.
+    :return: StaIncrement of an increment line, None for other lines.
+    """
+    match = _sta_increment_pattern.match(line)
+    if match is None:
+        return None
+    step, increment, attempt, cutback, severe, equilibrium, total, total_time, step_time, increment_size = \
+        match.groups()
+    try:
+        return StaIncrement(int(step), int(increment), int(attempt), cutback == 'U', int(severe), int(equilibrium),
+                            int(total), float(total_time), float(step_time), float(increment_size))
+    except ValueError:
+        return None
+
+
+class ProgressFileTail:
+    # Lines appended to a file since the last read, keeping an unfinished last line for the next read. The file may
+    # not exist yet, and starts over if it is written again from the beginning.
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.offset = 0
+        self._unfinished_line = ''
+
+    def read_lines(self):
+        if not os.path.isfile(self.file_name):
+            return []
+        if os.path.getsize(self.file_name) < self.offset:
+            self.offset, self._unfinished_line = 0, ''
+        with open(self.file_name, mode='rb') as f:
+            f.seek(self.offset)
+            chunk = f.read()
+            self.offset = f.tell()
+        lines = (self._unfinished_line + chunk.decode('latin1')).split('\n')
+        self._unfinished_line = lines.pop()
+        return [line.rstrip('\r') for line in lines]
+
+
+class JobWatchdog:
+    """
+    Follows the .sta and .msg files of a running job and tells when the job should be aborted: past the wall-clock or
+    increment budget, when its time increment collapses below min_increment or is cut back cutback_limit times in a
+    row, or on an error in the .msg file. A budget of 0 is unlimited.
+    """
+    def __init__(self, job_name, time_limit=0, increment_limit=0, min_increment=0, cutback_limit=0, directory='.',
+                 clock=time.time):
+        """
+        :param job_name: Name of the job, whose progress files are '<job_name>.sta' and '<job_name>.msg'.
+        :param time_limit: Wall-clock seconds from the creation of the watchdog.
+        :param increment_limit: Converged increments of the job.
+        :param min_increment: Smallest time increment of a converged increment.
+        :param cutback_limit: Consecutive cut back attempts.
+        :param directory: Directory of the progress files.
+        :param clock: Function returning the current time in seconds.
+        """
+        self.job_name = job_name
+        self.time_limit = time_limit
+        self.increment_limit = increment_limit
+        self.min_increment = min_increment
+        self.cutback_limit = cutback_limit
+        self.clock = clock
+        self.start_time = clock()
+        self.sta_file = ProgressFileTail(os.path.join(directory, '{}.sta'.format(job_name)))
+        self.msg_file = ProgressFileTail(os.path.join(directory, '{}.msg'.format(job_name)))
+        self.increments = 0
+        self.consecutive_cutbacks = 0
+        self.last_increment = None
+        self.completed = None  # True or False once the .sta file tells the end of the analysis
+        self.abort_reason = None
+
+    @property
+    def elapsed_time(self):
+        return self.clock() - self.start_time
+
+    def check(self):
+        """
+        Read new lines of the progress files.
+        :return: Reason to abort the job, None while the job is within its budgets.
+        """
+        if self.abort_reason is not None:
+            return self.abort_reason
+        for line in self.sta_file.read_lines():
+            self._read_sta_line(line)
+        for line in self.msg_file.read_lines():
+            if self.abort_reason is None and '***ERROR' in line:
+                self.abort_reason = 'Error in the message file: {}'.format(line.strip())
+        if self.abort_reason is None and self.completed is None:
+            if 0 < self.time_limit < self.elapsed_time:
+                self.abort_reason = 'Wall-clock time exceeded {} s'.format(self.time_limit)
+            elif 0 < self.increment_limit <= self.increments:
+                self.abort_reason = 'Increments reached {}'.format(self.increment_limit)
+        return self.abort_reason
+
+    def _read_sta_line(self, line):
+        if STA_COMPLETED in line:
+            self.completed = True
+            return
+        if STA_NOT_COMPLETED in line:
+            self.completed = False
+            return
+        increment = parse_sta_line(line)
+        if increment is None or self.abort_reason is not None:
+            return
+        self.last_increment = increment
+        if increment.is_cutback:
+            self.consecutive_cutbacks += 1
+            if 0 < self.cutback_limit <= self.consecutive_cutbacks:
+                self.abort_reason = 'Increment {} of step {} was cut back {} times in a row'.format(
+                    increment.increment, increment.step, self.consecutive_cutbacks)
+            return
+        self.consecutive_cutbacks = 0
+        self.increments += 1
+        if increment.increment_size < self.min_increment:
+            self.abort_reason = 'Time increment collapsed to {:g} at increment {} of step {}'.format(
+                increment.increment_size, increment.increment, increment.step)
+
+    def summary(self):
+        if self.last_increment is None:
+            return '{}: no increment after {:.1f} s'.format(self.job_name, self.elapsed_time)
+        return '{}: step {}, increment {}, step time {:g}, time increment {:g}, {:.1f} s'.format(
+            self.job_name, self.last_increment.step, self.last_increment.increment, self.last_increment.step_time,
+            self.last_increment.increment_size, self.elapsed_time)
+
+
+class FakeStaWriter:
+    # Writes a .sta file as a running job does, to exercise JobWatchdog without ABAQUS
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.step_time = 0.
+        with open(self.file_name, mode='w') as f:
+            f.write(STA_HEADER)
+
+    def write_increment(self, step, increment, attempt, increment_size, is_cutback=False, iterations=3):
+        if not is_cutback:
+            self.step_time += increment_size
+        with open(self.file_name, mode='a') as f:
+            f.write('{:4d} {:5d} {:3d}{:1s} {:4d} {:5d} {:5d}  {:<10.6g} {:<10.6g} {:<11.6g}\n'.format(
+                step, increment, attempt, 'U' if is_cutback else '', 0, iterations, iterations, self.step_time,
+                self.step_time, increment_size))
+
+    def write_end(self, completed=True):
+        with open(self.file_name, mode='a') as f:
+            f.write('\n {}\n'.format(STA_COMPLETED if completed else STA_NOT_COMPLETED))
+
+
+if __name__ == '__main__':
+    import tempfile
+    import threading
+
+    # A job whose time increment keeps shrinking, as a near-mechanism does, is aborted once it collapses
+    working_directory = tempfile.mkdtemp()
+    fake_job_name = 'Job-fake'
+    writer = FakeStaWriter(os.path.join(working_directory, '{}.sta'.format(fake_job_name)))
+
+    def _run_fake_job():
+        _increment_size = 0.01
+        for _increment in range(1, 60):
+            for _attempt in (1, 2):
+                writer.write_increment(step=1, increment=_increment, attempt=_attempt, increment_size=_increment_size,
+                                       is_cutback=_attempt == 1)
+                _increment_size *= 0.25 if _attempt == 1 else 1
+            time.sleep(0.02)
+        writer.write_end(completed=False)
+
+    fake_job = threading.Thread(target=_run_fake_job)
+    fake_job.start()
+    watchdog = JobWatchdog(job_name=fake_job_name, time_limit=30, increment_limit=1000, min_increment=1e-8,
+                           cutback_limit=5, directory=working_directory)
+    while watchdog.check() is None and watchdog.completed is None:
+        print(watchdog.summary())
+        time.sleep(0.05)
+    print('Abort reason:', watchdog.abort_reason)
+    fake_job.join()
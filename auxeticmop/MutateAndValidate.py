@@ -1,10 +1,27 @@
 from scipy.ndimage import label
-from numba import njit, int32
+from numba import njit, prange
 import numpy as np
 from typing import Union, Tuple
 
 
 def make_3d_print_without_support(arr_3d: np.ndarray, max_distance: int = 1) -> int:
+    """
+    Remove voxels which cannot be 3d-printed without support, in place.
+    A voxel survives if any voxel lies within max_distance of it on the previous layer, and its island on the layer
+    is directly supported by the previous layer. The previous layer is the lower one when sweeping upward from the
+    build plate, and the upper one when sweeping downward.
+    :param arr_3d: Topology array to modify in place.
+    :param max_distance: Maximum overhang distance in voxels.
+    :return: Number of changed voxels (non-positive).
+    """
+    return _make_3d_print_without_support(arr_3d, max_distance)
+
+
+def make_3d_print_without_support_by_islands(arr_3d: np.ndarray, max_distance: int = 1) -> int:
+    """
+    Former implementation of make_3d_print_without_support, labeling every layer by scipy.ndimage.label and
+    sweeping repeatedly. Kept as a reference for benchmarks.
+    """
     x_size, y_size, z_size = arr_3d.shape
     total_changed_voxels = 0
     while True:
@@ -79,76 +96,335 @@ def voxel_elimination_by_islands(x_size: int, z_size: int, labeled_arr: np.ndarr
     return changed_voxels
 
 
-def one_connected_tree(arr_3d: np.ndarray) -> Union[int, None]:
-    arr_shape = arr_3d.shape
-    labeled_arr, max_label_idx = label(arr_3d)
-    survived_labels = survived_tree_labels(labeled_arr, arr_shape[0], arr_shape[1], arr_shape[2])
-    if len(survived_labels) == 0:
-        return None
+def one_connected_tree(arr_3d: np.ndarray, connectivity: 'VoxelConnectivity' = None) -> Union[int, None]:
+    """
+    Leave only the largest voxel tree contacting all six faces of the cube.
+    :param arr_3d: Topology array to modify in place.
+    :param connectivity: Union-find of a previous state of arr_3d. If given, it is synchronized by
+    VoxelConnectivity.update() instead of being built from scratch.
+    :return: Number of changed voxels (non-positive), or None if no tree contacts all six faces.
+    """
+    if connectivity is None:
+        connectivity = VoxelConnectivity(arr_3d)
     else:
-        unique_arr = np.array(np.unique(labeled_arr, return_counts=True))
-        unique_sub_arr = unique_arr[:, np.isin(unique_arr[0], list(map(int, survived_labels)))]
-        survived_label = unique_sub_arr[0, np.argmax(unique_sub_arr[1])]
-        changed_voxels = one_survived_tree(arr_3d=arr_3d, labeled_arr=labeled_arr, survived_label=survived_label)
-        return changed_voxels
+        connectivity.update(arr_3d)
+    changed_voxels = _prune_to_largest_spanning_tree(arr_3d, connectivity.forest, connectivity.roots,
+                                                     connectivity.n_roots)
+    return None if changed_voxels == 1 else changed_voxels
+
+
+class VoxelConnectivity:
+    """
+    Union-find of face-connected solid voxels, kept equal to the connected components of a topology by update().
+    Every tree keeps its size, how many of its voxels lie on each face of the cube and a list of its voxels, and roots
+    are kept in a registry. Voxels turned on are merged into their neighbor trees. A removed voxel whose solid
+    neighbors are found connected by a bounded search is only marked empty, and only trees which may be split are
+    rebuilt from their remaining voxels. Pruning visits the voxels of the removed trees only.
+    """
+    def __init__(self, arr_3d: np.ndarray):
+        self.shape = arr_3d.shape
+        self.forest, self.roots, self.n_roots = _new_forest(arr_3d.size)
+        self.update(arr_3d)
+
+    def update(self, arr_3d: np.ndarray) -> int:
+        """
+        Synchronize with arr_3d. Finding the flipped voxels is one comparison per voxel, and the union-find work is
+        proportional to the flipped voxels and the trees which may be split.
+        :param arr_3d: Topology array, shape: self.shape
+        :return: Number of flipped voxels.
+        """
+        return _sync_union_find(arr_3d, self.forest, self.roots, self.n_roots)
+
+    def largest_spanning_tree(self) -> Union[np.ndarray, None]:
+        """
+        :return: Boolean mask of the largest tree contacting all six faces, or None if there is no such tree.
+        """
+        root = _largest_spanning_root(self.forest, self.roots, self.n_roots)
+        if root < 0:
+            return None
+        members = _tree_members(self.forest, root)
+        mask = np.zeros(int(np.prod(self.shape)), dtype=bool)
+        mask[members[self.forest[_SOLID, members] == 1]] = True
+        return mask.reshape(self.shape)
+
+
+# Rows of the forest array of VoxelConnectivity. Parent is -1 for voxels outside trees, and voxels removed without
+# rebuilding their tree stay in it as empty members. Next links the members of a tree starting from its root. Size
+# counts the solid members, and the other rows are valid for roots only.
+_PARENT, _SOLID, _SIZE, _N_MEMBERS, _NEXT, _TAIL, _ROOT_POSITION, _FACE_COUNTS = range(8)
+_N_FOREST_ROWS = _FACE_COUNTS + 6  # Solid members on the faces x = 0, x = lx - 1, y = 0, y = ly - 1, z = 0, z = lz - 1
+_max_connection_search = 4096  # Voxels searched before a tree losing a voxel is rebuilt instead
 
 
 @njit
-def survived_tree_labels(labeled_arr: np.ndarray, lx: int, ly: int, lz: int) -> set:
-    labels_plane_1 = set()
-    labels_plane_2 = set()
-    labels_plane_3 = set()
-    labels_plane_4 = set()
-    labels_plane_5 = set()
-    labels_plane_6 = set()
-
-    for idx_1 in range(ly):
-        for idx_2 in range(lz):
-            labels_plane_1.add(labeled_arr[0, idx_1, idx_2])
-    for idx_1 in range(ly):
-        for idx_2 in range(lz):
-            labels_plane_2.add(labeled_arr[lx - 1, idx_1, idx_2])
-    for idx_1 in range(lx):
-        for idx_2 in range(lz):
-            labels_plane_3.add(labeled_arr[idx_1, 0, idx_2])
-    for idx_1 in range(lx):
-        for idx_2 in range(lz):
-            labels_plane_4.add(labeled_arr[idx_1, ly - 1, idx_2])
-    for idx_1 in range(lx):
-        for idx_2 in range(ly):
-            labels_plane_5.add(labeled_arr[idx_1, idx_2, 0])
-    for idx_1 in range(lx):
-        for idx_2 in range(ly):
-            labels_plane_6.add(labeled_arr[idx_1, idx_2, lz - 1])
-    return labels_plane_1.intersection(labels_plane_2).intersection(labels_plane_3).intersection(
-        labels_plane_4).intersection(labels_plane_5).intersection(labels_plane_6).difference({int32(0)})
+def _new_forest(size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    forest = np.full((_N_FOREST_ROWS, size), -1, dtype=np.int64)
+    forest[_SOLID] = 0
+    return forest, np.empty(size, dtype=np.int64), np.zeros(1, dtype=np.int64)
+
+
+@njit
+def _find_root(parent: np.ndarray, idx: int) -> int:
+    while parent[idx] != idx:
+        parent[idx] = parent[parent[idx]]
+        idx = parent[idx]
+    return idx
+
+
+@njit
+def _tree_members(forest: np.ndarray, root: int) -> np.ndarray:
+    members = np.empty(forest[_N_MEMBERS, root], dtype=np.int64)
+    idx = root
+    for i in range(members.size):
+        members[i] = idx
+        idx = forest[_NEXT, idx]
+    return members
+
+
+@njit
+def _count_faces(forest: np.ndarray, root: int, idx: int, lx: int, ly: int, lz: int, count: int) -> None:
+    x, rest = divmod(idx, ly * lz)
+    y, z = divmod(rest, lz)
+    if x == 0:
+        forest[_FACE_COUNTS, root] += count
+    if x == lx - 1:
+        forest[_FACE_COUNTS + 1, root] += count
+    if y == 0:
+        forest[_FACE_COUNTS + 2, root] += count
+    if y == ly - 1:
+        forest[_FACE_COUNTS + 3, root] += count
+    if z == 0:
+        forest[_FACE_COUNTS + 4, root] += count
+    if z == lz - 1:
+        forest[_FACE_COUNTS + 5, root] += count
 
 
 @njit
-def one_survived_tree(arr_3d: np.ndarray, labeled_arr: np.ndarray, survived_label: int) -> int:
-    lx = arr_3d.shape[0]
-    ly = arr_3d.shape[1]
-    lz = arr_3d.shape[2]
+def _register_root(forest: np.ndarray, roots: np.ndarray, n_roots: np.ndarray, root: int) -> None:
+    forest[_ROOT_POSITION, root] = n_roots[0]
+    roots[n_roots[0]] = root
+    n_roots[0] += 1
+
+
+@njit
+def _unregister_root(forest: np.ndarray, roots: np.ndarray, n_roots: np.ndarray, root: int) -> None:
+    position = forest[_ROOT_POSITION, root]
+    last_root = roots[n_roots[0] - 1]
+    roots[position] = last_root
+    forest[_ROOT_POSITION, last_root] = position
+    forest[_ROOT_POSITION, root] = -1
+    n_roots[0] -= 1
+
+
+@njit
+def _union(forest: np.ndarray, roots: np.ndarray, n_roots: np.ndarray, idx_1: int, idx_2: int) -> None:
+    root_1, root_2 = _find_root(forest[_PARENT], idx_1), _find_root(forest[_PARENT], idx_2)
+    if root_1 == root_2:
+        return
+    kept_root, merged_root = min(root_1, root_2), max(root_1, root_2)
+    forest[_PARENT, merged_root] = kept_root
+    forest[_SIZE, kept_root] += forest[_SIZE, merged_root]
+    forest[_N_MEMBERS, kept_root] += forest[_N_MEMBERS, merged_root]
+    for row in range(_FACE_COUNTS, _N_FOREST_ROWS):
+        forest[row, kept_root] += forest[row, merged_root]
+    forest[_NEXT, forest[_TAIL, kept_root]] = merged_root
+    forest[_TAIL, kept_root] = forest[_TAIL, merged_root]
+    _unregister_root(forest, roots, n_roots, merged_root)
+
+
+@njit
+def _add_voxel(forest: np.ndarray, roots: np.ndarray, n_roots: np.ndarray, idx: int, lx: int, ly: int, lz: int) -> None:
+    """
+    Make solid voxel idx a tree of its own, then merge it with the trees of its solid face neighbors.
+    """
+    forest[_PARENT, idx] = idx
+    forest[_SOLID, idx] = 1
+    forest[_SIZE, idx] = 1
+    forest[_N_MEMBERS, idx] = 1
+    forest[_NEXT, idx] = -1
+    forest[_TAIL, idx] = idx
+    forest[_FACE_COUNTS:, idx] = 0
+    _count_faces(forest, idx, idx, lx, ly, lz, 1)
+    _register_root(forest, roots, n_roots, idx)
+    for neighbor in _face_neighbors(idx, lx, ly, lz):
+        if neighbor >= 0 and forest[_SOLID, neighbor] and forest[_PARENT, neighbor] >= 0:
+            _union(forest, roots, n_roots, idx, neighbor)
+
+
+@njit
+def _stays_connected(solid: np.ndarray, idx: int, lx: int, ly: int, lz: int) -> bool:
+    """
+    Whether the solid face neighbors of an emptied voxel are still connected, searched from one of them through solid
+    voxels. The search gives up after _max_connection_search voxels, as if the tree were split.
+    """
+    neighbors = np.empty(6, dtype=np.int64)
+    n_neighbors = 0
+    for neighbor in _face_neighbors(idx, lx, ly, lz):
+        if neighbor >= 0 and solid[neighbor]:
+            neighbors[n_neighbors] = neighbor
+            n_neighbors += 1
+    if n_neighbors <= 1:
+        return True
+    n_unreached = n_neighbors - 1
+    visited = {neighbors[0]}
+    queue = np.empty(_max_connection_search, dtype=np.int64)
+    queue[0] = neighbors[0]
+    queue_head, queue_size = 0, 1
+    while queue_head < queue_size:
+        for neighbor in _face_neighbors(queue[queue_head], lx, ly, lz):
+            if neighbor < 0 or not solid[neighbor] or neighbor in visited:
+                continue
+            if neighbor in neighbors[1:n_neighbors]:
+                n_unreached -= 1
+                if n_unreached == 0:
+                    return True
+            if queue_size == _max_connection_search:
+                return False
+            visited.add(neighbor)
+            queue[queue_size] = neighbor
+            queue_size += 1
+        queue_head += 1
+    return False
+
+
+@njit
+def _face_neighbors(idx: int, lx: int, ly: int, lz: int) -> Tuple[int, int, int, int, int, int]:
+    # Raster indices of the six face neighbors, -1 outside the cube
+    x, rest = divmod(idx, ly * lz)
+    y, z = divmod(rest, lz)
+    return (idx - ly * lz if x > 0 else -1, idx + ly * lz if x < lx - 1 else -1,
+            idx - lz if y > 0 else -1, idx + lz if y < ly - 1 else -1,
+            idx - 1 if z > 0 else -1, idx + 1 if z < lz - 1 else -1)
+
+
+@njit
+def _rebuild_tree(forest: np.ndarray, roots: np.ndarray, n_roots: np.ndarray, root: int,
+                  lx: int, ly: int, lz: int) -> None:
+    # Empty members leave the tree, and solid members make new trees of their own components
+    members = _tree_members(forest, root)
+    _unregister_root(forest, roots, n_roots, root)
+    for idx in members:
+        forest[_PARENT, idx] = -2 if forest[_SOLID, idx] else -1  # Solid members are pending until added again
+    for idx in members:
+        if forest[_PARENT, idx] == -2:
+            _add_voxel(forest, roots, n_roots, idx, lx, ly, lz)
+
+
+@njit
+def _remove_voxels(forest: np.ndarray, roots: np.ndarray, n_roots: np.ndarray, flat_indices: np.ndarray,
+                   lx: int, ly: int, lz: int) -> None:
+    """
+    Empty solid voxels. Trees which may be split are rebuilt once all voxels are emptied, and other trees only lose
+    the voxels from their counts.
+    """
+    split_roots = np.empty(flat_indices.size, dtype=np.int64)
+    n_split_roots = 0
+    for idx in flat_indices:
+        root = _find_root(forest[_PARENT], idx)
+        forest[_SOLID, idx] = 0
+        forest[_SIZE, root] -= 1
+        _count_faces(forest, root, idx, lx, ly, lz, -1)
+        if root in split_roots[:n_split_roots]:
+            continue
+        if forest[_SIZE, root] == 0 or not _stays_connected(forest[_SOLID], idx, lx, ly, lz):
+            split_roots[n_split_roots] = root
+            n_split_roots += 1
+    for root in split_roots[:n_split_roots]:
+        _rebuild_tree(forest, roots, n_roots, root, lx, ly, lz)
+
+
+@njit
+def _sync_union_find(arr_3d: np.ndarray, forest: np.ndarray, roots: np.ndarray, n_roots: np.ndarray) -> int:
+    lx, ly, lz = arr_3d.shape
+    flipped_indices = np.empty(arr_3d.size, dtype=np.int64)  # Added voxels from the front, removed from the back
+    n_added, n_removed = 0, 0
+    for x in range(lx):
+        for y in range(ly):
+            for z in range(lz):
+                idx = (x * ly + y) * lz + z
+                is_solid = forest[_SOLID, idx] != 0
+                if arr_3d[x, y, z] != 0 and not is_solid:
+                    flipped_indices[n_added] = idx
+                    n_added += 1
+                elif arr_3d[x, y, z] == 0 and is_solid:
+                    n_removed += 1
+                    flipped_indices[arr_3d.size - n_removed] = idx
+    if n_removed:
+        _remove_voxels(forest, roots, n_roots, flipped_indices[arr_3d.size - n_removed:], lx, ly, lz)
+    for idx in flipped_indices[:n_added]:
+        if forest[_PARENT, idx] >= 0:  # An empty member whose tree would not be connected through it any more
+            _rebuild_tree(forest, roots, n_roots, _find_root(forest[_PARENT], idx), lx, ly, lz)
+    for idx in flipped_indices[:n_added]:
+        _add_voxel(forest, roots, n_roots, idx, lx, ly, lz)
+    return n_added + n_removed
+
+
+@njit
+def _first_voxel(forest: np.ndarray, root: int) -> int:
+    first_voxel = -1
+    for idx in _tree_members(forest, root):
+        if forest[_SOLID, idx] and (first_voxel < 0 or idx < first_voxel):
+            first_voxel = idx
+    return first_voxel
+
+
+@njit
+def _largest_spanning_root(forest: np.ndarray, roots: np.ndarray, n_roots: np.ndarray) -> int:
+    """
+    Root of the largest tree contacting six faces, or -1. Trees of the same size are ordered by their first voxel in
+    raster order, as labels of scipy.ndimage.label.
+    """
+    largest_root = -1
+    for root in roots[:n_roots[0]]:
+        if np.any(forest[_FACE_COUNTS:, root] == 0):
+            continue
+        if largest_root < 0 or forest[_SIZE, root] > forest[_SIZE, largest_root]:
+            largest_root = root
+        elif forest[_SIZE, root] == forest[_SIZE, largest_root] and \
+                _first_voxel(forest, root) < _first_voxel(forest, largest_root):
+            largest_root = root
+    return largest_root
+
+
+@njit
+def _prune_to_largest_spanning_tree(arr_3d: np.ndarray, forest: np.ndarray, roots: np.ndarray,
+                                    n_roots: np.ndarray) -> int:
+    """
+    Remove all trees but the largest one contacting six faces from both arr_3d and the synchronized union-find.
+    Returns the (non-positive) number of changed voxels, or 1 if there is no tree contacting six faces.
+    """
+    lx, ly, lz = arr_3d.shape
+    largest_root = _largest_spanning_root(forest, roots, n_roots)
+    if largest_root < 0:
+        return 1
     changed_voxels = 0
-    for idx_1 in range(lx):
-        for idx_2 in range(ly):
-            for idx_3 in range(lz):
-                if labeled_arr[idx_1, idx_2, idx_3] == 0:
-                    continue
-                elif labeled_arr[idx_1, idx_2, idx_3] != survived_label:
-                    changed_voxels -= 1
-                    arr_3d[idx_1, idx_2, idx_3] = 0
+    for root in roots[:n_roots[0]]:
+        if root == largest_root:
+            continue
+        for idx in _tree_members(forest, root):
+            if forest[_SOLID, idx]:
+                x, rest = divmod(idx, ly * lz)
+                y, z = divmod(rest, lz)
+                arr_3d[x, y, z] = 0
+                forest[_SOLID, idx] = 0
+                changed_voxels -= 1
+            forest[_PARENT, idx] = -1
+        forest[_ROOT_POSITION, root] = -1
+    roots[0] = largest_root
+    forest[_ROOT_POSITION, largest_root] = 0
+    n_roots[0] = 1
     return changed_voxels
 
 
 def mutate_and_validate_topology(arr_3d: np.ndarray, mutation_probability: float) -> Union[None, np.ndarray]:
     arr_3d_mutated, voxels_mutation = mutation(arr_3d.copy(), mutation_probability=mutation_probability)
     lx, ly, lz = arr_3d.shape
+    connectivity = VoxelConnectivity(arr_3d_mutated)
     while True:
         voxels_validation = 0
         while True:
             _arr_3d_mutated = arr_3d_mutated.copy()
-            voxels_oct = one_connected_tree(arr_3d_mutated)
+            voxels_oct = one_connected_tree(arr_3d_mutated, connectivity=connectivity)
             if voxels_oct is None:
                 return None
             voxels_vsc = make_voxels_surface_contact(arr_3d_mutated)
@@ -166,6 +442,16 @@ def mutate_and_validate_topology(arr_3d: np.ndarray, mutation_probability: float
                     break
 
 
+@njit
+def seed_numba_random(seed: int) -> None:
+    """
+    Seed the random generator used inside numba-compiled functions, which is independent of numpy's global one.
+    :param seed: Seed value.
+    :return: None
+    """
+    np.random.seed(seed)
+
+
 @njit
 def mutation(arr_3d: np.ndarray, mutation_probability: float) -> Tuple[np.ndarray, int]:
     _arr_3d = arr_3d.copy()
@@ -266,3 +552,162 @@ def make_voxels_surface_contact(arr_3d: np.ndarray) -> int:
         if changed_voxels == 0:
             break
     return total_changed_voxels
+
+
+VALIDATION_STATUS_VALID = 0
+VALIDATION_STATUS_NOT_CONNECTED = 1
+VALIDATION_STATUS_NOT_CONVERGED = 2
+_max_validation_passes = 100
+
+
+def validate_topologies(topologies: np.ndarray, max_distance: int = 1,
+                        parallel: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Validate a whole population of topologies in one call. Each topology is repaired by one_connected_tree,
+    make_voxels_surface_contact and make_3d_print_without_support until nothing changes, in parallel over entities.
+    :param topologies: Stack of topologies, shape: (N, lx, ly, lz)
+    :param max_distance: Maximum overhang distance used for 3d-print-ability.
+    :param parallel: If False, topologies are validated one after another, as in workers of a process pool, which
+    are already parallel and where the threads of numba cannot be used after a fork. A process which validates in
+    parallel and then forks a process pool, as the GA does for offspring and local analyses, hangs at exit under the
+    TBB threading layer of numba, so such processes need NUMBA_THREADING_LAYER=workqueue (or omp) in the environment.
+    :return: Validated stack as uint8, shape: (N, lx, ly, lz), and status codes, shape: (N,).
+    Random choices of make_voxels_surface_contact are seeded per topology from numpy's global generator, so the
+    results do not depend on which thread validates which topology.
+    VALIDATION_STATUS_VALID means the validated topology passes all conditions without further changes,
+    VALIDATION_STATUS_NOT_CONNECTED means there is no tree contacting six faces,
+    VALIDATION_STATUS_NOT_CONVERGED means the repair processes keep changing voxels back and forth.
+    """
+    validated = np.ascontiguousarray(topologies, dtype=np.uint8).copy()
+    status = np.empty(len(validated), dtype=np.int8)
+    seeds = np.random.randint(0, 2 ** 31 - 1, size=len(validated)).astype(np.int64)
+    if parallel:
+        _validate_topologies_in_parallel(validated, max_distance, seeds, status)
+    else:
+        _validate_topologies_serially(validated, max_distance, seeds, status)
+    return validated, status
+
+
+def mutate_and_validate_topologies(topologies: np.ndarray, mutation_probability: float, max_distance: int = 1,
+                                   parallel: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Mutate a stack of children and validate all of them in one call of validate_topologies(). Unlike
+    mutate_and_validate_topology, a child whose validation does not converge is not mutated again, but reported by
+    its status so that the caller draws another child.
+    :param topologies: Stack of topologies, shape: (N, lx, ly, lz)
+    :param mutation_probability: Probability to flip each voxel.
+    :param max_distance: Maximum overhang distance used for 3d-print-ability.
+    :param parallel: Whether topologies are validated in parallel, as validate_topologies().
+    :return: Validated stack and status codes, as validate_topologies().
+    """
+    mutated = np.empty(np.shape(topologies), dtype=np.uint8)
+    for entity_idx, topology in enumerate(topologies):
+        mutated[entity_idx] = mutation(np.ascontiguousarray(topology, dtype=np.uint8), mutation_probability)[0]
+    return validate_topologies(mutated, max_distance=max_distance, parallel=parallel)
+
+
+@njit(parallel=True)
+def _validate_topologies_in_parallel(topologies: np.ndarray, max_distance: int, seeds: np.ndarray,
+                                     status: np.ndarray) -> None:
+    for entity_idx in prange(topologies.shape[0]):
+        np.random.seed(seeds[entity_idx])  # Generator of the thread running this entity
+        status[entity_idx] = _validate_topology(topologies[entity_idx], max_distance)
+
+
+@njit
+def _validate_topologies_serially(topologies: np.ndarray, max_distance: int, seeds: np.ndarray,
+                                  status: np.ndarray) -> None:
+    for entity_idx in range(topologies.shape[0]):
+        np.random.seed(seeds[entity_idx])
+        status[entity_idx] = _validate_topology(topologies[entity_idx], max_distance)
+
+
+@njit
+def _validate_topology(arr_3d: np.ndarray, max_distance: int) -> int:
+    forest, roots, n_roots = _new_forest(arr_3d.size)
+    for _ in range(_max_validation_passes):
+        arr_3d_before = arr_3d.copy()
+        _sync_union_find(arr_3d, forest, roots, n_roots)
+        voxels_oct = _prune_to_largest_spanning_tree(arr_3d, forest, roots, n_roots)
+        if voxels_oct == 1:
+            return VALIDATION_STATUS_NOT_CONNECTED
+        voxels_vsc = make_voxels_surface_contact(arr_3d)
+        voxels_3pws = _make_3d_print_without_support(arr_3d, max_distance)
+        if np.array_equal(arr_3d, arr_3d_before):
+            if voxels_oct == 0 and voxels_vsc == 0 and voxels_3pws == 0:
+                return VALIDATION_STATUS_VALID
+            return VALIDATION_STATUS_NOT_CONVERGED
+    return VALIDATION_STATUS_NOT_CONVERGED
+
+
+@njit
+def _make_3d_print_without_support(arr_3d: np.ndarray, max_distance: int) -> int:
+    """
+    Each layer is settled exactly in one visit, given its previous layer: voxels without a voxel under their
+    max_distance neighborhood are removed, then support is propagated by a queue from directly supported voxels
+    through face-connected voxels of the layer, and unreached voxels are removed. Removing voxels never adds support,
+    so an upward sweep followed by a downward sweep is repeated only while the downward one changes anything.
+    """
+    lx, ly, lz = arr_3d.shape
+    support_table = np.zeros((lx + 1, lz + 1), dtype=np.int32)
+    is_reached = np.zeros((lx, lz), dtype=np.bool_)
+    queue = np.empty((lx * lz, 2), dtype=np.int32)
+    total_changed_voxels = 0
+    while True:
+        for y_idx in range(1, ly):
+            total_changed_voxels += _settle_layer(arr_3d, y_idx, y_idx - 1, max_distance,
+                                                  support_table, is_reached, queue)
+        downward_changed_voxels = 0
+        for y_idx in range(ly - 2, -1, -1):
+            downward_changed_voxels += _settle_layer(arr_3d, y_idx, y_idx + 1, max_distance,
+                                                     support_table, is_reached, queue)
+        total_changed_voxels += downward_changed_voxels
+        if downward_changed_voxels == 0:
+            break
+    return total_changed_voxels
+
+
+@njit
+def _settle_layer(arr_3d: np.ndarray, y_idx: int, y_support: int, max_distance: int,
+                  support_table: np.ndarray, is_reached: np.ndarray, queue: np.ndarray) -> int:
+    lx, ly, lz = arr_3d.shape
+    for x in range(lx):
+        for z in range(lz):
+            support_table[x + 1, z + 1] = support_table[x, z + 1] + support_table[x + 1, z] - support_table[x, z] + \
+                                          (arr_3d[x, y_support, z] != 0)
+    changed_voxels = 0
+    queue_size = 0
+    for x in range(lx):
+        for z in range(lz):
+            is_reached[x, z] = False
+            if arr_3d[x, y_idx, z] == 0:
+                continue
+            x_1, x_2 = max(0, x - max_distance), min(lx, x + max_distance + 1)
+            z_1, z_2 = max(0, z - max_distance), min(lz, z + max_distance + 1)
+            if support_table[x_2, z_2] - support_table[x_1, z_2] - support_table[x_2, z_1] + \
+                    support_table[x_1, z_1] == 0:
+                arr_3d[x, y_idx, z] = 0
+                changed_voxels -= 1
+            elif arr_3d[x, y_support, z]:
+                is_reached[x, z] = True
+                queue[queue_size, 0], queue[queue_size, 1] = x, z
+                queue_size += 1
+    queue_head = 0
+    while queue_head < queue_size:
+        x, z = queue[queue_head, 0], queue[queue_head, 1]
+        queue_head += 1
+        for dx, dz in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            nx, nz = x + dx, z + dz
+            if nx < 0 or nz < 0 or nx == lx or nz == lz:
+                continue
+            if arr_3d[nx, y_idx, nz] == 0 or is_reached[nx, nz]:
+                continue
+            is_reached[nx, nz] = True
+            queue[queue_size, 0], queue[queue_size, 1] = nx, nz
+            queue_size += 1
+    for x in range(lx):
+        for z in range(lz):
+            if arr_3d[x, y_idx, z] and not is_reached[x, z]:
+                arr_3d[x, y_idx, z] = 0
+                changed_voxels -= 1
+    return changed_voxels
@@ -1,3 +1,5 @@
+import asyncio
+import itertools
 import socket
 import threading
 import json
@@ -10,20 +12,232 @@ from multiprocessing import connection
 from datetime import datetime
 from time import sleep
 from sys import version_info
-from typing import Tuple
+from collections import deque
+from concurrent.futures import Future, as_completed
+from typing import Tuple, Callable, Union, Awaitable
+import numpy as np
 try:
-    from Queue import Queue
+    from Queue import Queue, Empty
 except ImportError:
-    from queue import Queue
+    from queue import Queue, Empty
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Binary protocol: every frame is a header of (codec, payload size) followed by the payload. Right after connecting,
+# each side sends a json hello frame listing the codecs it decodes, and the other side picks from them afterwards.
+# Pickle runs code of whoever can reach the port while loading, so it is decoded only by the legacy option 'pickle'.
+PROTOCOL_VERSION = 2
+CODEC_JSON, CODEC_PICKLE, CODEC_MSGPACK, CODEC_NDARRAY = range(4)
+_binary_header = struct.Struct('>BI')
+_legacy_header = struct.Struct('>I')
+_part_header = struct.Struct('>Q')
+
+
+def supported_codecs() -> list:
+    return [CODEC_JSON, CODEC_NDARRAY] + ([CODEC_MSGPACK] if msgpack is not None else [])
+
+
+def recv_exactly(sock: socket.socket, size: int) -> bytearray:
+    """
+    Receive exactly size bytes into a preallocated buffer, however the stream is split.
+    :param sock: Connected socket.
+    :param size: Number of bytes to receive.
+    :return: Received bytes.
+    :raises ConnectionError: If the peer closes the connection first.
+    """
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received_size = 0
+    while received_size < size:
+        chunk_size = sock.recv_into(view[received_size:], size - received_size)
+        if chunk_size == 0:
+            raise ConnectionError('Connection closed by peer')
+        received_size += chunk_size
+    return buffer
+
+
+def contains_ndarray(obj: any) -> bool:
+    if isinstance(obj, np.ndarray):
+        return True
+    if isinstance(obj, dict):
+        return any(contains_ndarray(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(contains_ndarray(value) for value in obj)
+    return False
+
+
+def choose_codec(data: any, peer_codecs: Union[list, set]) -> int:
+    if CODEC_NDARRAY in peer_codecs and contains_ndarray(data):
+        return CODEC_NDARRAY
+    if CODEC_MSGPACK in peer_codecs and CODEC_MSGPACK in supported_codecs():
+        return CODEC_MSGPACK
+    return CODEC_JSON
+
+
+def json_compatible(obj: any) -> any:
+    """
+    Arrays and numpy scalars as nested lists and Python scalars, for a peer which decodes json only.
+    """
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, dict):
+        return {key: json_compatible(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [json_compatible(value) for value in obj]
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+
+def _extract_arrays(obj: any, arrays: list) -> any:
+    if isinstance(obj, np.ndarray):
+        arrays.append(np.ascontiguousarray(obj))
+        return {'__ndarray__': len(arrays) - 1, 'dtype': obj.dtype.str, 'shape': list(obj.shape)}
+    if isinstance(obj, dict):
+        return {key: _extract_arrays(value, arrays) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_extract_arrays(value, arrays) for value in obj]
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+
+def _insert_arrays(obj: any, arrays: list) -> any:
+    if isinstance(obj, dict):
+        if '__ndarray__' in obj:
+            return arrays[obj['__ndarray__']]
+        return {key: _insert_arrays(value, arrays) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [_insert_arrays(value, arrays) for value in obj]
+    return obj
+
+
+def encode_message(data: any, codec: int) -> list:
+    """
+    :param data: Data to send.
+    :param codec: One of CODEC_JSON, CODEC_PICKLE, CODEC_MSGPACK and CODEC_NDARRAY. With CODEC_NDARRAY, arrays in
+    data are sent as raw buffers after a json skeleton which describes their dtypes and shapes. With CODEC_JSON,
+    arrays are sent as nested lists.
+    :return: Parts of the payload, to be sent in order without concatenating them.
+    """
+    if codec == CODEC_JSON:
+        return [json.dumps(json_compatible(data)).encode()]
+    if codec == CODEC_PICKLE:
+        return [pickle.dumps(data, protocol=2)]
+    if codec == CODEC_MSGPACK:
+        return [msgpack.packb(data, use_bin_type=True)]
+    arrays = list()
+    skeleton = json.dumps(_extract_arrays(data, arrays)).encode()
+    parts = [_part_header.pack(len(skeleton)), skeleton]
+    for array in arrays:
+        parts += [_part_header.pack(array.nbytes), memoryview(array.reshape(-1).view(np.uint8))]
+    return parts
+
+
+def decode_message(codec: int, payload: bytearray, allow_pickle: bool = False) -> any:
+    """
+    Decode a payload. Arrays of CODEC_NDARRAY are views on payload, without copying.
+    :param allow_pickle: If True, CODEC_PICKLE is decoded. Only for the legacy option 'pickle', chosen explicitly.
+    """
+    if codec == CODEC_JSON:
+        return json.loads(payload.decode())
+    if codec == CODEC_PICKLE:
+        if not allow_pickle:
+            raise ValueError('Pickled data is decoded only by the option \'pickle\'')
+        return pickle.loads(payload, encoding='latin1')  # Strings and arrays pickled by Python 2
+    if codec == CODEC_MSGPACK:
+        return msgpack.unpackb(payload, raw=False)
+    if codec != CODEC_NDARRAY:
+        raise ValueError(f'Unknown codec: {codec}')
+    skeleton_size = _part_header.unpack_from(payload, 0)[0]
+    offset = _part_header.size
+    skeleton = json.loads(payload[offset:offset + skeleton_size].decode())
+    offset += skeleton_size
+    arrays = list()
+    while offset < len(payload):
+        array_size = _part_header.unpack_from(payload, offset)[0]
+        offset += _part_header.size
+        arrays.append(np.frombuffer(payload, dtype=np.uint8, count=array_size, offset=offset))
+        offset += array_size
+    descriptions = list()
+
+    def _collect(obj):
+        if isinstance(obj, dict):
+            if '__ndarray__' in obj:
+                descriptions.append(obj)
+                return
+            for value in obj.values():
+                _collect(value)
+        elif isinstance(obj, list):
+            for value in obj:
+                _collect(value)
+
+    _collect(skeleton)
+    for description in descriptions:
+        index = description['__ndarray__']
+        arrays[index] = arrays[index].view(np.dtype(description['dtype'])).reshape(description['shape'])
+    return _insert_arrays(skeleton, arrays)
+
+
+def send_frame(sock: socket.socket, data: any, option: str, peer_codecs: Union[list, set] = (CODEC_JSON,)) -> int:
+    """
+    Send data as one frame.
+    :param sock: Connected socket.
+    :param data: Data to send.
+    :param option: 'json' or 'pickle' for the legacy frames of a size header only, or 'binary'.
+    :param peer_codecs: Codecs decoded by the peer, for option 'binary'.
+    :return: Payload size.
+    """
+    if option == 'binary':
+        codec = choose_codec(data, peer_codecs)
+        parts = encode_message(data, codec)
+        payload_size = sum(len(part) if isinstance(part, bytes) else part.nbytes for part in parts)
+        sock.sendall(_binary_header.pack(codec, payload_size))
+    else:
+        parts = encode_message(data, CODEC_PICKLE if option == 'pickle' else CODEC_JSON)
+        payload_size = len(parts[0])
+        sock.sendall(_legacy_header.pack(payload_size))
+    for part in parts:
+        sock.sendall(part)
+    return payload_size
+
+
+def recv_frame(sock: socket.socket, option: str) -> Tuple[int, bytearray]:
+    """
+    Receive one frame.
+    :return: Codec and payload of the frame.
+    """
+    if option == 'binary':
+        codec, payload_size = _binary_header.unpack(recv_exactly(sock, _binary_header.size))
+    else:
+        codec = CODEC_PICKLE if option == 'pickle' else CODEC_JSON
+        payload_size = _legacy_header.unpack(recv_exactly(sock, _legacy_header.size))[0]
+    return codec, recv_exactly(sock, payload_size)
+
+
+def hello_message() -> dict:
+    return {'__hello__': PROTOCOL_VERSION, 'codecs': supported_codecs()}
+
+
+def abbreviate(data: any, max_length: int = 200) -> str:
+    text = ' '.join(repr(data).split())
+    return text if len(text) <= max_length else f'{text[:max_length]}... ({len(text)} characters)'
 
 
 class Server:
     def __init__(self, host, port, option, run_nonblocking):
+        """
+        :param option: 'json' or 'pickle' for the legacy protocol, or 'binary' for the binary protocol whose codecs
+        are negotiated with every client. Only 'pickle' loads pickled data, so use it with trusted clients only.
+        """
         self.host = host
         self.port = port
         self.option = option
         self.q = Queue()
         self.connected_clients = list()
+        self.peer_codecs = dict()
         self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         try:
             self.server_socket.bind((self.host, self.port))
@@ -31,9 +245,6 @@ class Server:
             warnings.warn('Multiple server on same port cannot be bound. If not, Server might not be created within conditional block [if __name__=="__main__"]')
             raise SystemExit(e)
         self.server_socket.listen(5)
-        self._default_packet_size = 1024
-        self._header_format = '>I'
-        self._header_bytes = 4
         if run_nonblocking:
             self._server_th = threading.Thread(target=self.run, daemon=True)
             self._server_th.start()
@@ -49,29 +260,41 @@ class Server:
                 else:
                     new_th = threading.Thread(target=self._thread_recv, args=(client_socket, client_addr, self.option))
                     new_th.setDaemon(True)
+                if self.option == 'binary':  # Joins connected_clients when its hello frame arrives
+                    self.peer_codecs[client_socket] = [CODEC_JSON]
+                    send_frame(client_socket, hello_message(), option=self.option)
+                else:
+                    self.connected_clients.append(client_socket)
                 new_th.start()
-                self.connected_clients.append(client_socket)
             except Exception as e:
                 print('<!> Server error:', e)
                 break
         self.server_socket.close()
 
     def send(self, client_socket: socket.socket, data: any) -> bool:
-        if self.option == 'pickle':
-            serialized_data = pickle.dumps(data, protocol=2)
-        else:
-            serialized_data = json.dumps(data).encode()
         try:
-            print('Sending packets: ', serialized_data)
-            client_socket.sendall(struct.pack(self._header_format, len(serialized_data)))
-            client_socket.sendall(serialized_data)
+            payload_size = send_frame(client_socket, data, option=self.option,
+                                      peer_codecs=self.peer_codecs.get(client_socket, [CODEC_JSON]))
+            print('Sent packets: ', payload_size, 'bytes')
             return True
         except ConnectionError as e:
             print(e)
             return False
 
     def recv(self):
-        return self.q.get()
+        while True:
+            _, data = self.q.get()
+            if data is not None:
+                return data
+
+    def recv_from(self, timeout: Union[float, None] = None) -> Tuple[socket.socket, any]:
+        """
+        Receive a data together with the client socket which sent it.
+        :param timeout: Seconds to wait for a data. If None, wait until a data arrives.
+        :return: Client socket and received data. The data is None if the client has been disconnected.
+        :raises queue.Empty: If no data arrives within timeout.
+        """
+        return self.q.get(timeout=timeout)
 
     def close(self):
         self.server_socket.close()
@@ -79,30 +302,27 @@ class Server:
     def _thread_recv(self, client_socket, client_addr, option):
         print('[{}] {}:{} has joined!'.format(datetime.now(), client_addr[0], client_addr[1]))
         while True:
-            try:  # Trying to receive a data and decode it
-                data_size = struct.unpack(self._header_format, client_socket.recv(self._header_bytes))[0]
-                remaining_payload_size = data_size
-                packets = b''
-                while remaining_payload_size != 0:
-                    packets += client_socket.recv(remaining_payload_size)
-                    remaining_payload_size = data_size - len(packets)
-                try:  # Trying to decode received data
-                    if option == 'json':
-                        received_data = json.loads(packets.decode())
-                    else:
-                        if version_info.major >= 3:
-                            received_data = pickle.loads(packets, encoding='bytes')
-                        else:
-                            received_data = pickle.loads(packets)
-                    print('[{}] Received data: {}'.format(datetime.now(), received_data))
-                    self.q.put(received_data)
-                except Exception as e2:  # Decoding is failed
-                    print('[{}] Loading received data failure: {}'.format(datetime.now(), e2))
-                    continue
+            try:  # Trying to receive a data
+                codec, payload = recv_frame(client_socket, option=option)
             except Exception as e1:  # Connection is lost
                 print('[{}] Error: {}'.format(datetime.now(), e1))
                 break
-        self.is_alive = False
+            try:  # Trying to decode received data
+                received_data = decode_message(codec, payload, allow_pickle=option == 'pickle')
+            except Exception as e2:  # Decoding is failed
+                print('[{}] Loading received data failure: {}'.format(datetime.now(), e2))
+                continue
+            if isinstance(received_data, dict) and '__hello__' in received_data:
+                self.peer_codecs[client_socket] = received_data['codecs']
+                if client_socket not in self.connected_clients:
+                    self.connected_clients.append(client_socket)
+                continue
+            print('[{}] Received data: {}'.format(datetime.now(), abbreviate(received_data)))
+            self.q.put((client_socket, received_data))
+        if client_socket in self.connected_clients:
+            self.connected_clients.remove(client_socket)
+        self.peer_codecs.pop(client_socket, None)
+        self.q.put((client_socket, None))
 
 
 class Client:
@@ -113,9 +333,8 @@ class Client:
         self.q = Queue()
         self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.is_alive = True
-        self._default_packet_size = 1024
-        self._header_format = '>I'
-        self._header_bytes = 4
+        self.peer_codecs = [CODEC_JSON]
+        self._send_lock = threading.Lock()  # Heartbeats are answered from the receiving thread
         if connect:
             self.connect()
 
@@ -127,18 +346,17 @@ class Client:
             new_th.setDaemon(True)
         self.client_socket.connect((self.host, self.port))
         print('[{}] Connected to {}:{}'.format(datetime.now(), self.host, self.port))
+        if self.option == 'binary':
+            send_frame(self.client_socket, hello_message(), option=self.option)
         new_th.start()
 
     def send(self, data):
-        if self.option == 'pickle':
-            serialized_data = pickle.dumps(data, protocol=2)
-        else:
-            serialized_data = json.dumps(data).encode()
         while True:
             try:
-                print('Sending packets: ', serialized_data)
-                self.client_socket.sendall(struct.pack(self._header_format, len(serialized_data)))
-                self.client_socket.sendall(serialized_data)
+                with self._send_lock:
+                    payload_size = send_frame(self.client_socket, data, option=self.option,
+                                              peer_codecs=self.peer_codecs)
+                print('Sent packets: ', payload_size, 'bytes')
                 break
             except Exception as send_error:
                 print('Sending data failed, trying to reconnect to server: ', send_error)
@@ -152,33 +370,266 @@ class Client:
 
     def _thread_recv(self, client_socket, option):
         while True:
-            try:  # Trying to receive a data and decode it
-                data_size = struct.unpack(self._header_format, client_socket.recv(self._header_bytes))[0]
-                remaining_payload_size = data_size
-                packets = b''
-                while remaining_payload_size != 0:
-                    packets += client_socket.recv(remaining_payload_size)
-                    remaining_payload_size = data_size - len(packets)
-                try:  # Trying to decode received data
-                    if option == 'json':
-                        received_data = json.loads(packets.decode())
-                    else:
-                        if version_info.major >= 3:
-                            received_data = pickle.loads(packets, encoding='bytes')
-                        else:
-                            received_data = pickle.loads(packets)
-                    print('[{}] Received data: {}'.format(datetime.now(), received_data))
-                    self.q.put(received_data)
-                except Exception as e2:  # Decoding is failed
-                    print('[{}] Loading received data failure: {}'.format(datetime.now(), e2))
-                    continue
+            try:  # Trying to receive a data
+                codec, payload = recv_frame(client_socket, option=option)
             except Exception as e1:  # Connection is lost
                 print('[{}] Error: {}'.format(datetime.now(), e1))
                 break
+            try:  # Trying to decode received data
+                received_data = decode_message(codec, payload, allow_pickle=option == 'pickle')
+            except Exception as e2:  # Decoding is failed
+                print('[{}] Loading received data failure: {}'.format(datetime.now(), e2))
+                continue
+            if isinstance(received_data, dict) and '__hello__' in received_data:
+                self.peer_codecs = received_data['codecs']
+                continue
+            if isinstance(received_data, dict) and '__heartbeat__' in received_data:
+                try:
+                    with self._send_lock:
+                        send_frame(client_socket, received_data, option=option, peer_codecs=self.peer_codecs)
+                except Exception as e3:
+                    print('[{}] Heartbeat failure: {}'.format(datetime.now(), e3))
+                continue
+            print('[{}] Received data: {}'.format(datetime.now(), abbreviate(received_data)))
+            self.q.put(received_data)
         self.is_alive = False
         print('<!> Connection dead')
 
 
+class SessionLost(ConnectionError):
+    pass
+
+
+class ClientSession:
+    """
+    A client connected to AsyncServer, with its requests in flight.
+    """
+    def __init__(self, session_id: int, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.session_id = session_id
+        self.reader = reader
+        self.writer = writer
+        self.peer_codecs = [CODEC_JSON]
+        self.in_flight = dict()  # request id: future of response
+        self.last_seen = asyncio.get_running_loop().time()
+        self.is_alive = True
+        self.is_ready = False  # Until the hello frame of the client arrives
+        self.receive_task = None
+        self.heartbeat_task = None
+        self._send_lock = asyncio.Lock()
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.writer.get_extra_info('peername')
+
+    async def send(self, data: any) -> int:
+        """
+        Send a frame of the binary protocol. Waits while the transport buffer is full, so a slow client holds back
+        its sender instead of growing the buffer.
+        :return: Payload size.
+        """
+        codec = choose_codec(data, self.peer_codecs)
+        parts = encode_message(data, codec)
+        payload_size = sum(len(part) if isinstance(part, bytes) else part.nbytes for part in parts)
+        async with self._send_lock:
+            self.writer.write(_binary_header.pack(codec, payload_size))
+            for part in parts:
+                self.writer.write(part)
+            await self.writer.drain()
+        return payload_size
+
+    async def recv(self) -> any:
+        codec, payload_size = _binary_header.unpack(await self.reader.readexactly(_binary_header.size))
+        return decode_message(codec, await self.reader.readexactly(payload_size))
+
+
+class AsyncServer:
+    """
+    Asyncio server of the binary protocol, where each client is a session and every request waits for the response
+    carrying its request id. Sessions are sent heartbeats and closed when silent for heartbeat_timeout, and requests in
+    flight on a lost session are submitted again to another one. A session holds at most capacity_per_client requests
+    at once, and further submissions wait for a free slot.
+    """
+    def __init__(self, host: str, port: int, capacity_per_client: int = 1, heartbeat_interval: float = 5.0,
+                 heartbeat_timeout: float = 20.0, max_retries: int = 2,
+                 on_message: Union[Callable[[ClientSession, dict], None], None] = None, run_nonblocking: bool = True):
+        """
+        :param capacity_per_client: Requests in flight per session, i.e. concurrent jobs of a client.
+        :param heartbeat_interval: Seconds between heartbeats sent to every session.
+        :param heartbeat_timeout: Seconds of silence after which a session is regarded as dead.
+        :param max_retries: Times a request is submitted again after losing its session.
+        :param on_message: Called with the session and data of every message which is not a response, e.g. logs.
+        :param run_nonblocking: If True, the event loop runs in a daemon thread, and the methods ending with
+        _threadsafe are used from other threads.
+        """
+        self.host = host
+        self.port = port
+        self.option = 'binary'
+        self.capacity_per_client = capacity_per_client
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_retries = max_retries
+        self.on_message = on_message
+        self.sessions = dict()  # session id: session
+        self.loop = None
+        self._server = None
+        self._session_ids = itertools.count(1)
+        self._request_ids = itertools.count(1)
+        self._sessions_changed = None
+        if run_nonblocking:
+            started = threading.Event()
+            self._loop_th = threading.Thread(target=self._run_loop, args=(started,), daemon=True)
+            self._loop_th.start()
+            started.wait()
+
+    def _run_loop(self, started: threading.Event) -> None:
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.start())
+        started.set()
+        self.loop.run_forever()
+
+    @property
+    def connected_clients(self) -> list:
+        return [session for session in self.sessions.values() if session.is_alive and session.is_ready]
+
+    async def start(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        self._sessions_changed = asyncio.Condition()
+        self._server = await asyncio.start_server(self._handle_session, self.host, self.port)
+        print('[{}] Waiting for clients on port {}...'.format(datetime.now(), self.port))
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+        sessions = list(self.sessions.values())
+        for session in sessions:
+            await self._drop_session(session)
+        # Closed transports end receiving tasks
+        await asyncio.gather(*[session.receive_task for session in sessions], return_exceptions=True)
+
+    async def wait_for_clients(self, n_clients: int = 1, timeout: Union[float, None] = None) -> None:
+        async def _wait():
+            async with self._sessions_changed:
+                await self._sessions_changed.wait_for(lambda: len(self.connected_clients) >= n_clients)
+        await asyncio.wait_for(_wait(), timeout)
+
+    async def submit(self, data: dict, timeout: Union[float, None] = None) -> dict:
+        """
+        Send a request to the least loaded session and wait for its response.
+        :param data: Request data. 'request_id' is added, and the client must echo it in the response.
+        :param timeout: Seconds to wait for the response after sending, None to wait until the session is lost.
+        :return: Response data.
+        :raises asyncio.TimeoutError: If no response arrives within timeout.
+        :raises SessionLost: If sessions are lost more than max_retries times.
+        """
+        for attempt in range(self.max_retries + 1):
+            session = await self._acquire_session()
+            request_id = next(self._request_ids)
+            future = self.loop.create_future()
+            session.in_flight[request_id] = future
+            try:
+                await session.send(dict(data, request_id=request_id))
+                return await asyncio.wait_for(future, timeout)
+            except (SessionLost, ConnectionError) as e:
+                print(f'<!> Request {request_id} lost with session {session.session_id} '
+                      f'(attempt {attempt + 1}/{self.max_retries + 1}): {e}')
+                await self._drop_session(session)
+            finally:
+                session.in_flight.pop(request_id, None)
+                async with self._sessions_changed:
+                    self._sessions_changed.notify_all()
+        raise SessionLost(f'Request lost {self.max_retries + 1} times')
+
+    async def broadcast(self, data: dict) -> None:
+        for session in self.connected_clients:
+            try:
+                await session.send(data)
+            except ConnectionError:
+                await self._drop_session(session)
+
+    def submit_threadsafe(self, data: dict, timeout: Union[float, None] = None) -> Future:
+        return asyncio.run_coroutine_threadsafe(self.submit(data, timeout=timeout), self.loop)
+
+    def run_threadsafe(self, coroutine: Awaitable) -> any:
+        """
+        Run a coroutine on the loop of the server from another thread and wait for its result.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def close_threadsafe(self) -> None:
+        self.run_threadsafe(self.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    async def _acquire_session(self) -> ClientSession:
+        def _free_sessions():
+            return [session for session in self.connected_clients
+                    if len(session.in_flight) < self.capacity_per_client]
+
+        async with self._sessions_changed:
+            if not _free_sessions() and not self.connected_clients:
+                print('<info> Waiting for a client connection ...')
+            await self._sessions_changed.wait_for(lambda: len(_free_sessions()) > 0)
+            return min(_free_sessions(), key=lambda session: len(session.in_flight))
+
+    async def _handle_session(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        session = ClientSession(next(self._session_ids), reader, writer)
+        self.sessions[session.session_id] = session
+        print('[{}] {}:{} has joined as session {}!'.format(datetime.now(), *session.address[:2],
+                                                              session.session_id))
+        session.receive_task = asyncio.current_task()
+        session.heartbeat_task = asyncio.ensure_future(self._send_heartbeats(session))
+        try:
+            await session.send(hello_message())
+            while True:
+                data = await session.recv()
+                session.last_seen = self.loop.time()
+                if not isinstance(data, dict) or '__heartbeat__' in data:
+                    continue
+                if '__hello__' in data:
+                    session.peer_codecs, session.is_ready = data['codecs'], True
+                    async with self._sessions_changed:
+                        self._sessions_changed.notify_all()
+                    continue
+                future = session.in_flight.get(data.get('request_id'))
+                if future is not None and not future.done():
+                    future.set_result(data)
+                elif self.on_message is not None:
+                    self.on_message(session, data)
+                else:
+                    print('[{}] Session {}: {}'.format(datetime.now(), session.session_id, abbreviate(data)))
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            print('[{}] Session {} closed: {}'.format(datetime.now(), session.session_id, e or 'end of stream'))
+        finally:
+            await self._drop_session(session)
+
+    async def _send_heartbeats(self, session: ClientSession) -> None:
+        while session.is_alive:
+            await asyncio.sleep(self.heartbeat_interval)
+            if self.loop.time() - session.last_seen > self.heartbeat_timeout:
+                print(f'<!> Session {session.session_id} missed heartbeats for {self.heartbeat_timeout} s')
+                await self._drop_session(session)
+                return
+            try:
+                await session.send({'__heartbeat__': self.loop.time()})
+            except ConnectionError:
+                await self._drop_session(session)
+                return
+
+    async def _drop_session(self, session: ClientSession) -> None:
+        if not session.is_alive:
+            return
+        session.is_alive = False
+        self.sessions.pop(session.session_id, None)
+        session.writer.close()
+        if session.heartbeat_task is not asyncio.current_task():
+            session.heartbeat_task.cancel()
+        for future in session.in_flight.values():
+            if not future.done():
+                future.set_exception(SessionLost(f'Session {session.session_id} lost'))
+        async with self._sessions_changed:
+            self._sessions_changed.notify_all()
+
+
 def make_and_start_process(target: any, duplex: bool = True,
                            daemon: bool = True) -> Tuple[mp.Process, connection.Connection, connection.Connection]:
     """
@@ -231,6 +682,137 @@ def request_abaqus(dict_data: dict, server: Server, conn_to_gui: connection.Conn
     print(f"========== An evolution on ABAQUS is done on {datetime.now().strftime('%Y/%m/%d %H:%M:%S')}! ==========")
 
 
+def outputs_from_json(outputs: any) -> any:
+    """
+    Restore outputs sent through a json socket, where arrays arrive as nested lists.
+    :param outputs: Field or history outputs decoded from json.
+    :return: Outputs with every list converted to numpy array.
+    """
+    if isinstance(outputs, dict):
+        return {key: outputs_from_json(value) for key, value in outputs.items()}
+    if isinstance(outputs, list):
+        return np.array(outputs)
+    return outputs
+
+
+def dispatch_abaqus(dict_data: dict, work_items: dict, server: Server, conn_to_gui: connection.Connection,
+                    on_result: Callable[[int, Union[dict, None], Union[dict, None]], None],
+                    capacity_per_client: int = 1, poll_interval: float = 1.0) -> None:
+    """
+    Send entities of a generation to every connected ABAQUS client as per-entity work items. A client is handed the
+    next pending entity whenever it owns less than capacity_per_client of them, so faster clients take more work.
+    Entities owned by a client that disconnects are requeued at the front, and clients connecting in the middle of
+    the generation join the dispatch.
+    :param dict_data: Json data sent with every work item, must include 'generation'.
+    :param work_items: Flattened topology of every entity to analyse, keyed by entity number. Arrays are sent as raw
+    buffers by a server of option 'binary', and lists are for the legacy json protocol.
+    :param server: A server to ABAQUS clients.
+    :param conn_to_gui: Pipe connection to GUI
+    :param on_result: Called with entity number, field outputs and history outputs of each finished entity.
+    The outputs are None if the job of the entity failed.
+    :param capacity_per_client: Work items owned by a client at once, i.e. its concurrent jobs.
+    :param poll_interval: Seconds to wait for a message before checking for new clients.
+    :return: Nothing
+    """
+    pending_entities = deque(sorted(work_items))
+    owned_entities = dict()  # client socket: set of entity numbers
+    finished_entities = set()
+    while len(finished_entities) < len(work_items):
+        if len(server.connected_clients) == 0:
+            print('Waiting for ABAQUS socket connection ...')
+        for client_socket in list(server.connected_clients):
+            client_entities = owned_entities.setdefault(client_socket, set())
+            while pending_entities and len(client_entities) < capacity_per_client:
+                entity_num = pending_entities.popleft()
+                work_item = dict(dict_data, work_entities=[entity_num], work_topologies=[work_items[entity_num]])
+                if not server.send(client_socket=client_socket, data=work_item):
+                    pending_entities.appendleft(entity_num)
+                    break
+                client_entities.add(entity_num)
+        try:
+            client_socket, json_data_from_client = server.recv_from(timeout=poll_interval)
+        except Empty:
+            continue
+        if json_data_from_client is None:  # Disconnected
+            lost_entities = sorted(owned_entities.pop(client_socket, set()))
+            pending_entities.extendleft(reversed(lost_entities))
+            if lost_entities:
+                print(f'<!> ABAQUS client disconnected, requeued entities: {lost_entities}')
+            continue
+        if 'log_message' in json_data_from_client:
+            conn_to_gui.send({'log_message': json_data_from_client['log_message']})
+        entity_num = json_data_from_client.get('finished_entity')
+        if json_data_from_client.get('generation') != dict_data['generation'] or entity_num not in work_items:
+            continue
+        owned_entities.get(client_socket, set()).discard(entity_num)
+        if entity_num in finished_entities:
+            continue
+        finished_entities.add(entity_num)
+        on_result(entity_num, outputs_from_json(json_data_from_client['field_outputs']),
+                  outputs_from_json(json_data_from_client['history_outputs']))
+    print(f"========== An evolution on ABAQUS is done on {datetime.now().strftime('%Y/%m/%d %H:%M:%S')}! ==========")
+
+
+async def evaluate_entity(dict_data: dict, entity_num: int, flat_topology: any, server: AsyncServer,
+                          timeout: Union[float, None] = None) -> Tuple[int, Union[dict, None], Union[dict, None], str]:
+    """
+    Submit an entity to the sessions of an AsyncServer and wait for its outputs.
+    :param dict_data: Data sent with every work item, must include 'generation'.
+    :param entity_num: Entity number.
+    :param flat_topology: Flattened topology of the entity.
+    :param server: An asyncio server to ABAQUS clients.
+    :param timeout: Seconds to wait for the outputs after sending the entity.
+    :return: Entity number, field outputs, history outputs and log message. The outputs are None if the job of the
+    entity failed, timed out or lost its sessions.
+    """
+    work_item = dict(dict_data, work_entities=[entity_num], work_topologies=[flat_topology])
+    try:
+        response = await server.submit(work_item, timeout=timeout)
+    except (asyncio.TimeoutError, SessionLost) as e:
+        print(f'<!> Entity {entity_num} is not analysed: {e!r}')
+        return entity_num, None, None, ''
+    return (entity_num, outputs_from_json(response.get('field_outputs')),
+            outputs_from_json(response.get('history_outputs')), response.get('log_message', ''))
+
+
+async def evaluate_abaqus_async(dict_data: dict, work_items: dict, server: AsyncServer,
+                                timeout: Union[float, None] = None) -> dict:
+    """
+    Submit every entity of a generation at once, sessions taking entities as their slots free up.
+    :return: Field outputs and history outputs keyed by entity number, None for entities without outputs.
+    """
+    evaluations = await asyncio.gather(*[evaluate_entity(dict_data, entity_num, work_items[entity_num], server,
+                                                         timeout=timeout) for entity_num in sorted(work_items)])
+    return {entity_num: (field_outputs, history_outputs)
+            for entity_num, field_outputs, history_outputs, _ in evaluations}
+
+
+def evaluate_abaqus(dict_data: dict, work_items: dict, server: AsyncServer,
+                    on_result: Callable[[int, Union[dict, None], Union[dict, None]], None],
+                    conn_to_gui: Union[connection.Connection, None] = None,
+                    timeout: Union[float, None] = None) -> None:
+    """
+    Submit every entity of a generation at once from a thread other than the loop of the server, and handle each
+    result in this thread as soon as it arrives. Entities of lost sessions are submitted again.
+    :param dict_data: Data sent with every work item, must include 'generation'.
+    :param work_items: Flattened topology of every entity to analyse, keyed by entity number.
+    :param server: An asyncio server to ABAQUS clients, running its loop in another thread.
+    :param on_result: Called with entity number, field outputs and history outputs of each finished entity.
+    The outputs are None if the job of the entity failed, timed out or lost its sessions.
+    :param conn_to_gui: Pipe connection to GUI, for log messages of results.
+    :param timeout: Seconds to wait for each entity after sending it.
+    :return: Nothing
+    """
+    evaluations = [asyncio.run_coroutine_threadsafe(
+        evaluate_entity(dict_data, entity_num, work_items[entity_num], server, timeout=timeout), server.loop)
+        for entity_num in sorted(work_items)]
+    for evaluation in as_completed(evaluations):
+        entity_num, field_outputs, history_outputs, log_message = evaluation.result()
+        if conn_to_gui is not None and log_message:
+            conn_to_gui.send({'log_message': log_message})
+        on_result(entity_num, field_outputs, history_outputs)
+    print(f"========== An evolution on ABAQUS is done on {datetime.now().strftime('%Y/%m/%d %H:%M:%S')}! ==========")
+
 if __name__ == '__main__':
     open_server = False
     if open_server:  # Creating server
@@ -0,0 +1,186 @@
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True)
+def _dominates(costs: np.ndarray, a: int, b: int) -> bool:
+    # Whether the point a dominates the point b, all costs being minimized
+    is_strictly_better = False
+    for objective_idx in range(costs.shape[1]):
+        if costs[a, objective_idx] > costs[b, objective_idx]:
+            return False
+        if costs[a, objective_idx] < costs[b, objective_idx]:
+            is_strictly_better = True
+    return is_strictly_better
+
+
+@njit(cache=True)
+def _fast_non_dominated_sort(costs: np.ndarray) -> np.ndarray:
+    n_points = costs.shape[0]
+    domination_counts = np.zeros(n_points, dtype=np.int64)
+    n_dominated = np.zeros(n_points, dtype=np.int64)
+    for a in range(n_points):
+        for b in range(a + 1, n_points):
+            if _dominates(costs, a, b):
+                n_dominated[a] += 1
+                domination_counts[b] += 1
+            elif _dominates(costs, b, a):
+                n_dominated[b] += 1
+                domination_counts[a] += 1
+    # Points dominated by each point, as a compressed sparse row layout
+    offsets = np.zeros(n_points + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(n_dominated)
+    dominated_points = np.empty(offsets[-1], dtype=np.int64)
+    fill_positions = offsets[:-1].copy()
+    for a in range(n_points):
+        for b in range(a + 1, n_points):
+            if _dominates(costs, a, b):
+                dominated_points[fill_positions[a]] = b
+                fill_positions[a] += 1
+            elif _dominates(costs, b, a):
+                dominated_points[fill_positions[b]] = a
+                fill_positions[b] += 1
+    ranks = np.full(n_points, -1, dtype=np.int64)
+    current_front = np.flatnonzero(domination_counts == 0)
+    rank = 0
+    while len(current_front) > 0:
+        next_front = np.empty(n_points, dtype=np.int64)
+        n_next = 0
+        for a in current_front:
+            ranks[a] = rank
+            for b in dominated_points[offsets[a]:offsets[a + 1]]:
+                domination_counts[b] -= 1
+                if domination_counts[b] == 0:
+                    next_front[n_next] = b
+                    n_next += 1
+        current_front = next_front[:n_next]
+        rank += 1
+    return ranks
+
+
+@njit(cache=True)
+def _two_objective_sort(costs: np.ndarray, order: np.ndarray) -> np.ndarray:
+    # Points are visited in lexicographic order, so a point can only be dominated by the last point added to a front,
+    # which has the smallest second cost of the front. Those last points increase in (cost 2, cost 1) over fronts.
+    n_points = costs.shape[0]
+    ranks = np.empty(n_points, dtype=np.int64)
+    last_points = np.empty(n_points, dtype=np.int64)
+    n_fronts = 0
+    for point in order:
+        low, high = 0, n_fronts
+        while low < high:
+            middle = (low + high) // 2
+            last_point = last_points[middle]
+            if costs[last_point, 1] < costs[point, 1] or (costs[last_point, 1] == costs[point, 1]
+                                                          and costs[last_point, 0] < costs[point, 0]):
+                low = middle + 1
+            else:
+                high = middle
+        ranks[point] = low
+        last_points[low] = point
+        if low == n_fronts:
+            n_fronts += 1
+    return ranks
+
+
+@njit(cache=True)
+def _efficient_non_dominated_sort(costs: np.ndarray, order: np.ndarray) -> np.ndarray:
+    # ENS with binary search over fronts. A point visited in lexicographic order is not dominated by any later point,
+    # and if a front dominates it, so do all former fronts. Members of a front are linked from the newest one, which
+    # is the most likely to dominate the next point.
+    n_points = costs.shape[0]
+    ranks = np.empty(n_points, dtype=np.int64)
+    front_heads = np.empty(n_points, dtype=np.int64)
+    next_members = np.empty(n_points, dtype=np.int64)
+    n_fronts = 0
+    for point in order:
+        low, high = 0, n_fronts
+        while low < high:
+            middle = (low + high) // 2
+            member = front_heads[middle]
+            is_dominated = False
+            while member != -1:
+                if _dominates(costs, member, point):
+                    is_dominated = True
+                    break
+                member = next_members[member]
+            if is_dominated:
+                low = middle + 1
+            else:
+                high = middle
+        ranks[point] = low
+        if low == n_fronts:
+            front_heads[low] = -1
+            n_fronts += 1
+        next_members[point] = front_heads[low]
+        front_heads[low] = point
+    return ranks
+
+
+def fast_non_dominated_sort(costs: np.ndarray) -> np.ndarray:
+    """
+    Deb's fast non-dominated sort, O(M N^2). Kept as the reference of the other methods.
+    :param costs: Costs to minimize, shape: (points, objectives)
+    :return: Front rank of every point, 0 for the Pareto front.
+    """
+    return _fast_non_dominated_sort(np.ascontiguousarray(costs, dtype=float))
+
+
+def lexicographic_order(costs: np.ndarray) -> np.ndarray:
+    return np.lexsort(costs.T[::-1])
+
+
+def two_objective_sort(costs: np.ndarray) -> np.ndarray:
+    """
+    Non-dominated sort of two objectives in O(N log N), a sweep in lexicographic order with binary search over fronts.
+    :param costs: Costs to minimize, shape: (points, 2)
+    :return: Front rank of every point, 0 for the Pareto front.
+    """
+    costs = np.ascontiguousarray(costs, dtype=float)
+    if costs.shape[1] != 2:
+        raise ValueError(f'Two objectives are expected, got {costs.shape[1]}')
+    return _two_objective_sort(costs, lexicographic_order(costs))
+
+
+def efficient_non_dominated_sort(costs: np.ndarray) -> np.ndarray:
+    """
+    Efficient non-dominated sort with binary search (ENS-BS), for any number of objectives. It compares a point only
+    against members of the fronts visited by the binary search, so it is much faster than Deb's sort when the
+    population has several fronts.
+    :param costs: Costs to minimize, shape: (points, objectives)
+    :return: Front rank of every point, 0 for the Pareto front.
+    """
+    costs = np.ascontiguousarray(costs, dtype=float)
+    return _efficient_non_dominated_sort(costs, lexicographic_order(costs))
+
+
+NON_DOMINATED_SORTS = {
+    'deb': fast_non_dominated_sort,
+    'two_objective': two_objective_sort,
+    'ens': efficient_non_dominated_sort
+}
+
+
+def non_dominated_ranks(costs: np.ndarray, method: str = 'auto') -> np.ndarray:
+    """
+    :param costs: Costs to minimize, shape: (points, objectives)
+    :param method: One of NON_DOMINATED_SORTS, or 'auto' for 'two_objective' with two objectives and 'ens' otherwise.
+    :return: Front rank of every point, 0 for the Pareto front.
+    """
+    costs = np.asarray(costs, dtype=float)
+    if method == 'auto':
+        method = 'two_objective' if costs.ndim == 2 and costs.shape[1] == 2 else 'ens'
+    if method not in NON_DOMINATED_SORTS:
+        raise ValueError(f'Unknown non-dominated sort: {method}')
+    if len(costs) == 0:
+        return np.empty(0, dtype=np.int64)
+    return NON_DOMINATED_SORTS[method](costs)
+
+
+def non_dominated_fronts(costs: np.ndarray, method: str = 'auto') -> list:
+    """
+    :return: Indices of points in every front, from the Pareto front.
+    """
+    ranks = non_dominated_ranks(costs, method=method)
+    order = np.argsort(ranks, kind='stable')
+    return np.split(order, np.flatnonzero(np.diff(ranks[order])) + 1) if len(order) > 0 else []
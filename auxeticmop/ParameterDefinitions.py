@@ -17,6 +17,13 @@ class Parameters:
     dis_y: float = -0.005  # abaqus boundary condition option
     n_cpus: int = 1  # abaqus option
     n_gpus: int = 0  # abaqus option
+    n_concurrent_jobs: int = 1  # abaqus option, jobs running at once
+    abaqus_token_budget: int = 0  # abaqus option, license tokens shared by running jobs (0: unlimited)
+    job_time_limit: float = 0  # abaqus option, wall-clock seconds before a job is aborted (0: unlimited)
+    job_increment_limit: int = 0  # abaqus option, increments before a job is aborted (0: unlimited)
+    job_min_increment: float = 0  # abaqus option, a job is aborted when its time increment falls below this (0: off)
+    job_cutback_limit: int = 0  # abaqus option, consecutive cutbacks before a job is aborted (0: unlimited)
+    model_builder: str = 'cae'  # abaqus option, 'cae', 'template'(copies of a model built once) or 'input_file'
     # ** Optional  ** #
     penalty_coefficient: float = 0.1  # fitness value evaluation option
     material_modulus: float = 1100  # abaqus material property option
@@ -62,7 +69,8 @@ class GuiParameters:
 radiobutton_name_dict = {
     'abaqus_mode': ('noGUI', 'script'),
     'mode': ('GA', 'random'),
-    'evaluation_version': ('ver3', 'ver4', 'ver5')
+    'evaluation_version': ('ver3', 'ver4', 'ver5'),
+    'model_builder': ('cae', 'template', 'input_file')
 }
 
 
@@ -183,4 +191,11 @@ translate_dictionary = {'abaqus_script': 'Filename of ABAQUS script',
                         'threshold': 'Threshold for filtering',
                         'n_cpus': 'CPU cores for abaqus',
                         'n_gpus': 'GPU cores for abaqus',
+                        'n_concurrent_jobs': 'Concurrent abaqus jobs',
+                        'abaqus_token_budget': 'License tokens(0: unlimited)',
+                        'job_time_limit': 'Job time limit(s, 0: unlimited)',
+                        'job_increment_limit': 'Job increment limit(0: unlimited)',
+                        'job_min_increment': 'Minimum time increment(0: off)',
+                        'job_cutback_limit': 'Consecutive cutback limit(0: unlimited)',
+                        'model_builder': 'Abaqus model builder',
                         'timeout': 'Timeout of validation process(s)'}
@@ -1,7 +1,13 @@
+import ast
+import functools
+import heapq
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.ndimage import gaussian_filter
-from typing import Union
+from numba import njit
+from typing import Union, Callable
+from .Results import ResultsTable
+from .NonDominatedSorting import non_dominated_ranks, non_dominated_fronts
 
 
 def get_datum_hv(pareto_1_sorted: np.ndarray, pareto_2_sorted: np.ndarray) -> float:
@@ -21,48 +27,164 @@ def get_hv_from_datum_hv(datum_hv: float, lower_bounds: list, ref_x: float, ref_
     return datum_hv + (ref_x - lower_bounds[0]) * (ref_y - lower_bounds[1])
 
 
-def evaluate_fitness_value_for_one_entity(vars_definitions: dict, fitness_value_definitions: Union[tuple, list],
-                                          params_dict: dict, result: dict, topology: np.ndarray) -> np.ndarray:
-    vars_dict = dict()
-    predefined_vars = {
-        'total_voxels': np.sum(topology),
-        'max_rf22': params_dict['unit_l'] * params_dict['lx'] * params_dict['unit_l'] * params_dict['lz'] * params_dict['material_modulus']
+def _elementwise_reduction(ufunc: np.ufunc):
+    def _reduce(*args):
+        return functools.reduce(ufunc, args)
+    return _reduce
+
+
+# Functions allowed in fitness value definitions, applied elementwise to columns of the whole population
+FITNESS_FUNCTIONS = {
+    'max': _elementwise_reduction(np.maximum),
+    'min': _elementwise_reduction(np.minimum),
+    'abs': np.abs,
+    'sqrt': np.sqrt,
+    'exp': np.exp,
+    'log': np.log
+}
+_allowed_fitness_nodes = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name, ast.Load, ast.Constant,
+                          ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.USub, ast.UAdd)
+
+
+def predefined_fitness_variables(params_dict: dict, topologies: np.ndarray) -> dict:
+    return {
+        'total_voxels': np.asarray(topologies).reshape(len(topologies), -1).sum(axis=1),
+        'max_rf22': (params_dict['unit_l'] * params_dict['lx'] * params_dict['unit_l'] * params_dict['lz']
+                     * params_dict['material_modulus'])
     }
-    for var, definition in vars_definitions.items():
-        if isinstance(definition, (list, tuple, set)):
-            _results = result.copy()
-            for result_key in definition:
-                _results = _results[result_key]
-            vars_dict.update({var: _results})
-        elif isinstance(definition, str):
-            if definition.startswith('@'):
-                vars_dict.update({var: params_dict[definition[1:]]})
-            elif definition.startswith('$'):
-                vars_dict.update({var: predefined_vars[definition[1:]]})
+
+
+class CompiledFitness:
+    """
+    Fitness value definitions parsed and validated once, and evaluated for a whole population at once. Each variable
+    becomes a column over entities, and each definition is compiled to numpy operations on the columns.
+    """
+    def __init__(self, vars_definitions: dict, fitness_value_definitions: Union[tuple, list]):
+        """
+        :param vars_definitions: Variables of FitnessDefinitions. A tuple is a key path into the field outputs of an
+        entity, '@name' is a value of Parameters and '$name' is a predefined variable.
+        :param fitness_value_definitions: Expressions of FitnessDefinitions, using variables, numbers, arithmetic
+        operators and FITNESS_FUNCTIONS.
+        :raises ValueError: If a variable definition or an expression is invalid.
+        """
+        self.vars_definitions = dict(vars_definitions)
+        self.fitness_value_definitions = tuple(fitness_value_definitions)
+        for var, definition in self.vars_definitions.items():
+            if isinstance(definition, str) and definition.startswith('$'):
+                if definition[1:] not in ('total_voxels', 'max_rf22'):
+                    raise ValueError(f'Unknown predefined variable of {var}: {definition}')
+            elif not isinstance(definition, (list, tuple)) and not (isinstance(definition, str)
+                                                                     and definition.startswith('@')):
+                raise ValueError(f'Invalid definition of {var}: {definition!r}')
+        self.expressions = tuple(compile(self._validate(definition), filename='<fitness>', mode='eval')
+                                 for definition in self.fitness_value_definitions)
+
+    def _validate(self, definition: str) -> ast.Expression:
+        try:
+            tree = ast.parse(definition, mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f'Invalid fitness value definition {definition!r}: {e.msg}') from None
+        for node in ast.walk(tree):
+            if not isinstance(node, _allowed_fitness_nodes):
+                raise ValueError(f'{type(node).__name__} is not allowed in fitness value definition {definition!r}')
+            if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+                raise ValueError(f'Constant {node.value!r} is not allowed in fitness value definition {definition!r}')
+            if isinstance(node, ast.Call):
+                if not isinstance(node.func, ast.Name) or node.func.id not in FITNESS_FUNCTIONS or node.keywords:
+                    raise ValueError(f'Only positional calls of {sorted(FITNESS_FUNCTIONS)} are allowed in fitness '
+                                     f'value definition {definition!r}')
+            elif isinstance(node, ast.Name) and node.id not in self.vars_definitions \
+                    and node.id not in FITNESS_FUNCTIONS:
+                raise ValueError(f'Undefined variable {node.id} in fitness value definition {definition!r}')
+        return tree
+
+    def columns(self, params_dict: dict, results: Union[ResultsTable, dict, list], topologies: np.ndarray) -> dict:
+        """
+        :param params_dict: Parameters as a dictionary.
+        :param results: Field outputs of entities in order, as a ResultsTable, a list or a dictionary keyed by entity
+        number from 1. Field outputs of None give NaN.
+        :param topologies: Topologies of entities, shape: (entities, lx, ly, lz)
+        :return: Value of every variable, as an array over entities or a scalar.
+        """
+        if isinstance(results, dict):
+            results = [results[entity_num] for entity_num in range(1, len(results) + 1)]
+        predefined_vars = None
+        columns = dict()
+        for var, definition in self.vars_definitions.items():
+            if isinstance(definition, (list, tuple)) and isinstance(results, ResultsTable):
+                columns[var] = results.column(definition)
+            elif isinstance(definition, (list, tuple)):
+                columns[var] = np.array([np.nan if result is None  # Failed analysis
+                                         else functools.reduce(lambda nested, key: nested[key], definition, result)
+                                         for result in results], dtype=float)
+            elif definition.startswith('@'):
+                columns[var] = params_dict[definition[1:]]
             else:
-                raise ValueError
-        else:
-            raise ValueError
-    locals().update(vars_dict)
-    fitness_values = np.empty((1, len(fitness_value_definitions)), dtype=float)
-    for fitness_value_idx, definition in enumerate(fitness_value_definitions):
-        fitness_values[0, fitness_value_idx] = eval(definition)
-    return fitness_values
+                if predefined_vars is None:
+                    predefined_vars = predefined_fitness_variables(params_dict, topologies)
+                columns[var] = predefined_vars[definition[1:]]
+        return columns
+
+    def __call__(self, params_dict: dict, results: Union[ResultsTable, dict, list],
+                 topologies: np.ndarray) -> np.ndarray:
+        """
+        :return: Fitness values of entities, shape: (entities, fitness values)
+        """
+        assert len(topologies) == len(results)
+        namespace = dict(FITNESS_FUNCTIONS, **self.columns(params_dict, results, topologies))
+        fitness_values = np.empty((len(topologies), len(self.expressions)), dtype=float)
+        for fitness_value_idx, expression in enumerate(self.expressions):
+            fitness_values[:, fitness_value_idx] = eval(expression, {'__builtins__': {}}, namespace)
+        return fitness_values
+
+
+@functools.lru_cache(maxsize=None)
+def _compiled_fitness(vars_definitions: tuple, fitness_value_definitions: tuple) -> CompiledFitness:
+    return CompiledFitness(vars_definitions=dict(vars_definitions), fitness_value_definitions=fitness_value_definitions)
+
+
+def compile_fitness_definitions(vars_definitions: dict,
+                                fitness_value_definitions: Union[tuple, list]) -> CompiledFitness:
+    """
+    CompiledFitness of definitions, compiled once and cached.
+    """
+    return _compiled_fitness(tuple((var, tuple(definition) if isinstance(definition, list) else definition)
+                                   for var, definition in vars_definitions.items()), tuple(fitness_value_definitions))
+
+
+def evaluate_fitness_value_for_one_entity(vars_definitions: dict, fitness_value_definitions: Union[tuple, list],
+                                          params_dict: dict, result: dict, topology: np.ndarray) -> np.ndarray:
+    compiled_fitness = compile_fitness_definitions(vars_definitions, fitness_value_definitions)
+    return compiled_fitness(params_dict=params_dict, results=[result], topologies=np.asarray(topology)[np.newaxis])
 
 
 def evaluate_all_fitness_values(fitness_definitions: dict, params_dict: dict,
-                                results: dict, topologies: np.ndarray) -> np.ndarray:
+                                results: Union[ResultsTable, dict], topologies: np.ndarray) -> np.ndarray:
     evaluation_version = params_dict['evaluation_version']
-    vars_definitions = fitness_definitions[evaluation_version].vars_definitions
-    fitness_value_definitions = fitness_definitions[evaluation_version].fitness_value_definitions
+    compiled_fitness = compile_fitness_definitions(
+        vars_definitions=fitness_definitions[evaluation_version].vars_definitions,
+        fitness_value_definitions=fitness_definitions[evaluation_version].fitness_value_definitions)
+    return compiled_fitness(params_dict=params_dict, results=results, topologies=topologies)
+
 
-    all_fitness_values = np.empty((0, len(fitness_value_definitions)), dtype=float)
-    assert len(topologies) == len(results)
-    for entity_idx in range(len(topologies)):
-        all_fitness_values = np.vstack((all_fitness_values, evaluate_fitness_value_for_one_entity(
-            vars_definitions=vars_definitions, fitness_value_definitions=fitness_value_definitions,
-            params_dict=params_dict, result=results[entity_idx+1], topology=topologies[entity_idx])))
-    return all_fitness_values
+# Fitness values of solutions whose analyses failed, dominated by every solution with finite fitness values
+FAILED_ANALYSIS_FITNESS = 1e10
+
+
+def penalize_failed_analyses(fitness_values: np.ndarray, penalty: float = FAILED_ANALYSIS_FITNESS) -> np.ndarray:
+    """
+    Failed analyses have field outputs of None, evaluated to fitness values which are not finite.
+    :param fitness_values: Fitness values to minimize, shape: (solutions, fitness values)
+    :param penalty: Fitness value given to every objective of a failed solution.
+    :return: Fitness values where rows with a value which is not finite are replaced by penalty.
+    """
+    fitness_values = np.asarray(fitness_values, dtype=float)
+    is_failed = ~np.all(np.isfinite(fitness_values), axis=1)
+    if not np.any(is_failed):
+        return fitness_values
+    penalized_fitness_values = fitness_values.copy()
+    penalized_fitness_values[is_failed] = penalty
+    return penalized_fitness_values
 
 
 def find_pareto_front_points(costs: np.ndarray, return_index: bool = False) -> np.ndarray:
@@ -75,97 +197,179 @@ def find_pareto_front_points(costs: np.ndarray, return_index: bool = False) -> n
     if return_index == False, The array containing fitness values of pareto points, shape: (no_of_pareto_front_points
     x no_of_costs)
     """
-    costs_copy = costs.copy()
-    unsorted_indices = np.arange(len(costs_copy))
-    next_point_idx = 0
-    while next_point_idx < len(costs_copy):
-        not_dominated_point_mask = np.any(costs_copy < costs_copy[next_point_idx], axis=1)
-        not_dominated_point_mask[next_point_idx] = True
-        unsorted_indices = unsorted_indices[not_dominated_point_mask]
-        costs_copy = costs_copy[not_dominated_point_mask]
-        next_point_idx = np.sum(not_dominated_point_mask[:next_point_idx]) + 1
-    sorted_indices = unsorted_indices[np.argsort(costs[unsorted_indices][:, 0])]
-    sorted_pareto_points = costs[sorted_indices]
+    costs = penalize_failed_analyses(costs)
+    pareto_indices = np.flatnonzero(non_dominated_ranks(costs) == 0)
+    sorted_indices = pareto_indices[np.argsort(costs[pareto_indices][:, 0])]
     if return_index:
         return sorted_indices
     else:
-        return sorted_pareto_points
+        return costs[sorted_indices]
 
 
 def crowding_calculation(fitness_values: np.ndarray):
-    population_size, number_of_fitness_values = fitness_values.shape[0], fitness_values.shape[1]
-    matrix_for_crowding = np.zeros((population_size, number_of_fitness_values))
-    normalize_fitness_values = (fitness_values - np.min(fitness_values, axis=0)) / np.ptp(fitness_values, axis=0)
-
-    # normalize the fitness values
-    for i in range(number_of_fitness_values):
-        crowding_results = np.zeros(population_size)
-        crowding_results[0] = 1  # extreme point has the max crowding distance
-        crowding_results[population_size - 1] = 1  # extreme point has the max crowding distance
-        sorting_normalize_fitness_values = np.sort(normalize_fitness_values[:, i])
-        sorting_normalized_values_index = np.argsort(normalize_fitness_values[:, i])
-
-        # crowding distance calculation
-        crowding_results[1:population_size - 1] = (sorting_normalize_fitness_values[2:population_size]
-                                                   - sorting_normalize_fitness_values[0:population_size - 2])
-        re_sorting = np.argsort(sorting_normalized_values_index)  # re_sorting to the original order
-        matrix_for_crowding[:, i] = crowding_results[re_sorting]
+    population_size = fitness_values.shape[0]
+    value_ranges = np.ptp(fitness_values, axis=0)
+    normalize_fitness_values = (fitness_values - np.min(fitness_values, axis=0)) / np.where(value_ranges > 0,
+                                                                                           value_ranges, 1)
+
+    # One argsort per fitness value, distances between neighbours are computed in sorted order and scattered back
+    sorted_indices = np.argsort(normalize_fitness_values, axis=0)
+    sorted_values = np.take_along_axis(normalize_fitness_values, sorted_indices, axis=0)
+    crowding_results = np.ones_like(sorted_values)  # extreme points have the max crowding distance
+    crowding_results[1:population_size - 1] = sorted_values[2:population_size] - sorted_values[0:population_size - 2]
+    matrix_for_crowding = np.empty_like(crowding_results)
+    np.put_along_axis(matrix_for_crowding, sorted_indices, crowding_results, axis=0)
 
     crowding_distance = np.sum(matrix_for_crowding, axis=1)  # crowding distance of each solution
     return crowding_distance
 
 
+@njit(cache=True)
+def _crowding_tournament(crowding_distance: np.ndarray, positions_1: np.ndarray,
+                         positions_2: np.ndarray) -> np.ndarray:
+    # Solutions are picked by their positions among the remaining ones, found on a Fenwick tree of the remaining mask
+    population_size = len(crowding_distance)
+    tree = np.zeros(population_size + 1, dtype=np.int64)
+    for node in range(1, population_size + 1):
+        tree[node] += 1
+        parent = node + (node & -node)
+        if parent <= population_size:
+            tree[parent] += tree[node]
+    highest_bit = 1
+    while highest_bit * 2 <= population_size:
+        highest_bit *= 2
+    selected_pop_index = np.empty(len(positions_1), dtype=np.int64)
+    for i in range(len(positions_1)):
+        solutions = np.empty(2, dtype=np.int64)
+        for pick in range(2):
+            remaining_position = positions_1[i] if pick == 0 else positions_2[i]
+            node, step = 0, highest_bit
+            while step > 0:
+                if node + step <= population_size and tree[node + step] <= remaining_position:
+                    node += step
+                    remaining_position -= tree[node]
+                step //= 2
+            solutions[pick] = node  # 0-based index of the (position + 1)-th remaining solution
+        if crowding_distance[solutions[0]] >= crowding_distance[solutions[1]]:
+            selected = solutions[0]  # solution 1 is better than solution 2
+        else:
+            selected = solutions[1]
+        selected_pop_index[i] = selected
+        node = selected + 1
+        while node <= population_size:  # remove the selected solution
+            tree[node] -= 1
+            node += node & -node
+    return selected_pop_index
+
+
 def remove_using_crowding(fitness_values: np.ndarray, number_solutions_needed: int) -> np.ndarray:
+    """
+    Binary tournament on crowding distance without replacement. Both contestants are drawn uniformly by np.random
+    from the remaining solutions but the last one, and the winner is selected and removed from them.
+    :param fitness_values: Fitness values of a front, shape: (solutions, fitness values)
+    :param number_solutions_needed: Number of solutions to select.
+    :return: Indices of selected solutions, in the order of selection.
+    """
     rn = np.random  # addition
-    pop_index = np.arange(fitness_values.shape[0])
-    crowding_distance = crowding_calculation(fitness_values)
-    selected_pop_index = np.zeros(number_solutions_needed)
-    selected_fitness_values = np.zeros((number_solutions_needed, len(fitness_values[0, :])))
-
-    for i in range(number_solutions_needed):
-        pop_size = pop_index.shape[0]
-        solution_1 = rn.randint(0, pop_size - 1)
-        solution_2 = rn.randint(0, pop_size - 1)
-        if crowding_distance[solution_1] >= crowding_distance[solution_2]:
-            # solution 1 is better than solution 2
-            selected_pop_index[i] = pop_index[solution_1]
-            selected_fitness_values[i, :] = fitness_values[solution_1, :]
-            pop_index = np.delete(pop_index, solution_1, axis=0)  # remove the selected solution
-            fitness_values = np.delete(fitness_values, solution_1,
-                                       axis=0)  # remove the fitness of the selected solution
-            crowding_distance = np.delete(crowding_distance, solution_1,
-                                          axis=0)  # remove the related crowding distance
+    pop_size = fitness_values.shape[0]
+    positions_1 = np.empty(number_solutions_needed, dtype=np.int64)
+    positions_2 = np.empty(number_solutions_needed, dtype=np.int64)
+    for i in range(number_solutions_needed):  # The population shrinks by one per selection whoever wins
+        positions_1[i] = rn.randint(0, pop_size - i - 1)
+        positions_2[i] = rn.randint(0, pop_size - i - 1)
+    return _crowding_tournament(crowding_calculation(fitness_values), positions_1, positions_2)
+
+
+@njit(cache=True)
+def _crowding_removal(normalized_values: np.ndarray, number_solutions_needed: int) -> np.ndarray:
+    population_size, number_of_fitness_values = normalized_values.shape
+    previous_solutions = np.empty((number_of_fitness_values, population_size), dtype=np.int64)
+    next_solutions = np.empty((number_of_fitness_values, population_size), dtype=np.int64)
+    for j in range(number_of_fitness_values):
+        sorted_indices = np.argsort(normalized_values[:, j])
+        for rank in range(population_size):
+            previous_solutions[j, sorted_indices[rank]] = sorted_indices[rank - 1] if rank > 0 else -1
+            next_solutions[j, sorted_indices[rank]] = sorted_indices[rank + 1] if rank < population_size - 1 else -1
+
+    def _distance(i):
+        distance = 0.
+        for j in range(number_of_fitness_values):
+            previous_solution, next_solution = previous_solutions[j, i], next_solutions[j, i]
+            if previous_solution == -1 or next_solution == -1:
+                distance += 1.  # extreme point has the max crowding distance
+            else:
+                distance += normalized_values[next_solution, j] - normalized_values[previous_solution, j]
+        return distance
+
+    # Heap entries are (distance, solution, version), entries of an outdated version are skipped when popped
+    versions = np.zeros(population_size, dtype=np.int64)
+    heap = [(_distance(i), i, 0) for i in range(population_size)]
+    heapq.heapify(heap)
+    is_removed = np.zeros(population_size, dtype=np.bool_)
+    for _ in range(population_size - number_solutions_needed):
+        distance, removed, version = heapq.heappop(heap)
+        while is_removed[removed] or version != versions[removed]:
+            distance, removed, version = heapq.heappop(heap)
+        is_removed[removed] = True
+        for j in range(number_of_fitness_values):
+            previous_solution, next_solution = previous_solutions[j, removed], next_solutions[j, removed]
+            if previous_solution != -1:
+                next_solutions[j, previous_solution] = next_solution
+            if next_solution != -1:
+                previous_solutions[j, next_solution] = previous_solution
+            for neighbour in (previous_solution, next_solution):
+                if neighbour != -1:
+                    versions[neighbour] += 1
+                    heapq.heappush(heap, (_distance(neighbour), neighbour, versions[neighbour]))
+    return np.flatnonzero(~is_removed)
+
+
+def remove_using_crowding_iteratively(fitness_values: np.ndarray, number_solutions_needed: int) -> np.ndarray:
+    """
+    Deterministic truncation removing the solution of the smallest crowding distance one at a time, after which only
+    the distances of its neighbours are updated. It keeps a wider spread than the tournament.
+    :param fitness_values: Fitness values of a front, shape: (solutions, fitness values)
+    :param number_solutions_needed: Number of solutions to select.
+    :return: Indices of selected solutions, in ascending order.
+    """
+    value_ranges = np.ptp(fitness_values, axis=0)
+    normalized_values = (fitness_values - np.min(fitness_values, axis=0)) / np.where(value_ranges > 0, value_ranges, 1)
+    return _crowding_removal(np.ascontiguousarray(normalized_values, dtype=float), number_solutions_needed)
 
-        else:
-            # solution 2 is better than solution 1
-            selected_pop_index[i] = pop_index[solution_2]
-            selected_fitness_values[i, :] = fitness_values[solution_2, :]
-            pop_index = np.delete(pop_index, solution_2, axis=0)
-            fitness_values = np.delete(fitness_values, solution_2, axis=0)
-            crowding_distance = np.delete(crowding_distance, solution_2, axis=0)
-
-    selected_pop_index = np.asarray(selected_pop_index, dtype=int)  # Convert the data to integer
-    return selected_pop_index
 
+# Truncation of the last front in selection(), called with its fitness values and the number of solutions to select
+TRUNCATION_STRATEGIES = {
+    'tournament': remove_using_crowding,
+    'iterative_removal': remove_using_crowding_iteratively
+}
 
-def selection(all_fitness_values: np.ndarray, selected_size: int) -> np.ndarray:
-    remaining_population_idx = np.arange(len(all_fitness_values))
-    pareto_indices = np.empty((0,), dtype=int)
-    while len(pareto_indices) < selected_size:
-        new_pareto_front_idx = find_pareto_front_points(costs=all_fitness_values[remaining_population_idx],
-                                                        return_index=True)
-        total_pareto_size = len(pareto_indices) + len(new_pareto_front_idx)
 
+def selection(all_fitness_values: np.ndarray, selected_size: int, sort_method: str = 'auto',
+              truncation: Union[str, Callable[[np.ndarray, int], np.ndarray]] = 'tournament') -> np.ndarray:
+    """
+    Select solutions front by front, removing solutions of the last front using crowding criterion. Failed solutions
+    are penalized by penalize_failed_analyses(), so they are selected last.
+    :param all_fitness_values: Fitness values to minimize, shape: (solutions, fitness values)
+    :param selected_size: Number of solutions to select.
+    :param sort_method: Method of non_dominated_ranks().
+    :param truncation: One of TRUNCATION_STRATEGIES, or a function of the same signature.
+    :return: Indices of selected solutions.
+    """
+    truncate = TRUNCATION_STRATEGIES[truncation] if isinstance(truncation, str) else truncation
+    all_fitness_values = penalize_failed_analyses(all_fitness_values)
+    pareto_indices = list()
+    n_selected = 0
+    for front in non_dominated_fronts(all_fitness_values, method=sort_method):
+        if n_selected >= selected_size:
+            break
+        front = front[np.argsort(all_fitness_values[front, 0])]  # Sorted by the first fitness value
         # check the size of pareto front, if larger than self.population_size,
         # remove some solutions using crowding criterion
-        if total_pareto_size > selected_size:
-            number_solutions_needed = selected_size - len(pareto_indices)
-            selected_solutions = remove_using_crowding(all_fitness_values[new_pareto_front_idx],
-                                                       number_solutions_needed)
-            new_pareto_front_idx = new_pareto_front_idx[selected_solutions]
-        pareto_indices = np.hstack((pareto_indices, remaining_population_idx[new_pareto_front_idx]))
-        remaining_population_idx = np.setdiff1d(remaining_population_idx, pareto_indices)
-    return pareto_indices
+        if n_selected + len(front) > selected_size:
+            front = front[truncate(all_fitness_values[front], selected_size - n_selected)]
+        pareto_indices.append(front)
+        n_selected += len(front)
+    return np.concatenate(pareto_indices) if pareto_indices else np.empty((0,), dtype=int)
 
 
 def array_divide(topo, lx, ly, lz, divide_number, ini_pop, end_pop):
@@ -0,0 +1,111 @@
+import numpy as np
+from typing import Union, Iterable
+
+
+FIELD_SEPARATOR = '.'
+
+
+def _flatten_result(result: dict, prefix: tuple = ()) -> list:
+    # (key path, value) of every leaf of a nested field outputs dictionary, in insertion order
+    leaves = list()
+    for key, value in result.items():
+        if isinstance(value, dict):
+            leaves += _flatten_result(value, prefix + (key,))
+        else:
+            leaves.append((prefix + (key,), value))
+    return leaves
+
+
+def field_name(path: Union[tuple, list, str]) -> str:
+    """
+    :param path: Key path into the field outputs of an entity, e.g. ('displacement', 'xMax').
+    :return: Name of the column of the path, e.g. 'displacement.xMax'.
+    """
+    return path if isinstance(path, str) else FIELD_SEPARATOR.join(str(key) for key in path)
+
+
+class ResultsTable:
+    """
+    Field outputs of entities as a structured array, a row per entity and a field per leaf of the nested field
+    outputs dictionary. Fields keep the shape of their leaves, e.g. 'displacement.xMax' has shape (3,) and
+    'mises_stress.max' is a scalar. Slices and columns are views, and index arrays gather rows in one operation.
+    """
+    def __init__(self, data: np.ndarray):
+        """
+        :param data: Structured array, shape: (entities,)
+        """
+        self.data = data
+
+    @classmethod
+    def from_dict(cls, results: dict, dtype: Union[np.dtype, None] = None) -> 'ResultsTable':
+        """
+        :param results: Field outputs keyed by entity number, starting from 1 without gaps. Field outputs of None
+        stand for a failed analysis, whose row is filled with NaN.
+        :param dtype: Structured dtype of the table. If None, it is inferred from the first entity with field outputs.
+        :return: Table whose row i is the entity i + 1.
+        """
+        ordered_results = [results[entity_num] for entity_num in range(1, len(results) + 1)]
+        if dtype is None:
+            first_result = next((result for result in ordered_results if result is not None), dict())
+            dtype = np.dtype([(field_name(path), float, np.shape(value))
+                              for path, value in _flatten_result(first_result)])
+        data = np.empty(len(ordered_results), dtype=dtype)
+        for entity_idx, result in enumerate(ordered_results):
+            if result is None:
+                for name in data.dtype.names or tuple():
+                    data[name][entity_idx] = np.nan
+                continue
+            for path, value in _flatten_result(result):
+                data[field_name(path)][entity_idx] = value
+        return cls(data)
+
+    def to_dict(self, start: int = 1) -> dict:
+        """
+        :param start: Entity number of the first row.
+        :return: Field outputs keyed by entity number, in the nested format of exported_field_outputs.
+        """
+        results = dict()
+        for entity_num, row in enumerate(self.data, start=start):
+            result = dict()
+            for name in self.fields:
+                *parents, leaf = name.split(FIELD_SEPARATOR)
+                nested = result
+                for parent in parents:
+                    nested = nested.setdefault(parent, dict())
+                value = row[name]
+                nested[leaf] = value.copy() if isinstance(value, np.ndarray) else float(value)
+            results[entity_num] = result
+        return results
+
+    @classmethod
+    def concatenate(cls, tables: Iterable['ResultsTable']) -> 'ResultsTable':
+        return cls(np.concatenate([table.data for table in tables]))
+
+    @property
+    def fields(self) -> tuple:
+        return self.data.dtype.names or tuple()
+
+    def column(self, path: Union[tuple, list, str]) -> np.ndarray:
+        """
+        :param path: Key path into field outputs, down to a leaf or an element of a leaf, e.g.
+        ('displacement', 'xMax', 0) as vars_definitions of FitnessDefinitions.
+        :return: Column of every entity, a view on the table.
+        """
+        if isinstance(path, str) or field_name(path) in self.fields:
+            return self.data[field_name(path)]
+        return self.column(path[:-1])[..., path[-1]]
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, index: Union[int, slice, np.ndarray, list]) -> Union[dict, 'ResultsTable']:
+        """
+        :param index: Row index for the field outputs of an entity, or a slice, mask or index array for a table.
+        Slices are views, and index arrays and masks gather rows into a new table.
+        """
+        if isinstance(index, (int, np.integer)):
+            return ResultsTable(self.data[index:index + 1 or None]).to_dict()[1]
+        return ResultsTable(self.data[index])
+
+    def __repr__(self) -> str:
+        return f'ResultsTable({len(self)} entities, fields: {", ".join(self.fields)})'
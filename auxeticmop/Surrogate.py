@@ -0,0 +1,128 @@
+import os
+import numpy as np
+from numba import njit
+from typing import Union
+from .PostProcessing import selection
+
+_popcount_table = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.uint8)
+
+
+@njit(cache=True)
+def hamming_distances(packed_queries: np.ndarray, packed_samples: np.ndarray, popcount_table: np.ndarray) -> np.ndarray:
+    """
+    Hamming distances between every pair of bit-packed topologies.
+    :param packed_queries: Packed topologies, shape: (queries, bytes)
+    :param packed_samples: Packed topologies, shape: (samples, bytes)
+    :param popcount_table: Number of set bits of every byte value.
+    :return: Distance array, shape: (queries, samples)
+    """
+    distances = np.empty((packed_queries.shape[0], packed_samples.shape[0]), dtype=np.int32)
+    for query_idx in range(packed_queries.shape[0]):
+        for sample_idx in range(packed_samples.shape[0]):
+            distance = 0
+            for byte_idx in range(packed_queries.shape[1]):
+                distance += popcount_table[packed_queries[query_idx, byte_idx] ^ packed_samples[sample_idx, byte_idx]]
+            distances[query_idx, sample_idx] = distance
+    return distances
+
+
+def pack_topology_rows(topologies: np.ndarray) -> np.ndarray:
+    return np.packbits(np.asarray(topologies, dtype=np.uint8).reshape(len(topologies), -1), axis=1)
+
+
+class KNNSurrogate:
+    """
+    k-nearest-neighbour fitness predictor over Hamming distance of packed topologies, trained incrementally on the
+    (topology, fitness values) pairs of the run. It screens over-generated offspring candidates so that only the ones
+    predicted non-dominated are analysed, and logs its prediction error of every generation in log_file_name as lines
+    of "<gen> <samples> <screened out> <survived> <mean absolute error of each fitness value>".
+    """
+    def __init__(self, k: int = 5, oversampling: int = 3, min_samples: int = 20,
+                 log_file_name: str = '_surrogate_log_'):
+        """
+        :param k: Number of neighbours averaged with inverse-distance weights.
+        :param oversampling: Candidates generated per offspring to be analysed.
+        :param min_samples: Samples needed before screening starts.
+        :param log_file_name: File name of the prediction error log.
+        """
+        self.k = k
+        self.oversampling = oversampling
+        self.min_samples = min_samples
+        self.log_file_name = log_file_name
+        self.packed_topologies = None
+        self.fitness_values = None
+        self.trained_generations = set()
+        self.screened_out = dict()
+
+    def __len__(self) -> int:
+        return 0 if self.fitness_values is None else len(self.fitness_values)
+
+    @property
+    def is_ready(self) -> bool:
+        return self.oversampling > 1 and len(self) >= self.min_samples
+
+    def add(self, topologies: np.ndarray, fitness_values: np.ndarray) -> None:
+        """
+        Add samples to the training set. Samples with non-finite fitness values are ignored.
+        :param topologies: Topologies, shape: (samples, lx, ly, lz)
+        :param fitness_values: Fitness values of topologies, shape: (samples, fitness values)
+        :return: None
+        """
+        is_finite = np.all(np.isfinite(fitness_values), axis=1)
+        packed_topologies, fitness_values = pack_topology_rows(topologies)[is_finite], fitness_values[is_finite]
+        if self.fitness_values is None:
+            self.packed_topologies, self.fitness_values = packed_topologies, np.asarray(fitness_values, dtype=float)
+        else:
+            self.packed_topologies = np.vstack((self.packed_topologies, packed_topologies))
+            self.fitness_values = np.vstack((self.fitness_values, fitness_values))
+
+    def predict(self, topologies: np.ndarray) -> np.ndarray:
+        """
+        :param topologies: Topologies, shape: (queries, lx, ly, lz)
+        :return: Predicted fitness values, shape: (queries, fitness values)
+        """
+        distances = hamming_distances(pack_topology_rows(topologies), self.packed_topologies, _popcount_table)
+        k = min(self.k, len(self))
+        neighbours = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        weights = 1 / (1 + np.take_along_axis(distances, neighbours, axis=1))
+        return np.einsum('qk,qkf->qf', weights, self.fitness_values[neighbours]) / weights.sum(axis=1, keepdims=True)
+
+    def screen(self, gen: int, candidates: np.ndarray, selected_size: int) -> np.ndarray:
+        """
+        Select candidates by non-dominated sorting and crowding of their predicted fitness values.
+        :param gen: Current generation, for the log.
+        :param candidates: Candidate topologies, shape: (candidates, lx, ly, lz)
+        :param selected_size: Number of candidates to select.
+        :return: Indices of selected candidates.
+        """
+        selected_indices = selection(all_fitness_values=self.predict(candidates), selected_size=selected_size)
+        self.screened_out[gen] = len(candidates) - len(selected_indices)
+        print(f'<info> Surrogate screened out {self.screened_out[gen]} of {len(candidates)} candidates')
+        return selected_indices
+
+    def record_generation(self, gen: int, topologies: np.ndarray, fitness_values: np.ndarray,
+                          survived: Union[np.ndarray, None] = None) -> None:
+        """
+        Log the prediction error on analysed offspring of a generation, then train on them.
+        :param gen: Generation number.
+        :param topologies: Analysed offspring topologies, shape: (offspring, lx, ly, lz)
+        :param fitness_values: Their fitness values from analyses, shape: (offspring, fitness values)
+        :param survived: Boolean mask of offspring selected as next parents.
+        :return: None
+        """
+        if gen in self.trained_generations:
+            return
+        if len(self) > 0:
+            absolute_errors = np.abs(self.predict(topologies) - fitness_values)
+            mean_absolute_errors = np.nanmean(np.where(np.isfinite(absolute_errors), absolute_errors, np.nan), axis=0)
+            n_survived = -1 if survived is None else int(np.count_nonzero(survived))
+            if not os.path.isfile(self.log_file_name):
+                with open(self.log_file_name, mode='w') as f:
+                    f.write('# gen samples screened_out survived ' + ' '.join(
+                        f'mae_{fitness_idx + 1}' for fitness_idx in range(fitness_values.shape[1])) + '\n')
+            with open(self.log_file_name, mode='a') as f:
+                f.write(f'{gen} {len(self)} {self.screened_out.get(gen, 0)} {n_survived} '
+                        + ' '.join(f'{error:.6g}' for error in mean_absolute_errors) + '\n')
+            print(f'<info> Surrogate mean absolute errors of generation {gen}: {mean_absolute_errors}')
+        self.add(topologies, fitness_values)
+        self.trained_generations.add(gen)
@@ -5,6 +5,14 @@ from . import MutateAndValidate
 from . import Network
 from . import PostProcessing
 from . import ParameterDefinitions
+from . import Database
+from . import FiniteElement
+from . import Surrogate
+from . import Results
+from . import NonDominatedSorting
+from . import Hypervolume
+from . import JobMonitor
+from . import InputFileWriter
 from .GeneticAlgorithm import *
 from .FileIO import *
 from .GraphicUserInterface import *
@@ -12,3 +20,11 @@ from .MutateAndValidate import *
 from .Network import *
 from .PostProcessing import *
 from .ParameterDefinitions import *
+from .Database import *
+from .FiniteElement import *
+from .Surrogate import *
+from .Results import *
+from .NonDominatedSorting import *
+from .Hypervolume import *
+from .JobMonitor import *
+from .InputFileWriter import *
@@ -8,7 +8,7 @@ Export these as 2nd generation; "Topologies_2" and "FieldOutput_2".
 def run():
     from ..PostProcessing import evaluate_all_fitness_values, selection
     from ..ParameterDefinitions import Parameters, fitness_definitions
-    from ..FileIO import pickle_io
+    from ..FileIO import pickle_io, pack_topologies
     import numpy as np
     from dataclasses import asdict
     import os
@@ -60,7 +60,7 @@ def run():
                         for entity_num, pareto_idx in enumerate(pareto_indices, start=1)}
     print('Shape of selected topologies: ', selected_topologies.shape)
     print('Size of selected results: ', len(selected_results))
-    pickle_io('Topologies_2', mode='w', to_dump={'parent': selected_topologies})
+    pickle_io('Topologies_2', mode='w', to_dump={'parent': pack_topologies(selected_topologies)})
     pickle_io('FieldOutput_2', mode='w', to_dump=selected_results)
 
 
@@ -18,16 +18,22 @@ def run():
     which can lead to unexpected results.
     """
     import os
+    from numba import config
     from ..GraphicUserInterface import App, Visualizer, plot_previously_plotted_data
     from ..GeneticAlgorithm import NSGAModel
-    from ..Network import Server, make_and_start_process, start_abaqus_cae
+    from ..Network import AsyncServer, make_and_start_process, start_abaqus_cae
     from ..ParameterDefinitions import material_property_definitions, fitness_definitions
 
     HOST = 'localhost'
     PORT = 12345
 
+    # Process pools of the GA fork this process after numba validated in parallel, and a process forked from TBB
+    # threads hangs at exit, so the workqueue threading layer is used unless another one is chosen
+    if 'NUMBA_THREADING_LAYER' not in os.environ:
+        config.THREADING_LAYER = 'workqueue'
+
     # Open socket server
-    server = Server(host=HOST, port=PORT, option='json', run_nonblocking=True)
+    server = AsyncServer(host=HOST, port=PORT, run_nonblocking=True)
 
     # Make an interface and receive parameters
     gui_process, parent_conn, child_conn = make_and_start_process(target=App, duplex=True, daemon=True)
@@ -50,7 +56,7 @@ def run():
     except Exception as e:
         print(e)
     finally:
-        server.close()
+        server.close_threadsafe()
         abaqus_process.kill()
 
 
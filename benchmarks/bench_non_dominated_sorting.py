@@ -0,0 +1,59 @@
+"""
+Benchmark of front ranking by the non-dominated sorts of NonDominatedSorting against peeling fronts with the former
+find_pareto_front_points scan, as selection() used to rank fronts. Ranks of every method are checked to be identical.
+"""
+import timeit
+import numpy as np
+from auxeticmop.NonDominatedSorting import non_dominated_ranks, NON_DOMINATED_SORTS
+
+
+def former_pareto_front(costs):
+    # Masked scan of the former find_pareto_front_points, which keeps one of duplicate points
+    unsorted_indices = np.arange(len(costs))
+    next_point_idx = 0
+    while next_point_idx < len(costs):
+        not_dominated_point_mask = np.any(costs < costs[next_point_idx], axis=1)
+        not_dominated_point_mask[next_point_idx] = True
+        unsorted_indices = unsorted_indices[not_dominated_point_mask]
+        costs = costs[not_dominated_point_mask]
+        next_point_idx = np.sum(not_dominated_point_mask[:next_point_idx]) + 1
+    return unsorted_indices
+
+
+def peel_fronts(costs):
+    # Ranks by a scan of the remaining points per front, as selection() used to do
+    ranks = np.full(len(costs), -1)
+    remaining_indices = np.arange(len(costs))
+    rank = 0
+    while len(remaining_indices) > 0:
+        front_indices = remaining_indices[former_pareto_front(costs[remaining_indices])]
+        ranks[front_indices] = rank
+        remaining_indices = np.setdiff1d(remaining_indices, front_indices)
+        rank += 1
+    return ranks
+
+
+def run(sizes=(100, 1000, 10000), objectives=(2, 3), seed=0, max_peeling_size=10000, max_deb_size=10000):
+    rng = np.random.default_rng(seed)
+    for method in NON_DOMINATED_SORTS:  # Compile numba kernels
+        non_dominated_ranks(rng.random((10, 2)), method=method)
+    for n_objectives in objectives:
+        for size in sizes:
+            costs = rng.random((size, n_objectives))
+            methods = {method: (lambda method=method: non_dominated_ranks(costs, method=method))
+                       for method in NON_DOMINATED_SORTS
+                       if (method != 'two_objective' or n_objectives == 2)
+                       and (method != 'deb' or size <= max_deb_size)}
+            if size <= max_peeling_size:
+                methods['peeling'] = lambda: peel_fronts(costs)
+            reference = non_dominated_ranks(costs, method='ens')
+            results = list()
+            for name, function in methods.items():
+                assert np.array_equal(function(), reference), name
+                number = 1 if size >= 10000 else 5
+                results.append(f'{name}: {timeit.timeit(function, number=number) / number * 1e3:.2f} ms')
+            print(f'N={size}, M={n_objectives}, fronts={reference.max() + 1} | ' + ' | '.join(results))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,36 @@
+"""
+Benchmark of make_3d_print_without_support against the former island-labeling implementation.
+Both are run until no voxel changes, and their results are checked to be identical.
+"""
+import timeit
+import numpy as np
+from auxeticmop.MutateAndValidate import make_3d_print_without_support, make_3d_print_without_support_by_islands
+
+
+def until_settled(function, arr_3d):
+    while function(arr_3d) != 0:
+        pass
+    return arr_3d
+
+
+def run(sizes=(10, 20, 40), density=0.6, samples=5, seed=0):
+    rng = np.random.default_rng(seed)
+    until_settled(make_3d_print_without_support, np.ones((3, 3, 3), dtype=np.uint8))  # Compile numba kernels
+    until_settled(make_3d_print_without_support_by_islands, np.ones((3, 3, 3), dtype=np.uint8))
+    for size in sizes:
+        topologies = (rng.random((samples, size, size, size)) < density).astype(np.uint8)
+        for topology in topologies:
+            assert np.array_equal(until_settled(make_3d_print_without_support, topology.copy()),
+                                  until_settled(make_3d_print_without_support_by_islands, topology.copy()))
+        results = {}
+        for function in (make_3d_print_without_support_by_islands, make_3d_print_without_support):
+            elapsed = timeit.timeit(lambda: [until_settled(function, topology.copy()) for topology in topologies],
+                                    number=3)
+            results[function.__name__] = elapsed / (3 * samples)
+        old, new = results.values()
+        print(f'{size}^3 voxels | islands: {old * 1e3:.3f} ms | single pass: {new * 1e3:.3f} ms | '
+              f'speedup: {old / new:.1f}x')
+
+
+if __name__ == '__main__':
+    run()
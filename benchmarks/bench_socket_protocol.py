@@ -0,0 +1,51 @@
+"""
+Benchmark of the binary socket protocol against the legacy json protocol, sending batches of topologies from a
+Server to a Client on the loopback interface. The json protocol sends nested lists as ABAQUS work items used to be,
+and the binary protocol sends the arrays as raw buffers. Received topologies are checked to be identical.
+"""
+import contextlib
+import io
+import time
+import numpy as np
+from auxeticmop.Network import Server, Client
+
+
+def connect(port, option):
+    server = Server(host='', port=port, option=option, run_nonblocking=True)
+    client = Client(host='localhost', port=port, option=option, connect=True)
+    while len(server.connected_clients) == 0:
+        time.sleep(0.01)
+    time.sleep(0.2)  # Hello frames of the binary protocol
+    return server, client
+
+
+def throughput(server, client, payload, repeats):
+    client_socket = server.connected_clients[0]
+    start = time.perf_counter()
+    for _ in range(repeats):
+        server.send(client_socket=client_socket, data=payload)
+        received = client.recv()
+    return (time.perf_counter() - start) / repeats, received
+
+
+def run(batch_sizes=(10, 100, 1000), topology_shape=(10, 10, 10), repeats=5, port=12399, seed=0):
+    rng = np.random.default_rng(seed)
+    with contextlib.redirect_stdout(io.StringIO()):  # Server and Client log every frame
+        connections = {option: connect(port + option_idx, option)
+                       for option_idx, option in enumerate(('json', 'binary'))}
+    for batch_size in batch_sizes:
+        topologies = (rng.random((batch_size, int(np.prod(topology_shape)))) < 0.5).astype(np.uint8)
+        payloads = {'json': {'work_topologies': topologies.tolist()}, 'binary': {'work_topologies': topologies}}
+        results = {}
+        for option, (server, client) in connections.items():
+            with contextlib.redirect_stdout(io.StringIO()):
+                results[option], received = throughput(server, client, payloads[option], repeats)
+            assert np.array_equal(np.asarray(received['work_topologies']), topologies)
+        megabytes = topologies.nbytes / 1e6
+        print(f'{batch_size} topologies of {topology_shape} | json: {results["json"] * 1e3:.2f} ms '
+              f'({megabytes / results["json"]:.1f} MB/s) | binary: {results["binary"] * 1e3:.2f} ms '
+              f'({megabytes / results["binary"]:.1f} MB/s) | speedup: {results["json"] / results["binary"]:.1f}x')
+
+
+if __name__ == '__main__':
+    run()
@@ -1,7 +1,12 @@
 import os
+
+# Offspring and analysis process pools fork this process after numba validated in parallel, and a process forked
+# from TBB threads hangs at exit, so the workqueue threading layer is used unless another one is chosen
+os.environ.setdefault('NUMBA_THREADING_LAYER', 'workqueue')
+
 from auxeticmop.GraphicUserInterface import App, Visualizer, plot_previously_plotted_data
 from auxeticmop.GeneticAlgorithm import NSGAModel
-from auxeticmop.Network import Server, make_and_start_process, start_abaqus_cae
+from auxeticmop.Network import AsyncServer, make_and_start_process, start_abaqus_cae
 from auxeticmop.ParameterDefinitions import material_property_definitions, fitness_definitions
 
 
@@ -24,7 +29,7 @@ PORT = 12345
 
 if __name__ == '__main__':
     # Open socket server
-    server = Server(host=HOST, port=PORT, option='json', run_nonblocking=True)
+    server = AsyncServer(host=HOST, port=PORT, run_nonblocking=True)
 
     # Make an interface and receive parameters
     gui_process, parent_conn, child_conn = make_and_start_process(target=App, duplex=True, daemon=True)
@@ -47,4 +52,4 @@ if __name__ == '__main__':
     except Exception as e:
         print(e)
     finally:
-        server.close()
+        server.close_threadsafe()
@@ -1,3 +1,9 @@
+import os
+
+# The sample steps fork process pools after numba validated in parallel, and a process forked from TBB threads hangs
+# at exit, so the workqueue threading layer is used unless another one is chosen
+os.environ.setdefault('NUMBA_THREADING_LAYER', 'workqueue')
+
 from auxeticmop.sample_scripts import step1, step2, step3
 
 